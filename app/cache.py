@@ -0,0 +1,170 @@
+# app / cache
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.settings import settings
+
+logger = logging.getLogger("tracelet.cache")
+
+# ---------------------------
+# Generic bounded TTL/LRU cache
+# ---------------------------
+_registry: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """
+    In-process LRU cache holding at most `maxsize` entries, each valid for `ttl` seconds.
+    Every instance registers itself by name so its counters show up in cache_stats().
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        _registry[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class BytesCache(TTLCache):
+    """
+    LRU cache of bytes values bounded by their total size instead of an entry count. Entries never
+    expire: it is meant for content-addressed keys, where changed content gets a new key.
+    """
+
+    def __init__(self, name: str, maxbytes: int):
+        super().__init__(name, maxsize=0, ttl=float("inf"))
+        self.maxsize = None
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        if len(value) > self.maxbytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old[0])
+            self._data[key] = (value, self.ttl)
+            self.nbytes += len(value)
+            while self.nbytes > self.maxbytes:
+                _, (evicted, _) = self._data.popitem(last=False)
+                self.nbytes -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "ttl_seconds": None, "bytes": self.nbytes, "maxbytes": self.maxbytes}
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+# ---------------------------
+# external_id -> entity resolution
+# ---------------------------
+class CachedEntity(NamedTuple):
+    id: UUID
+    type: str
+    external_id: str
+    extra_data: Optional[Dict[str, Any]]
+    created_at: Optional[datetime]
+
+
+entity_cache = TTLCache(
+    "entities_by_external_id",
+    maxsize=settings.ENTITY_CACHE_SIZE,
+    ttl=settings.ENTITY_CACHE_TTL,
+)
+
+
+def cache_entity(entity: models.Entity) -> CachedEntity:
+    cached = CachedEntity(entity.id, entity.type, entity.external_id, entity.extra_data, entity.created_at)
+    entity_cache.set(entity.external_id, cached)
+    return cached
+
+
+async def resolve_external_id(db: AsyncSession, external_id: str) -> Optional[CachedEntity]:
+    """
+    Look an entity up by external_id, answering from the cache when possible.
+    Misses are not cached, so an entity created by another worker is found right away.
+    """
+    cached = entity_cache.get(external_id)
+    if cached is not None:
+        return cached
+    entity = await db.scalar(select(models.Entity).where(models.Entity.external_id == external_id))
+    if entity is None:
+        return None
+    return cache_entity(entity)
@@ -0,0 +1,211 @@
+# app / closure
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import String
+
+logger = logging.getLogger("tracelet.closure")
+
+# entity_closure holds, for every pair of entities connected by links, each path length with the number of
+# distinct paths of that length. Counting paths (not just reachability) is what makes deletes exact in a
+# DAG: removing a link subtracts the paths through it and drops rows that reach zero.
+
+# Paths created by a batch of new links. Every new path splits uniquely at the new links it uses:
+#   (old path to p1) -> c1 -> (old path to p2) -> c2 ... -> ck -> (old path down)
+# `up` / `down` are the old closure around the new links (the node itself included, at depth 0), `seg`
+# chains new links through old paths. The batch must not contain a cycle (checked by the caller).
+_ADD_LINKS_SQL = """
+WITH RECURSIVE new_links AS (
+    SELECT * FROM unnest(:parents, :children) AS n(parent_id, child_id)
+),
+up AS (
+    SELECT n.parent_id AS node_id, c.ancestor_id, c.depth, c.paths
+    FROM (SELECT DISTINCT parent_id FROM new_links) n
+    JOIN entity_closure c ON c.descendant_id = n.parent_id
+  UNION ALL
+    SELECT DISTINCT parent_id, parent_id, 0, 1::bigint FROM new_links
+),
+down AS (
+    SELECT n.child_id AS node_id, c.descendant_id, c.depth, c.paths
+    FROM (SELECT DISTINCT child_id FROM new_links) n
+    JOIN entity_closure c ON c.ancestor_id = n.child_id
+  UNION ALL
+    SELECT DISTINCT child_id, child_id, 0, 1::bigint FROM new_links
+),
+seg(ancestor_id, child_id, depth, paths) AS (
+    SELECT u.ancestor_id, n.child_id, u.depth + 1, u.paths
+    FROM new_links n
+    JOIN up u ON u.node_id = n.parent_id
+  UNION ALL
+    SELECT s.ancestor_id, n.child_id, s.depth + d.depth + 1, s.paths * d.paths
+    FROM seg s
+    JOIN down d ON d.node_id = s.child_id
+    JOIN new_links n ON n.parent_id = d.descendant_id
+)
+INSERT INTO entity_closure (ancestor_id, descendant_id, depth, paths)
+SELECT s.ancestor_id, d.descendant_id, s.depth + d.depth, sum(s.paths * d.paths)
+FROM seg s
+JOIN down d ON d.node_id = s.child_id
+GROUP BY 1, 2, 3
+ON CONFLICT (ancestor_id, descendant_id, depth) DO UPDATE SET paths = entity_closure.paths + excluded.paths
+"""
+
+# Paths through one link (p, c): every old path into p times every old path out of c. In a DAG neither
+# side can itself use (p, c), so both are read from the closure as it is.
+_REMOVE_LINK_SQL = """
+WITH delta AS (
+    SELECT u.ancestor_id, d.descendant_id, u.depth + d.depth + 1 AS depth, sum(u.paths * d.paths) AS paths
+    FROM (SELECT ancestor_id, depth, paths FROM entity_closure WHERE descendant_id = :parent
+          UNION ALL SELECT CAST(:parent AS uuid), 0, 1::bigint) u
+    CROSS JOIN (SELECT descendant_id, depth, paths FROM entity_closure WHERE ancestor_id = :child
+                UNION ALL SELECT CAST(:child AS uuid), 0, 1::bigint) d
+    GROUP BY 1, 2, 3
+),
+gone AS (
+    DELETE FROM entity_closure c USING delta
+    WHERE c.ancestor_id = delta.ancestor_id AND c.descendant_id = delta.descendant_id
+      AND c.depth = delta.depth AND c.paths <= delta.paths
+)
+UPDATE entity_closure c SET paths = c.paths - delta.paths
+FROM delta
+WHERE c.ancestor_id = delta.ancestor_id AND c.descendant_id = delta.descendant_id
+  AND c.depth = delta.depth AND c.paths > delta.paths
+"""
+
+_REACHES_SQL = """
+SELECT EXISTS (
+    SELECT 1 FROM entity_closure
+    WHERE ancestor_id = CAST(:ancestor AS uuid) AND descendant_id = CAST(:descendant AS uuid)
+)
+"""
+
+# (ancestor, descendant) pairs of the given entities connected by a path of links
+_PATHS_SQL = """
+SELECT DISTINCT ancestor_id, descendant_id
+FROM entity_closure
+WHERE ancestor_id = ANY(:ancestors) AND descendant_id = ANY(:descendants)
+"""
+
+# Every path of entity_links, counted per (ancestor, descendant, length). `path` only guards against
+# looping forever should the links ever contain a cycle.
+REBUILD_SQL = """
+WITH RECURSIVE walk(ancestor_id, descendant_id, depth, path) AS (
+    SELECT parent_id, child_id, 1, ARRAY[parent_id, child_id] FROM entity_links
+  UNION ALL
+    SELECT w.ancestor_id, l.child_id, w.depth + 1, w.path || l.child_id
+    FROM walk w
+    JOIN entity_links l ON l.parent_id = w.descendant_id
+    WHERE NOT l.child_id = ANY(w.path)
+)
+INSERT INTO entity_closure (ancestor_id, descendant_id, depth, paths)
+SELECT ancestor_id, descendant_id, depth, count(*) FROM walk GROUP BY 1, 2, 3
+"""
+
+# Ancestors or descendants at their shallowest depth (one primary key / index range scan), with the links
+# that reach each of them from a node one level closer to the root, to rebuild paths and relations.
+_WALK_SQL = """
+WITH nodes AS (
+    SELECT {next_col} AS id, min(depth) AS depth
+    FROM entity_closure
+    WHERE {from_col} = :root AND depth <= :max_depth
+    GROUP BY {next_col}
+)
+SELECT n.id, n.depth, e.type, e.external_id, e.extra_data,
+       array_agg(l.{link_from}) AS previous, array_agg(l.relation) AS relations
+FROM nodes n
+JOIN entities e ON e.id = n.id
+JOIN entity_links l ON l.{link_next} = n.id
+LEFT JOIN nodes p ON p.id = l.{link_from}
+WHERE (n.depth = 1 AND l.{link_from} = :root) OR p.depth = n.depth - 1
+GROUP BY n.id, n.depth, e.id
+"""
+
+_DIRECTIONS = {
+    # direction -> (closure column of the root, closure column of the result, link column we come from,
+    # link column we move to)
+    "up": ("descendant_id", "ancestor_id", "child_id", "parent_id"),
+    "down": ("ancestor_id", "descendant_id", "parent_id", "child_id"),
+}
+
+
+async def add_links(db: AsyncSession, links: Sequence[Tuple[UUID, UUID]]) -> None:
+    """Add the paths of newly inserted (parent, child) links, in the links' transaction."""
+    if not links:
+        return
+    stmt = text(_ADD_LINKS_SQL).bindparams(
+        bindparam("parents", [p for p, _ in links], type_=ARRAY(PG_UUID(as_uuid=True))),
+        bindparam("children", [c for _, c in links], type_=ARRAY(PG_UUID(as_uuid=True))),
+    )
+    await db.execute(stmt)
+
+
+async def remove_link(db: AsyncSession, parent_id: UUID, child_id: UUID) -> None:
+    """Subtract the paths through a deleted link, in the link's transaction."""
+    await db.execute(text(_REMOVE_LINK_SQL), {"parent": parent_id, "child": child_id})
+
+
+async def reaches(db: AsyncSession, ancestor_id: UUID, descendant_id: UUID) -> bool:
+    """Whether a path of links leads from `ancestor_id` to `descendant_id` (one primary key lookup)."""
+    return bool(await db.scalar(text(_REACHES_SQL), {"ancestor": ancestor_id, "descendant": descendant_id}))
+
+
+async def paths_between(db: AsyncSession, ancestors: Sequence[UUID],
+                        descendants: Sequence[UUID]) -> List[Tuple[UUID, UUID]]:
+    """(ancestor, descendant) pairs, one from each list, with a path of links between them."""
+    stmt = text(_PATHS_SQL).bindparams(
+        bindparam("ancestors", list(ancestors), type_=ARRAY(PG_UUID(as_uuid=True))),
+        bindparam("descendants", list(descendants), type_=ARRAY(PG_UUID(as_uuid=True))),
+    )
+    return [tuple(row) for row in (await db.execute(stmt)).all()]
+
+
+async def rebuild_closure(db: AsyncSession) -> int:
+    """
+    Recompute entity_closure from entity_links (e.g. when turning ENTITY_CLOSURE on). Returns the rows written.
+    """
+    await db.execute(text("DELETE FROM entity_closure"))
+    result = await db.execute(text(REBUILD_SQL))
+    logger.info(f"Rebuilt entity_closure: {result.rowcount} rows")
+    return result.rowcount
+
+
+async def walk(db: AsyncSession, entity_id: UUID, direction: str, max_depth: int = 10) -> List[Dict[str, Any]]:
+    """
+    Same result as LinkGraph.walk (plus the entity fields), answered from the closure table: every node at
+    its shallowest depth, on the smallest path of ids, ordered by depth then path.
+    """
+    if direction not in _DIRECTIONS:
+        raise ValueError(f"Invalid direction '{direction}'")
+    from_col, next_col, link_from, link_next = _DIRECTIONS[direction]
+    sql = _WALK_SQL.format(from_col=from_col, next_col=next_col, link_from=link_from, link_next=link_next)
+    stmt = text(sql).bindparams(
+        bindparam("root", entity_id, type_=PG_UUID(as_uuid=True)),
+        bindparam("max_depth", max_depth),
+    ).columns(extra_data=JSONB, previous=ARRAY(PG_UUID(as_uuid=True)), relations=ARRAY(String))
+    rows = sorted((await db.execute(stmt)).mappings().all(), key=lambda row: row["depth"])
+
+    # shallower nodes first: each node extends the smallest path among its previous nodes
+    paths: Dict[UUID, Tuple[List[UUID], Optional[str]]] = {entity_id: ([entity_id], None)}
+    nodes = []
+    for row in rows:
+        candidates = [(paths[prev][0] + [row["id"]], rel)
+                      for prev, rel in zip(row["previous"], row["relations"]) if prev in paths]
+        if not candidates:
+            continue
+        path, relation = min(candidates)
+        paths[row["id"]] = (path, relation)
+        nodes.append({
+            "id": row["id"],
+            "type": row["type"],
+            "external_id": row["external_id"],
+            "extra_data": row["extra_data"],
+            "depth": row["depth"],
+            "path": path,
+            "relation": relation,
+        })
+    nodes.sort(key=lambda node: (node["depth"], node["path"]))
+    return nodes
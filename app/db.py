@@ -2,8 +2,10 @@
 
 import logging
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.settings import get_database_url, settings
+from app.metrics import TimedAsyncQueuePool, TimedQueuePool, instrument_engine
+from app.settings import get_async_database_url, get_database_url, settings
 
 # ---------------------------
 # Setup logger
@@ -33,10 +35,32 @@ engine = create_engine(
     echo=settings.SQL_ECHO,
     future=True,
     pool_pre_ping=True,  # Check connections before using
-    pool_size=5,
-    max_overflow=10
+    poolclass=TimedQueuePool,
+    pool_size=settings.SYNC_DB_POOL_SIZE,
+    max_overflow=settings.SYNC_DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
 )
 
+# Async engine (asyncpg) used by the API routers, so requests waiting on the
+# database don't each hold a threadpool worker
+ASYNC_DATABASE_URL = get_async_database_url()
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=settings.SQL_ECHO,
+    pool_pre_ping=True,
+    poolclass=TimedAsyncQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+)
+
+# checkout wait and pool usage, statements per request (GET /metrics)
+instrument_engine("sync", engine)
+instrument_engine("async", async_engine.sync_engine)
+
 # ---------------------------
 # Session and Base
 # ---------------------------
@@ -47,6 +71,14 @@ SessionLocal = sessionmaker(
     future=True
 )
 
+# expire_on_commit=False: attributes stay loaded after commit, an AsyncSession can't lazy-load them
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 # ---------------------------
@@ -63,3 +95,13 @@ def get_db():
     finally:
         db.close()
         logger.debug("DB session closed")
+
+
+async def get_async_db():
+    """
+    Provide an async SQLAlchemy session for FastAPI endpoints.
+    """
+    async with AsyncSessionLocal() as db:
+        logger.debug("Async DB session created")
+        yield db
+    logger.debug("Async DB session closed")
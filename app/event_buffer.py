@@ -0,0 +1,183 @@
+# app / event_buffer
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import select
+from app import models
+from app.db import AsyncSessionLocal
+from app.settings import settings
+
+logger = logging.getLogger("tracelet.event_buffer")
+
+# Write-behind ingestion for POST /events (EVENT_WRITE_BEHIND): posts are queued here and a background
+# flusher writes whatever has accumulated in one transaction (group commit), every EVENT_FLUSH_INTERVAL_MS
+# or once EVENT_FLUSH_MAX_EVENTS are waiting. Each post waits on its own future, resolved when its group is
+# committed, so a 201 still means the event is stored. The queue holds at most EVENT_BUFFER_MAX_PENDING
+# events: beyond that posts wait up to EVENT_BUFFER_WAIT seconds for room and then get a 503.
+
+Pending = Tuple[str, Dict[str, Any], "asyncio.Future[Tuple[str, Dict[str, Any]]]"]
+
+
+class EventBuffer:
+    def __init__(self, name: str, max_events: int, interval_ms: float, max_pending: int, wait: float):
+        self.name = name
+        self.max_events = max_events
+        self.interval = interval_ms / 1000
+        self.max_pending = max_pending
+        self.wait = wait
+        self._queue: Optional["asyncio.Queue[Optional[Pending]]"] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.batches = 0
+        self.events = 0
+        self.rejected = 0
+        self.max_batch = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        # the queue belongs to the running event loop
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Write-behind event buffer started ({self.max_events} events / {self.interval * 1000:g} ms)")
+
+    async def stop(self) -> None:
+        """
+        Write everything still queued and wait for the flusher to finish (on shutdown, before the engine
+        is disposed). New posts are turned away from here on.
+        """
+        if self._task is None:
+            return
+        self._closing = True
+        # the end marker queues up behind the pending events: the flusher writes them all, then returns
+        await self._queue.put(None)
+        try:
+            await self._task
+        except Exception:
+            logger.exception("Event buffer flusher failed")
+        self._task = None
+
+    async def submit(self, key: str, row: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Queue one event row (EventRead fields) under its idempotency key and wait until its group is
+        written. Returns ("created", row) or ("duplicate", original event), like store_events().
+        """
+        if self._closing:
+            raise HTTPException(status_code=503, detail="Event buffer is shutting down, retry later")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._queue.put((key, row, future)), timeout=self.wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Event buffer is full, retry later")
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            # sleep until the first event of the next group, then give the group the interval to fill up;
+            # the end marker (None) closes the group at once and ends the loop once it's written
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_events:
+                if not self._queue.empty():
+                    item = self._queue.get_nowait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+        # posts that were still waiting for room when the buffer closed get in behind the end marker
+        while not self._queue.empty():
+            batch = self._take(self.max_events)
+            if batch:
+                await self._flush(batch)
+
+    def _take(self, limit: int) -> List[Pending]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                batch.append(item)
+        return batch
+
+    async def _flush(self, batch: List[Pending]) -> None:
+        from app.services.events import store_events
+
+        if not batch:
+            return
+        start = time.perf_counter()
+        keyed = []
+        try:
+            async with AsyncSessionLocal() as db:
+                entity_ids = list({row["entity_id"] for _, row, _ in batch})
+                entity_types: Dict[UUID, str] = dict((await db.execute(
+                    select(models.Entity.id, models.Entity.type).where(models.Entity.id.in_(entity_ids))
+                )).all())
+                for key, row, future in batch:
+                    if row["entity_id"] in entity_types:
+                        keyed.append((key, row, future))
+                    elif not future.done():
+                        future.set_exception(HTTPException(status_code=404, detail="Entity not found"))
+                stored = await store_events(db, [(key, row) for key, row, _ in keyed], entity_types)
+            for (_, _, future), result in zip(keyed, stored):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            logger.exception(f"Flushing {len(batch)} buffered events failed")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(HTTPException(status_code=500, detail=f"Error creating event: {str(e)}"))
+        elapsed = time.perf_counter() - start
+        # events sent to the database (those of missing entities were answered with a 404 before)
+        self.batches += 1
+        self.events += len(keyed)
+        self.max_batch = max(self.max_batch, len(keyed))
+        self.flush_seconds += elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.last_flush_seconds = elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.running,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending,
+            "batches": self.batches,
+            "events": self.events,
+            "rejected": self.rejected,
+            "avg_batch": round(self.events / self.batches, 2) if self.batches else None,
+            "max_batch": self.max_batch,
+            "avg_flush_ms": round(self.flush_seconds / self.batches * 1000, 2) if self.batches else None,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 2),
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+        }
+
+
+event_buffer = EventBuffer(
+    "event_buffer",
+    max_events=settings.EVENT_FLUSH_MAX_EVENTS,
+    interval_ms=settings.EVENT_FLUSH_INTERVAL_MS,
+    max_pending=settings.EVENT_BUFFER_MAX_PENDING,
+    wait=settings.EVENT_BUFFER_WAIT,
+)
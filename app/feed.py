@@ -0,0 +1,111 @@
+# app / feed
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Mapping, Optional, Set
+from uuid import UUID
+from app.settings import settings
+
+logger = logging.getLogger("tracelet.feed")
+
+# Live feed of committed events, fanned out in-process: every subscriber has its own bounded queue and the
+# writers only ever put_nowait(), so a slow client can't hold up an insert. A subscriber whose queue is
+# full is dropped (its stream ends with a "dropped" message) instead of buffering without bound; it
+# reconnects and catches up from /events with `since`. Each worker publishes the events it commits itself.
+
+# the fields published for every event, as in EventRead
+FEED_FIELDS = ("event_type", "location", "actor", "payload", "id", "entity_id", "timestamp")
+
+
+def event_message(event: Any) -> Dict[str, Any]:
+    """The published fields of an Event object."""
+    return {field: getattr(event, field) for field in FEED_FIELDS}
+
+
+class Subscription:
+    """One client of the feed: its filters and its queue. `None` in the queue marks the end."""
+
+    def __init__(self, maxsize: int, entity_id: Optional[UUID] = None, event_type: Optional[str] = None,
+                 location: Optional[str] = None):
+        self.queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=maxsize + 1)
+        self.maxsize = maxsize
+        self.entity_id = entity_id
+        self.event_type = event_type
+        # substring match, case-insensitive, like the location filter of the listings
+        self.location = location.lower() if location else None
+        self.dropped = False
+
+    def matches(self, event: Mapping[str, Any]) -> bool:
+        if self.entity_id is not None and event["entity_id"] != self.entity_id:
+            return False
+        if self.event_type is not None and event["event_type"] != self.event_type:
+            return False
+        if self.location is not None and self.location not in (event["location"] or "").lower():
+            return False
+        return True
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Queue an event; False when the subscriber is too far behind (then it's closed)."""
+        # one slot is kept free for the end marker
+        if self.queue.qsize() >= self.maxsize:
+            self.dropped = True
+            self.close()
+            return False
+        self.queue.put_nowait(event)
+        return True
+
+    def close(self) -> None:
+        self.queue.put_nowait(None)
+
+
+class EventFeed:
+    def __init__(self, name: str, queue_size: int):
+        self.name = name
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, entity_id: Optional[UUID] = None, event_type: Optional[str] = None,
+                  location: Optional[str] = None) -> Subscription:
+        subscription = Subscription(self.queue_size, entity_id, event_type, location)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, events: Iterable[Mapping[str, Any]]) -> None:
+        """Hand committed events (mappings with FEED_FIELDS) to the matching subscribers. Never blocks."""
+        if not self._subscribers:
+            return
+        for event in events:
+            message = None
+            for subscription in list(self._subscribers):
+                if not subscription.matches(event):
+                    continue
+                if message is None:
+                    message = {field: event[field] for field in FEED_FIELDS}
+                if subscription.offer(message):
+                    self.delivered += 1
+                else:
+                    self._subscribers.discard(subscription)
+                    self.dropped += 1
+                    logger.warning(f"Dropped a slow {self.name} subscriber ({self.queue_size} events behind)")
+
+    def close(self) -> None:
+        """End every stream (on shutdown)."""
+        for subscription in self._subscribers:
+            subscription.close()
+        self._subscribers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "queue_size": self.queue_size,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped,
+        }
+
+
+event_feed = EventFeed("event_feed", settings.EVENT_FEED_QUEUE_SIZE)
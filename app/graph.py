@@ -0,0 +1,404 @@
+# app / graph
+
+import asyncio
+import logging
+import sys
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.db import AsyncSessionLocal
+from app.settings import settings
+
+logger = logging.getLogger("tracelet.graph")
+
+# ---------------------------
+# In-memory adjacency index of entity_links (per worker)
+# ---------------------------
+# Entity ids are interned to small ints (and kept as their 128-bit integers, which the GC doesn't
+# track). Each direction ("down": parent -> children, "up": child -> parents) is a CSR layout: node i's
+# neighbours are targets[offsets[i]:offsets[i + 1]], with the link relation (interned too) at the same
+# position in rels. Links created or deleted through this worker are applied to a small overlay on top of
+# the arrays; the arrays themselves are built from the database on first use and rebuilt in the
+# background once GRAPH_INDEX_TTL seconds have passed (which also picks up other workers' changes), while
+# requests keep reading the previous index. The arrays are filled in a thread, off the event loop.
+#
+# The index only serves reads (/trace) and does not guard link writes: it can lag behind the database, so
+# POST /links and /links/bulk check for cycles in the database, under a lock that serializes link inserts
+# (app/services/links.py). cyclic_links() below is a plain function over the links those checks fetch.
+
+_DIRECTIONS = ("up", "down")
+
+
+class _Adjacency:
+    __slots__ = ("offsets", "targets", "rels")
+
+    def __init__(self, n: int, sources: array, targets: array, rels: array):
+        # counting sort of the (source, target, relation) edges into offsets / targets / rels
+        counts = array("q", [0]) * (n + 1)
+        for source in sources:
+            counts[source + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        self.offsets = counts
+        self.targets = array("i", [0]) * len(sources)
+        self.rels = array("H", [0]) * len(sources)
+        fill = counts[:n]
+        for source, target, rel in zip(sources, targets, rels):
+            pos = fill[source]
+            self.targets[pos] = target
+            self.rels[pos] = rel
+            fill[source] = pos + 1
+
+    def nbytes(self) -> int:
+        return sum(a.buffer_info()[1] * a.itemsize for a in (self.offsets, self.targets, self.rels))
+
+
+def _build_adjacency(n: int, parents: array, children: array, rels: array) -> Dict[str, _Adjacency]:
+    return {"down": _Adjacency(n, parents, children, rels), "up": _Adjacency(n, children, parents, rels)}
+
+
+def cyclic_links(existing: Iterable[Tuple[UUID, UUID]], links: Sequence[Tuple[UUID, UUID]]) -> Set[int]:
+    """
+    Positions of the (parent, child) `links` that would lie on a cycle if the whole batch were added at
+    once to the `existing` (parent, child) links, whether the cycle runs through existing links or only
+    through links of the batch. `existing` needs every link such a cycle could use (e.g. the links
+    reachable from the batch's children), or pairs standing for existing paths.
+
+    Existing links form a DAG, so every cycle of existing + new links is inside one strongly connected
+    component and uses at least one new link; leaving out the new links inside such components breaks
+    them all. Components are found with an iterative Tarjan search started from the new links' parents.
+    """
+    graph: Dict[UUID, List[UUID]] = {}
+    for parent_id, child_id in existing:
+        graph.setdefault(parent_id, []).append(child_id)
+    new_parents: Dict[UUID, None] = {}
+    for parent_id, child_id in links:
+        graph.setdefault(parent_id, []).append(child_id)
+        new_parents[parent_id] = None
+
+    counter = 0
+    order: Dict[UUID, int] = {}
+    low: Dict[UUID, int] = {}
+    on_stack: Set[UUID] = set()
+    stack: List[UUID] = []
+    component: Dict[UUID, UUID] = {}
+
+    for start in new_parents:
+        if start in order:
+            continue
+        order[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(graph.get(start, ())))]
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in order:
+                    order[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph.get(child, ()))))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], order[child])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == order[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component[member] = node
+                    if member == node:
+                        break
+
+    return {i for i, (p, c) in enumerate(links) if component[p] == component[c]}
+
+
+class LinkGraph:
+    """
+    Adjacency index over entity_links, answering traversals (/trace) without a query per node. Link
+    writes keep it current (add_link/remove_link) but never consult it for cycle checks.
+    """
+
+    def __init__(self, name: str = "link_graph", ttl: float = settings.GRAPH_INDEX_TTL):
+        self.name = name
+        self.ttl = ttl
+        self._lock = asyncio.Lock()
+        self._refresh: Optional[asyncio.Task] = None
+        self._loaded_at: Optional[float] = None
+        self._loading = False
+        self._pending: List[Tuple[str, UUID, UUID, Optional[str]]] = []
+        self._reset([], {}, [], {}, _build_adjacency(0, array("i"), array("i"), array("H")))
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.last_load_ms: Optional[float] = None
+
+    def _reset(self, ids, index, relations, relation_index, adjacency) -> None:
+        self._ids: List[int] = ids
+        self._index: Dict[int, int] = index
+        self._relations: List[str] = relations
+        self._relation_index: Dict[str, int] = relation_index
+        self._adjacency: Dict[str, _Adjacency] = adjacency
+        self._base_edges = sum(len(a.targets) for a in adjacency.values()) // 2
+        # overlay: links added since the last load, per direction and source node, and removed base links
+        self._added: Dict[str, Dict[int, Dict[int, int]]] = {"up": {}, "down": {}}
+        self._removed: Set[Tuple[int, int]] = set()
+
+    # ---------- loading ----------
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if self._loaded_at is None:
+            self.misses += 1
+            async with self._lock:
+                if self._loaded_at is None:
+                    await self._load(db)
+            return
+        self.hits += 1
+        if time.monotonic() - self._loaded_at >= self.ttl and self._refresh is None:
+            # answer from the current index, rebuild it for the next requests
+            self._refresh = asyncio.create_task(self._reload())
+
+    async def _reload(self) -> None:
+        try:
+            async with self._lock:
+                async with AsyncSessionLocal() as db:
+                    await self._load(db)
+        except Exception:
+            logger.exception("Failed to rebuild the link graph, keeping the current one")
+            # try again after another GRAPH_INDEX_TTL, not on every request
+            self._loaded_at = time.monotonic()
+        finally:
+            self._refresh = None
+
+    async def stop(self) -> None:
+        """Cancel a rebuild in progress (on shutdown, before the engine is disposed)."""
+        if self._refresh is not None:
+            self._refresh.cancel()
+            try:
+                await self._refresh
+            except asyncio.CancelledError:
+                pass
+
+    async def _load(self, db: AsyncSession) -> None:
+        started = time.perf_counter()
+        self._loading = True
+        self._pending = []
+        try:
+            ids: List[int] = []
+            index: Dict[int, int] = {}
+            relations: List[str] = []
+            relation_index: Dict[str, int] = {}
+            # edges as flat arrays, not tuples: the GC doesn't track (and rescan) them while the index grows
+            parents, children, rels = array("i"), array("i"), array("H")
+            result = await db.stream(select(
+                models.EntityLink.parent_id, models.EntityLink.child_id, models.EntityLink.relation
+            ))
+            # small partitions: other requests get the event loop between them
+            async for rows in result.partitions(2000):
+                for parent_id, child_id, relation in rows:
+                    p = index.get(parent_id.int)
+                    if p is None:
+                        p = index[parent_id.int] = len(ids)
+                        ids.append(parent_id.int)
+                    c = index.get(child_id.int)
+                    if c is None:
+                        c = index[child_id.int] = len(ids)
+                        ids.append(child_id.int)
+                    r = relation_index.get(relation)
+                    if r is None:
+                        r = relation_index[relation] = len(relations)
+                        relations.append(relation)
+                    parents.append(p)
+                    children.append(c)
+                    rels.append(r)
+            n = len(ids)
+            adjacency = await asyncio.to_thread(_build_adjacency, n, parents, children, rels)
+            self._reset(ids, index, relations, relation_index, adjacency)
+            # links changed through this worker while the rows were being read
+            for op, parent_id, child_id, relation in self._pending:
+                self._apply(op, parent_id, child_id, relation)
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+            self.last_load_ms = round((time.perf_counter() - started) * 1000, 1)
+            logger.info(f"Link graph loaded: {n} entities, {len(parents)} links in {self.last_load_ms} ms")
+        finally:
+            self._loading = False
+            self._pending = []
+
+    def invalidate(self) -> None:
+        """Force a rebuild on next use (e.g. after links were written outside add_link/remove_link)."""
+        self._loaded_at = None
+
+    # ---------- incremental updates ----------
+    def add_link(self, parent_id: UUID, child_id: UUID, relation: str) -> None:
+        self._record("add", parent_id, child_id, relation)
+
+    def remove_link(self, parent_id: UUID, child_id: UUID) -> None:
+        self._record("remove", parent_id, child_id, None)
+
+    def _record(self, op: str, parent_id: UUID, child_id: UUID, relation: Optional[str]) -> None:
+        if self._loading:
+            self._pending.append((op, parent_id, child_id, relation))
+        if self._loaded_at is not None:
+            self._apply(op, parent_id, child_id, relation)
+
+    def _intern(self, entity_id: UUID) -> int:
+        i = self._index.get(entity_id.int)
+        if i is None:
+            i = self._index[entity_id.int] = len(self._ids)
+            self._ids.append(entity_id.int)
+        return i
+
+    def _apply(self, op: str, parent_id: UUID, child_id: UUID, relation: Optional[str]) -> None:
+        p, c = self._intern(parent_id), self._intern(child_id)
+        if op == "add":
+            r = self._relation_index.get(relation)
+            if r is None:
+                r = self._relation_index[relation] = len(self._relations)
+                self._relations.append(relation)
+            base = self._base_relation("down", p, c)
+            if base == r:
+                self._removed.discard((p, c))
+                self._added["down"].get(p, {}).pop(c, None)
+                self._added["up"].get(c, {}).pop(p, None)
+                return
+            if base is not None:
+                self._removed.add((p, c))
+            self._added["down"].setdefault(p, {})[c] = r
+            self._added["up"].setdefault(c, {})[p] = r
+        else:
+            self._added["down"].get(p, {}).pop(c, None)
+            self._added["up"].get(c, {}).pop(p, None)
+            if self._base_relation("down", p, c) is not None:
+                self._removed.add((p, c))
+
+    def _base_relation(self, direction: str, source: int, target: int) -> Optional[int]:
+        adjacency = self._adjacency[direction]
+        if source + 1 >= len(adjacency.offsets):
+            return None
+        for pos in range(adjacency.offsets[source], adjacency.offsets[source + 1]):
+            if adjacency.targets[pos] == target:
+                return adjacency.rels[pos]
+        return None
+
+    # ---------- queries ----------
+    def _neighbours(self, direction: str, i: int) -> List[Tuple[int, int]]:
+        """(node, relation) pairs linked to node i in `direction`, overlay applied."""
+        adjacency = self._adjacency[direction]
+        out = []
+        if i + 1 < len(adjacency.offsets):
+            start, end = adjacency.offsets[i], adjacency.offsets[i + 1]
+            targets, rels = adjacency.targets[start:end], adjacency.rels[start:end]
+            if self._removed:
+                removed = self._removed
+                out = [(t, r) for t, r in zip(targets, rels)
+                       if ((i, t) if direction == "down" else (t, i)) not in removed]
+            else:
+                out = list(zip(targets, rels))
+        added = self._added[direction].get(i)
+        if added:
+            out.extend(added.items())
+        return out
+
+    async def neighbours(self, db: AsyncSession, entity_id: UUID, direction: str) -> List[Tuple[UUID, str]]:
+        """Direct parents ("up") or children ("down") of an entity with the link relation."""
+        await self.ensure_loaded(db)
+        i = self._index.get(entity_id.int)
+        if i is None:
+            return []
+        return [(UUID(int=self._ids[t]), self._relations[r]) for t, r in self._neighbours(direction, i)]
+
+    async def walk(self, db: AsyncSession, entity_id: UUID, direction: str, max_depth: int = 10,
+                   relations: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Every entity reachable from `entity_id` going `up` (ancestors) or `down` (descendants), ordered by
+        depth then path. A node reachable via several paths is reported once, at its shallowest depth on the
+        smallest path of ids; each node carries its depth, that path from the root and the relation of the
+        link that reached it.
+        """
+        if direction not in _DIRECTIONS:
+            raise ValueError(f"Invalid direction '{direction}'")
+        await self.ensure_loaded(db)
+        root = self._index.get(entity_id.int)
+        if root is None:
+            return []
+        allowed = None
+        if relations:
+            allowed = {self._relation_index[r] for r in relations if r in self._relation_index}
+            if not allowed:
+                return []
+
+        ids = self._ids
+        via: Dict[int, Tuple[int, int]] = {root: (-1, -1)}  # node -> (previous node, relation)
+        out: List[Dict[str, Any]] = []
+        level = [root]
+        depth = 0
+        while level and depth < max_depth:
+            depth += 1
+            next_level = []
+            # nodes of a level are in path order, so the first node to reach a new one gives it its smallest path
+            for node in level:
+                found = [(t, r) for t, r in self._neighbours(direction, node)
+                         if t not in via and (allowed is None or r in allowed)]
+                for t, r in sorted(found, key=lambda tr: ids[tr[0]]):
+                    if t not in via:
+                        via[t] = (node, r)
+                        next_level.append(t)
+            for node in next_level:
+                path = [node]
+                previous = via[node][0]
+                while previous != -1:
+                    path.append(previous)
+                    previous = via[previous][0]
+                out.append({
+                    "id": UUID(int=ids[node]),
+                    "depth": depth,
+                    "path": [UUID(int=ids[p]) for p in reversed(path)],
+                    "relation": self._relations[via[node][1]],
+                })
+            level = next_level
+        return out
+
+    # ---------- stats ----------
+    def nbytes(self) -> int:
+        """Approximate memory held by the index (arrays, id maps and overlay)."""
+        total = sum(a.nbytes() for a in self._adjacency.values())
+        total += sys.getsizeof(self._ids) + sys.getsizeof(self._index)
+        if self._ids:
+            total += len(self._ids) * sys.getsizeof(self._ids[0])
+        overlay = sum(len(targets) for added in self._added.values() for targets in added.values())
+        return total + overlay * 100 + len(self._removed) * 100
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        added = sum(len(targets) for targets in self._added["down"].values())
+        return {
+            "entities": len(self._ids),
+            "links": self._base_edges - len(self._removed) + added,
+            "relations": len(self._relations),
+            "overlay_added": added,
+            "overlay_removed": len(self._removed),
+            "bytes": self.nbytes(),
+            "ttl_seconds": self.ttl,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+            "loads": self.loads,
+            "last_load_ms": self.last_load_ms,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+link_graph = LinkGraph()
@@ -0,0 +1,137 @@
+# app / idempotency
+
+import hashlib
+import logging
+import orjson
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, TIMESTAMP, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.types import String
+from app import models
+from app.cache import TTLCache
+from app.feed import FEED_FIELDS
+from app.models import utc_now
+from app.settings import settings
+
+logger = logging.getLogger("tracelet.idempotency")
+
+# Scanners retry on flaky networks, so the same scan can arrive several times. Every event gets an
+# idempotency key: the client's Idempotency-Key, or else a fingerprint of the scan (entity, type, location,
+# actor and payload). A fingerprint only repeats an event stored with it less than IDEMPOTENCY_WINDOW
+# seconds before (a sliding window: the key points at the last event stored with it), a client key for
+# IDEMPOTENCY_KEY_TTL. Keys are claimed in event_idempotency_keys in the event's transaction (the primary
+# key settles concurrent retries); a retry whose key is taken gets the original event back. The events this
+# worker wrote or replayed are also kept in a bounded in-process cache, so most retries are answered
+# without touching the database.
+
+SCAN_PREFIX = "scan:"
+
+# Claim keys for new events. A key already taken is handed over to the new event once its event is older
+# than IDEMPOTENCY_WINDOW (fingerprints), or the key older than IDEMPOTENCY_KEY_TTL (not purged yet).
+# RETURNING lists the keys this transaction got.
+_CLAIM_SQL = """
+INSERT INTO event_idempotency_keys (key, event_id, event_timestamp, created_at)
+SELECT key, event_id, event_timestamp, now()
+FROM unnest(:keys, :event_ids, :timestamps) AS k(key, event_id, event_timestamp)
+ON CONFLICT (key) DO UPDATE
+    SET event_id = excluded.event_id, event_timestamp = excluded.event_timestamp, created_at = excluded.created_at
+    WHERE event_idempotency_keys.created_at < :expired_before
+       OR (starts_with(event_idempotency_keys.key, :scan_prefix)
+           AND event_idempotency_keys.event_timestamp < excluded.event_timestamp - :window)
+RETURNING key
+"""
+
+# the event recorded for a key was deleted since (or archived): the key goes to the new event
+_REASSIGN_SQL = """
+UPDATE event_idempotency_keys
+SET event_id = :event_id, event_timestamp = :event_timestamp, created_at = now()
+WHERE key = :key
+"""
+
+event_cache = TTLCache(
+    "events_by_idempotency_key",
+    maxsize=settings.IDEMPOTENCY_CACHE_SIZE,
+    ttl=settings.IDEMPOTENCY_KEY_TTL,
+)
+
+
+def event_key(entity_id: UUID, event_type: str, location: Optional[str], actor: Optional[str],
+              payload: Optional[Dict[str, Any]], client_key: Optional[str] = None) -> str:
+    """The idempotency key of an incoming event."""
+    if client_key:
+        return f"client:{client_key}"
+    raw = f"{entity_id}|{event_type}|{location or ''}|{actor or ''}|".encode()
+    raw += orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return SCAN_PREFIX + hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def recall(key: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """
+    The event already stored under `key`, when this worker has seen it (EventRead fields). A fingerprint's
+    event only counts until it is IDEMPOTENCY_WINDOW seconds older than `now`.
+    """
+    event = event_cache.get(key)
+    if event is not None and key.startswith(SCAN_PREFIX) and event["timestamp"] < (now or utc_now()) - _window():
+        return None
+    return event
+
+
+def _window() -> timedelta:
+    return timedelta(seconds=settings.IDEMPOTENCY_WINDOW)
+
+
+def remember(key: str, event: Dict[str, Any]) -> None:
+    event_cache.set(key, event)
+
+
+async def claim_keys(db: AsyncSession, claims: Sequence[Tuple[str, UUID, datetime]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Claim (key, event_id, event_timestamp) for events about to be inserted, in their transaction.
+    Returns the original event of every key that was taken already; all other keys now belong to the
+    new events. Keys must be distinct. Waits for a concurrent transaction holding the same key.
+    """
+    if not claims:
+        return {}
+    stmt = text(_CLAIM_SQL).bindparams(
+        bindparam("keys", [key for key, _, _ in claims], type_=ARRAY(String)),
+        bindparam("event_ids", [event_id for _, event_id, _ in claims], type_=ARRAY(PG_UUID(as_uuid=True))),
+        bindparam("timestamps", [ts for _, _, ts in claims], type_=ARRAY(TIMESTAMP(timezone=True))),
+        bindparam("expired_before", utc_now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)),
+        bindparam("window", _window()),
+        bindparam("scan_prefix", SCAN_PREFIX),
+    )
+    claimed = set((await db.scalars(stmt)).all())
+    taken = {key: (event_id, ts) for key, event_id, ts in claims if key not in claimed}
+    if not taken:
+        return {}
+
+    key_col = models.EventIdempotencyKey.key
+    rows = (await db.execute(
+        select(key_col, *(getattr(models.Event, field) for field in FEED_FIELDS))
+        .join(models.Event, (models.Event.id == models.EventIdempotencyKey.event_id)
+              & (models.Event.timestamp == models.EventIdempotencyKey.event_timestamp))
+        .where(key_col.in_(list(taken)))
+    )).all()
+    originals = {}
+    for row in rows:
+        event = row._asdict()
+        originals[event.pop("key")] = event
+    for key in taken.keys() - originals.keys():
+        event_id, ts = taken[key]
+        await db.execute(text(_REASSIGN_SQL), {"key": key, "event_id": event_id, "event_timestamp": ts})
+    return originals
+
+
+async def purge_expired_keys(conn: AsyncConnection) -> int:
+    """Delete keys older than IDEMPOTENCY_KEY_TTL. Returns the number of keys removed."""
+    expired_before = utc_now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    result = await conn.execute(
+        models.EventIdempotencyKey.__table__.delete()
+        .where(models.EventIdempotencyKey.created_at < expired_before)
+    )
+    if result.rowcount:
+        logger.info(f"Purged {result.rowcount} expired idempotency keys")
+    return result.rowcount
@@ -0,0 +1,254 @@
+# app / labels
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Sequence
+import qrcode
+from reportlab.graphics.barcode.code128 import Code128
+from reportlab.graphics.barcode.ecc200datamatrix import ECC200DataMatrix
+from reportlab.lib.pagesizes import A5
+from reportlab.pdfgen import canvas
+from app.cache import BytesCache
+from app.settings import settings
+
+logger = logging.getLogger("tracelet.labels")
+
+# Rendered label PDFs and encoded 2D codes are cached by content: keys hash everything printed on the
+# label, so a changed package simply maps to a new key and stale entries age out of the LRU.
+pdf_cache = BytesCache("label_pdfs", maxbytes=settings.LABEL_CACHE_MAX_BYTES // 2)
+code_cache = BytesCache("label_codes", maxbytes=settings.LABEL_CACHE_MAX_BYTES // 2)
+
+# Codes are drawn as vector paths with ReportLab's own primitives: no raster image, no PNG encode/decode.
+# qr and datamatrix are 2D module matrices (encoded up front, in worker processes for batches);
+# code128 is a linear barcode drawn straight onto the canvas.
+MATRIX_SYMBOLOGIES = ("qr", "datamatrix")
+
+CODE_CHUNK = 200  # codes per process pool task
+PDF_CHUNK = 64 * 1024  # bytes per streamed response chunk
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class Label(NamedTuple):
+    external_id: str
+    sender: str
+    recipient: str
+    destination: str
+    weight: str
+
+
+def label_from_entity(external_id: str, extra_data: Optional[dict]) -> Label:
+    """Label fields straight from the package entity's extra_data (missing fields print blank)."""
+    extra = extra_data or {}
+    return Label(
+        external_id=str(external_id),
+        sender=str(extra.get('sender', '') or ''),
+        recipient=str(extra.get('recipient', '') or ''),
+        destination=str(extra.get('destination', '') or ''),
+        weight=str(extra.get('weight_kg', '') or ''),
+    )
+
+
+def label_key(label: Label, symbology: str) -> str:
+    return hashlib.sha256(json.dumps([symbology, *label], separators=(",", ":")).encode()).hexdigest()
+
+
+def code_key(symbology: str, data: str) -> str:
+    return hashlib.sha256(f"{symbology}:{data}".encode()).hexdigest()
+
+
+# ---------------------------
+# Encoding and drawing (plain functions, so they can run in worker processes)
+# ---------------------------
+def encode_matrix(symbology: str, data: str) -> bytes:
+    """
+    Module matrix of a 2D code as n*n bytes (1 = dark), rows top to bottom, quiet zone included.
+    """
+    if symbology == "qr":
+        qr = qrcode.QRCode(border=2)
+        qr.add_data(data)
+        qr.make(fit=True)
+        rows = qr.get_matrix()
+    elif symbology == "datamatrix":
+        dm = ECC200DataMatrix(value=data)
+        dm.validate()
+        if not dm.valid:
+            raise ValueError(f"Cannot encode {data!r} as DataMatrix")
+        # encode() returns rows bottom to top; add a one-module quiet zone
+        inner = [[0, *row, 0] for row in reversed(dm.encode())]
+        blank = [0] * len(inner[0])
+        rows = [blank, *inner, blank]
+    else:
+        raise ValueError(f"Unknown 2D symbology '{symbology}'")
+    return bytes(1 if module else 0 for row in rows for module in row)
+
+
+def encode_matrices(symbology: str, data: Sequence[str]) -> List[bytes]:
+    return [encode_matrix(symbology, d) for d in data]
+
+
+def draw_matrix(pdf: canvas.Canvas, matrix: bytes, x: float, y: float, size: float) -> None:
+    """Draw a square module matrix as one filled path, merging horizontal runs of dark modules."""
+    n = math.isqrt(len(matrix))
+    rects = []
+    for r in range(n):
+        row = matrix[r * n:(r + 1) * n]
+        c = 0
+        while c < n:
+            if row[c]:
+                start = c
+                while c < n and row[c]:
+                    c += 1
+                rects.append(f"{start} {r} {c - start} 1 re")
+            else:
+                c += 1
+    pdf.saveState()
+    # one unit per module with the origin at the top-left corner, so the path is plain small integers
+    # written straight into the page stream instead of going through a float-formatting PathObject
+    pdf.translate(x, y + size)
+    pdf.scale(size / n, -size / n)
+    pdf.addLiteral(" ".join(rects) + " f")
+    pdf.restoreState()
+
+
+def draw_code128(pdf: canvas.Canvas, data: str, x: float, y: float, max_width: float, height: float) -> None:
+    probe = Code128(data, barWidth=1, quiet=0)
+    bar_width = min(1.5, max_width / probe.width)
+    Code128(data, barWidth=bar_width, barHeight=height, quiet=0).drawOn(pdf, x, y)
+
+
+def draw_label_text(pdf: canvas.Canvas, label: Label) -> None:
+    width, height = A5
+
+    # ---------- Header ----------
+    pdf.setFont("Helvetica-Bold", 20)
+    pdf.drawCentredString(width / 2, height - 40, "TRACELET")
+    pdf.setFont("Helvetica", 12)
+    pdf.drawCentredString(width / 2, height - 60, "Package Invoice / Tracking")
+
+    # ---------- Package Info ----------
+    y = height - 100
+    line_height = 20
+
+    pdf.setFont("Helvetica", 12)
+    pdf.drawString(30, y, f"Tracking Number: {label.external_id}")
+    y -= line_height
+    pdf.drawString(30, y, f"Sender: {label.sender}")
+    y -= line_height
+    pdf.drawString(30, y, f"Recipient: {label.recipient}")
+    y -= line_height
+    pdf.drawString(30, y, f"Destination: {label.destination}")
+    y -= line_height
+    pdf.drawString(30, y, f"Weight (kg): {label.weight}")
+
+    # ---------- Footer (optional) ----------
+    pdf.setFont("Helvetica-Oblique", 8)
+    pdf.drawString(30, 20, "Generated by Tracelet Web Tracking System")
+
+
+def draw_label(pdf: canvas.Canvas, label: Label, symbology: str, matrix: Optional[bytes]) -> None:
+    """Draw one A5 package invoice page with its code."""
+    width, height = A5
+    draw_label_text(pdf, label)
+
+    # ---------- Code ----------
+    if symbology == "code128":
+        # full width along the bottom
+        draw_code128(pdf, label.external_id, 30, 40, width - 60, 60)
+    else:
+        # Draw QR / DataMatrix code on the bottom right
+        code_size = 120
+        draw_matrix(pdf, matrix, width - code_size - 30, 30, code_size)
+
+    pdf.showPage()
+
+
+def render_labels(labels: Sequence[Label], symbology: str, matrices: Sequence[Optional[bytes]]) -> bytes:
+    """One PDF with a page per label; CPU-bound, run it off the event loop."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A5)
+    for label, matrix in zip(labels, matrices):
+        draw_label(pdf, label, symbology, matrix)
+    pdf.save()
+    return buffer.getvalue()
+
+
+def render_label_pdf(label: Label, symbology: str = "qr") -> bytes:
+    """Single label PDF, answered from the content-addressed cache when the label was printed before."""
+    key = label_key(label, symbology)
+    pdf_bytes = pdf_cache.get(key)
+    if pdf_bytes is None:
+        matrix = None
+        if symbology in MATRIX_SYMBOLOGIES:
+            matrix = code_cache.get(code_key(symbology, label.external_id))
+            if matrix is None:
+                matrix = encode_matrix(symbology, label.external_id)
+                code_cache.set(code_key(symbology, label.external_id), matrix)
+        pdf_bytes = render_labels([label], symbology, [matrix])
+        pdf_cache.set(key, pdf_bytes)
+    return pdf_bytes
+
+
+async def iter_pdf_chunks(pdf_bytes: bytes, chunk_size: int = PDF_CHUNK) -> AsyncIterator[bytes]:
+    """Stream a rendered PDF in fixed-size chunks (async, so StreamingResponse needs no threadpool hop)."""
+    for start in range(0, len(pdf_bytes), chunk_size):
+        yield pdf_bytes[start:start + chunk_size]
+
+
+# ---------------------------
+# Batch code encoding on a process pool
+# ---------------------------
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the API process runs an event loop, threads and open DB connections
+        _pool = ProcessPoolExecutor(max_workers=settings.LABEL_WORKERS or os.cpu_count(),
+                                    mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def batch_matrices(symbology: str, data: Sequence[str]) -> List[Optional[bytes]]:
+    """
+    Module matrices for every value: cached ones reused, the rest encoded in parallel worker processes.
+    Linear symbologies need no matrix and get None.
+    """
+    if symbology not in MATRIX_SYMBOLOGIES:
+        return [None] * len(data)
+
+    found: Dict[str, bytes] = {}
+    missing = []
+    for value in dict.fromkeys(data):
+        matrix = code_cache.get(code_key(symbology, value))
+        if matrix is None:
+            missing.append(value)
+        else:
+            found[value] = matrix
+
+    if missing:
+        loop = asyncio.get_running_loop()
+        pool = get_pool()
+        chunks = [missing[i:i + CODE_CHUNK] for i in range(0, len(missing), CODE_CHUNK)]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, encode_matrices, symbology, chunk) for chunk in chunks
+        ))
+        for chunk, matrices in zip(chunks, results):
+            for value, matrix in zip(chunk, matrices):
+                code_cache.set(code_key(symbology, value), matrix)
+                found[value] = matrix
+        logger.info(f"Encoded {len(missing)} {symbology} codes on {len(chunks)} pool tasks ({len(found) - len(missing)} cached)")
+
+    return [found[value] for value in data]
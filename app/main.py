@@ -1,9 +1,20 @@
 # app/main.py
+import asyncio
 import logging
 import time
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from app import metrics
 from app.routes import router as api_router
+from app.db import async_engine
+from app.event_buffer import event_buffer
+from app.feed import event_feed
+from app.graph import link_graph
+from app.idempotency import purge_expired_keys
+from app.labels import shutdown_pool
+from app.pagination import NEXT_CURSOR_HEADER
+from app.partitions import ensure_event_partitions
+from app.settings import settings
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,15 +39,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# route label of requests that matched no route (404s)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-
-    response = await call_next(request)
+    start_time = time.perf_counter()
+    queries = metrics.start_request()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        # labelled by route template (not the raw path), so ids don't make a series each
+        route = getattr(request.scope.get("route"), "path", UNMATCHED_ROUTE)
+        metrics.end_request(request.method, route, status, time.perf_counter() - start_time, queries)
 
-    process_time = round((time.time() - start_time) * 1000, 2)
+    process_time = round((time.perf_counter() - start_time) * 1000, 2)
 
     logger.info(
         f"{request.method} {request.url.path} "
@@ -59,11 +82,52 @@ def root():
         "health": "/api/v1/health"
     }
 
+PARTITION_CHECK_INTERVAL = 6 * 60 * 60  # seconds
+
+
+async def maintain_event_partitions():
+    """Keep monthly events partitions created ahead of time for as long as the API runs."""
+    while True:
+        try:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(ensure_event_partitions)
+        except Exception:
+            logger.exception("Failed to create upcoming event partitions")
+        await asyncio.sleep(PARTITION_CHECK_INTERVAL)
+
+
+IDEMPOTENCY_PURGE_INTERVAL = 60 * 60  # seconds
+
+
+async def purge_idempotency_keys():
+    """Delete expired event idempotency keys every hour for as long as the API runs."""
+    while True:
+        try:
+            async with async_engine.begin() as conn:
+                await purge_expired_keys(conn)
+        except Exception:
+            logger.exception("Failed to purge expired idempotency keys")
+        await asyncio.sleep(IDEMPOTENCY_PURGE_INTERVAL)
+
+
 @app.on_event("startup")
 async def startup_event():
+    app.state.partition_task = asyncio.create_task(maintain_event_partitions())
+    app.state.idempotency_task = asyncio.create_task(purge_idempotency_keys())
+    if settings.EVENT_WRITE_BEHIND:
+        event_buffer.start()
     logger.info("Tracelet API started successfully")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    logger.info("Tracelet API shutting down")
\ No newline at end of file
+    logger.info("Tracelet API shutting down")
+    app.state.partition_task.cancel()
+    app.state.idempotency_task.cancel()
+    # end the event streams still open (uvicorn only gets here after its graceful shutdown timeout)
+    event_feed.close()
+    # write the events still buffered before the connections go
+    await event_buffer.stop()
+    await link_graph.stop()
+    shutdown_pool()
+    await async_engine.dispose()
\ No newline at end of file
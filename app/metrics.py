@@ -0,0 +1,242 @@
+# app / metrics
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Prometheus metrics of this worker, rendered in the text exposition format by GET /metrics. Recording only
+# touches plain numbers keyed by tuples of label values (a dict lookup, a bisect, two additions); names,
+# labels and cumulative buckets are put together when the endpoint is scraped. Every worker process keeps
+# its own numbers, scrape each worker (or sum them in Prometheus).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = Tuple[Any, ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class GaugeFunc(Metric):
+    """A gauge read when scraped: `collect` returns {label values: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Dict[Labels, Optional[float]]]):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}"
+                for labels, value in self.collect().items() if value is not None]
+
+
+class CounterFunc(GaugeFunc):
+    """A counter kept elsewhere (e.g. the caches' own hit counts), read when scraped."""
+    kind = "counter"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (the last one is +Inf), sum]
+        self._values: Dict[Labels, List[Any]] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+_registry: List[Metric] = []
+
+
+def register(metric: Metric) -> Metric:
+    _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# ---------------------------
+# HTTP requests
+# ---------------------------
+request_duration = register(Histogram(
+    "tracelet_http_request_duration_seconds", "Time until the response starts, per route template.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+))
+request_queries = register(Histogram(
+    "tracelet_http_request_db_queries", "Database statements executed per request.",
+    ("method", "route"), QUERY_BUCKETS,
+))
+requests_in_flight = register(Gauge("tracelet_http_requests_in_flight", "Requests being handled."))
+requests_in_flight.inc((), 0)
+
+# statements run by the current request: the middleware puts a fresh [count] here, the engines' listener
+# increments it (tasks and threadpool calls started by the request inherit the context)
+_request_queries: ContextVar[Optional[List[int]]] = ContextVar("request_queries", default=None)
+
+
+def start_request() -> List[int]:
+    requests_in_flight.inc()
+    queries = [0]
+    _request_queries.set(queries)
+    return queries
+
+
+def end_request(method: str, route: str, status: int, seconds: float, queries: List[int]) -> None:
+    requests_in_flight.dec()
+    request_duration.observe((method, route, status), seconds)
+    request_queries.observe((method, route), queries[0])
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+# ---------------------------
+# Connection pools
+# ---------------------------
+pool_wait = register(Histogram(
+    "tracelet_db_pool_wait_seconds", "Time to check a connection out of the pool (including pre-ping).",
+    ("engine",), POOL_WAIT_BUCKETS,
+))
+pool_timeouts = register(Counter(
+    "tracelet_db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT.", ("engine",),
+))
+_engines: Dict[str, Engine] = {}
+
+
+class _TimedPool:
+    """Times every checkout; `metrics_engine` labels the samples."""
+    metrics_engine = "sync"
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_timeouts.inc((self.metrics_engine,))
+            raise
+        pool_wait.observe((self.metrics_engine,), time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    metrics_engine = "sync"
+
+
+class TimedAsyncQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    metrics_engine = "async"
+
+
+def instrument_engine(name: str, engine: Engine) -> None:
+    """Count the engine's statements per request and report its pool (created with a Timed*QueuePool)."""
+    _engines[name] = engine
+    event.listen(engine, "before_cursor_execute", _count_query)
+
+
+def _pool_gauge(read: Callable[[Any], float]) -> Callable[[], Dict[Labels, float]]:
+    # engine.pool is read at scrape time: dispose() replaces it
+    return lambda: {(name,): read(engine.pool) for name, engine in _engines.items()}
+
+
+register(GaugeFunc("tracelet_db_pool_size", "Connections the pool keeps (DB_POOL_SIZE).", ("engine",),
+                   _pool_gauge(lambda pool: pool.size())))
+register(GaugeFunc("tracelet_db_pool_checked_out", "Connections in use.", ("engine",),
+                   _pool_gauge(lambda pool: pool.checkedout())))
+register(GaugeFunc("tracelet_db_pool_overflow", "Connections open beyond the pool size (up to DB_MAX_OVERFLOW).",
+                   ("engine",), _pool_gauge(lambda pool: max(pool.overflow(), 0))))
+
+
+# ---------------------------
+# Caches
+# ---------------------------
+def _cache_stat(field: str) -> Callable[[], Dict[Labels, Optional[float]]]:
+    def collect():
+        # imported here: app.db imports this module, and app.cache needs the models
+        from app.cache import cache_stats
+
+        return {(name,): stats[field] for name, stats in cache_stats().items()}
+    return collect
+
+
+register(CounterFunc("tracelet_cache_hits_total", "Lookups answered by the in-process cache.", ("cache",),
+                     _cache_stat("hits")))
+register(CounterFunc("tracelet_cache_misses_total", "Lookups the in-process cache couldn't answer.", ("cache",),
+                     _cache_stat("misses")))
+register(GaugeFunc("tracelet_cache_hit_ratio", "Hits / lookups since the worker started.", ("cache",),
+                   _cache_stat("hit_rate")))
+register(GaugeFunc("tracelet_cache_entries", "Entries in the in-process cache.", ("cache",),
+                   _cache_stat("size")))
@@ -1,8 +1,8 @@
 # app / models
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Index
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import BigInteger, Column, String, DateTime, ForeignKey, Index, Integer, func
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 from app.db import Base
 
@@ -18,8 +18,9 @@ class Entity(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     type = Column(String, nullable=False, index=True)
     external_id = Column(String, unique=True, nullable=False, index=True)
-    extra_data = Column(JSON, nullable=True)
-    created_at = Column(DateTime(timezone=True), default=utc_now)
+    extra_data = Column(JSONB, nullable=True)
+    # never NULL: keyset pagination seeks on (created_at, id); rows inserted by SQL get the server default
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now, server_default=func.now())
 
     # Relationships
     events = relationship(
@@ -43,17 +44,30 @@ class Entity(Base):
     def __repr__(self):
         return f"<Entity(id={self.id}, type={self.type}, external_id={self.external_id})>"
 
+    # Keyset pagination walks (created_at, id); listings filtered by type (e.g. packages) use the second one.
+    # The GIN index serves extra_data containment filters (extra_data @> '{"destination": "..."}')
+    __table_args__ = (
+        Index('idx_entities_created_id', 'created_at', 'id'),
+        Index('idx_entities_type_created_id', 'type', 'created_at', 'id'),
+        Index('idx_entities_extra_data', 'extra_data', postgresql_using='gin',
+              postgresql_ops={'extra_data': 'jsonb_path_ops'}),
+    )
+
 
 class Event(Base):
+    """
+    Append-only event log, range-partitioned by month on `timestamp` (see app/partitions.py).
+    The partition key has to be part of the primary key, hence (id, timestamp).
+    """
     __tablename__ = "events"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    entity_id = Column(UUID(as_uuid=True), ForeignKey("entities.id"), nullable=False, index=True)
-    event_type = Column(String, nullable=False, index=True)
+    entity_id = Column(UUID(as_uuid=True), ForeignKey("entities.id"), nullable=False)
+    event_type = Column(String, nullable=False)
     location = Column(String, nullable=True)
     actor = Column(String, nullable=True)
-    payload = Column(JSON, nullable=True)
-    timestamp = Column(DateTime(timezone=True), default=utc_now, index=True)
+    payload = Column(JSONB, nullable=True)
+    timestamp = Column(DateTime(timezone=True), primary_key=True, default=utc_now)
 
     # Relationship
     entity = relationship("Entity", back_populates="events")
@@ -61,6 +75,37 @@ class Event(Base):
     def __repr__(self):
         return f"<Event(id={self.id}, type={self.event_type}, entity_id={self.entity_id})>"
 
+    # Indexes are created per partition, composite ones replace the old single-column indexes:
+    # keyset pagination over all events / one entity's history, type filters by time, payload containment
+    __table_args__ = (
+        Index('idx_events_timestamp_id', 'timestamp', 'id'),
+        Index('idx_events_entity_timestamp_id', 'entity_id', 'timestamp', 'id'),
+        Index('idx_events_type_timestamp', 'event_type', 'timestamp'),
+        Index('idx_events_payload', 'payload', postgresql_using='gin', postgresql_ops={'payload': 'jsonb_path_ops'}),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
+
+
+class EventIdempotencyKey(Base):
+    """
+    Idempotency key of every recently ingested event (see app/idempotency.py). A table of its own: a unique
+    index on the partitioned events table would have to include the timestamp, which differs between retries.
+    """
+    __tablename__ = "event_idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    event_id = Column(UUID(as_uuid=True), nullable=False)
+    event_timestamp = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+
+    def __repr__(self):
+        return f"<EventIdempotencyKey(key={self.key}, event_id={self.event_id})>"
+
+    # expired keys are purged by age
+    __table_args__ = (
+        Index('idx_event_idempotency_keys_created', 'created_at'),
+    )
+
 
 class EntityLink(Base):
     __tablename__ = "entity_links"
@@ -79,4 +124,48 @@ class EntityLink(Base):
     # Add index for faster lookups
     __table_args__ = (
         Index('idx_parent_child', 'parent_id', 'child_id'),
-    )
\ No newline at end of file
+    )
+
+
+class EntityClosure(Base):
+    """
+    Transitive closure of entity_links: one row per (ancestor, descendant, depth) with the number of distinct
+    link paths of that length. Maintained with the links when ENTITY_CLOSURE is on, see app/closure.py.
+    """
+    __tablename__ = "entity_closure"
+
+    ancestor_id = Column(UUID(as_uuid=True), ForeignKey("entities.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(UUID(as_uuid=True), ForeignKey("entities.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, primary_key=True)
+    paths = Column(BigInteger, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"<EntityClosure(ancestor={self.ancestor_id}, descendant={self.descendant_id}, depth={self.depth})>"
+
+    # the primary key serves "everything under X"; this one "what is X in"
+    __table_args__ = (
+        Index('idx_entity_closure_descendant', 'descendant_id', 'depth'),
+    )
+
+
+class EntityStatus(Base):
+    """
+    Current-state projection of an entity (latest status, location, event count).
+    Maintained in the same transaction as the events that change it, see app/projections.py.
+    """
+    __tablename__ = "entity_status"
+
+    entity_id = Column(UUID(as_uuid=True), ForeignKey("entities.id", ondelete="CASCADE"), primary_key=True)
+    entity_type = Column(String, nullable=False)
+    current_status = Column(String, nullable=False, default="created")
+    current_location = Column(String, nullable=True)
+    last_updated = Column(DateTime(timezone=True), nullable=True)
+    event_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EntityStatus(entity_id={self.entity_id}, status={self.current_status}, events={self.event_count})>"
+
+    # Status filtering and dashboard stats group by (type, status)
+    __table_args__ = (
+        Index('idx_entity_status_type_status', 'entity_type', 'current_status'),
+    )
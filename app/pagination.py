@@ -0,0 +1,66 @@
+# app / pagination
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Keyset pagination: a cursor encodes the (timestamp, id) of the last row of a page and the next
+# page starts strictly after it. Unlike OFFSET the database seeks straight to that position through
+# a composite (timestamp, id) index, so every page costs the same no matter how deep it is.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# The cursor travels in a response header, not the body (listings stay plain JSON arrays). Paginated routes
+# declare it with responses=NEXT_CURSOR_RESPONSES so it shows up in the OpenAPI schema.
+NEXT_CURSOR_RESPONSES = {
+    200: {
+        "headers": {
+            NEXT_CURSOR_HEADER: {
+                "description": "Pass back as `cursor` to get the next page. Only sent when this page is full.",
+                "schema": {"type": "string"},
+            },
+        },
+    },
+}
+
+
+def encode_cursor(timestamp: datetime, row_id: UUID) -> str:
+    raw = json.dumps([timestamp.isoformat(), str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def after_cursor(cursor: str, timestamp_col, id_col, descending: bool = True):
+    """WHERE clause selecting the rows that come after `cursor` in (timestamp_col, id_col) order."""
+    timestamp, row_id = decode_cursor(cursor)
+    if descending:
+        return tuple_(timestamp_col, id_col) < tuple_(timestamp, row_id)
+    return tuple_(timestamp_col, id_col) > tuple_(timestamp, row_id)
+
+
+def set_next_cursor(response: Optional[Response], page: list, limit: int, timestamp_attr: str,
+                    id_attr: str = "id") -> Optional[str]:
+    """
+    Expose the cursor of the following page in the X-Next-Cursor header when this page is full, and return
+    it. Without a response (in-process callers such as websql's local backend, which only shows the first
+    page) nothing carries the cursor onwards: a caller that pages must pass one and read the header.
+    """
+    if len(page) < limit:
+        return None
+    last = page[-1]
+    next_cursor = encode_cursor(getattr(last, timestamp_attr), getattr(last, id_attr))
+    if response is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return next_cursor
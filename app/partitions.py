@@ -0,0 +1,119 @@
+# app / partitions
+
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from app.settings import settings
+
+logger = logging.getLogger("tracelet.partitions")
+
+# events is range-partitioned by month on `timestamp`: events_2026_01, events_2026_02, ...
+# events_default catches rows outside every monthly range so an insert can never fail on a
+# missing partition; it should stay empty as long as future partitions are created in time.
+PARENT_TABLE = "events"
+DEFAULT_PARTITION = "events_default"
+_PARTITION_RE = re.compile(r"^events_(\d{4})_(\d{2})$")
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(start: date) -> str:
+    return f"{PARENT_TABLE}_{start:%Y_%m}"
+
+
+def _monthly(names: List[str]) -> List[Tuple[str, date]]:
+    out = []
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        if match:
+            out.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(out, key=lambda item: item[1])
+
+
+def list_event_partitions(conn: Connection) -> List[Tuple[str, date]]:
+    """Monthly partitions currently attached to events as (name, month start), oldest first."""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent"
+    ), {"parent": PARENT_TABLE}).scalars().all()
+    return _monthly(rows)
+
+
+def ensure_event_partitions(conn: Connection, months_ahead: Optional[int] = None,
+                            start: Optional[date] = None) -> List[str]:
+    """
+    Create the monthly partitions from `start` (default: this month) up to `months_ahead`
+    months in the future, plus the default partition. Idempotent; returns the names created.
+    """
+    if months_ahead is None:
+        months_ahead = settings.EVENT_PARTITION_MONTHS_AHEAD
+    today = datetime.now(timezone.utc).date()
+    first = month_start(start or today)
+    last = add_months(month_start(today), months_ahead)
+
+    existing = {name for name, _ in list_event_partitions(conn)}
+    created = []
+    current = first
+    while current <= last:
+        name = partition_name(current)
+        if name not in existing:
+            upper = add_months(current, 1)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{current.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            created.append(name)
+        current = add_months(current, 1)
+
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+    if created:
+        logger.info(f"Created event partitions: {', '.join(created)}")
+    return created
+
+
+def list_detached_partitions(conn: Connection) -> List[Tuple[str, date]]:
+    """
+    Standalone events_YYYY_MM tables, i.e. monthly partitions detached earlier (by a retention run that
+    stopped before archiving or dropping them, or one run with --no-drop), oldest first.
+    """
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_class c "
+        "WHERE c.relkind = 'r' AND c.relnamespace = 'public'::regnamespace "
+        "AND NOT c.relispartition AND c.relname LIKE :pattern"
+    ), {"pattern": f"{PARENT_TABLE}\\_%"}).scalars().all()
+    return _monthly(rows)
+
+
+def _before_window(partitions: List[Tuple[str, date]], keep_months: int) -> List[str]:
+    cutoff = add_months(month_start(datetime.now(timezone.utc).date()), -keep_months)
+    return [name for name, start in partitions if add_months(start, 1) <= cutoff]
+
+
+def partitions_older_than(conn: Connection, keep_months: int) -> List[str]:
+    """Monthly partitions that lie entirely before the retention window of `keep_months`."""
+    return _before_window(list_event_partitions(conn), keep_months)
+
+
+def detached_older_than(conn: Connection, keep_months: int) -> List[str]:
+    """Detached monthly partitions that lie entirely before the retention window of `keep_months`."""
+    return _before_window(list_detached_partitions(conn), keep_months)
+
+
+def detach_partition(conn: Connection, name: str) -> None:
+    """Detach a monthly partition; it becomes a standalone table that no query on events touches."""
+    if not _PARTITION_RE.match(name):
+        raise ValueError(f"Not an event partition: {name}")
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+    logger.info(f"Detached partition {name}")
@@ -0,0 +1,136 @@
+# app / projections
+
+import logging
+from typing import Any, Iterable, Mapping, Optional
+from uuid import UUID
+from sqlalchemy import case, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+
+logger = logging.getLogger("tracelet.projections")
+
+DEFAULT_STATUS = "created"
+
+
+def init_entity_status(db: AsyncSession, entity: models.Entity) -> None:
+    """
+    Add the projection row for a freshly created entity (flushed, not committed).
+    """
+    db.add(models.EntityStatus(
+        entity_id=entity.id,
+        entity_type=entity.type,
+        current_status=DEFAULT_STATUS,
+        event_count=0,
+    ))
+
+
+def event_fields(ev: models.Event) -> dict:
+    """The event columns the projection cares about, as accepted by apply_events()."""
+    return {
+        "entity_id": ev.entity_id,
+        "event_type": ev.event_type,
+        "location": ev.location,
+        "timestamp": ev.timestamp,
+    }
+
+
+async def apply_events(db: AsyncSession, events: Iterable[Mapping[str, Any]], entity_types: Mapping[UUID, str]) -> None:
+    """
+    Fold newly inserted events into entity_status with a single upsert.
+
+    `events` are mappings with entity_id, event_type, location and timestamp (see event_fields()).
+    `entity_types` maps entity_id -> entity type, used when the projection row does not
+    exist yet. Events are aggregated per entity first, so one statement covers any batch size.
+    """
+    latest = {}
+    counts = {}
+    for ev in events:
+        entity_id = ev["entity_id"]
+        counts[entity_id] = counts.get(entity_id, 0) + 1
+        current = latest.get(entity_id)
+        if current is None or ev["timestamp"] >= current["timestamp"]:
+            latest[entity_id] = ev
+    if not latest:
+        return
+
+    rows = [
+        {
+            "entity_id": entity_id,
+            "entity_type": entity_types[entity_id],
+            "current_status": ev["event_type"],
+            "current_location": ev["location"],
+            "last_updated": ev["timestamp"],
+            "event_count": counts[entity_id],
+        }
+        for entity_id, ev in latest.items()
+    ]
+
+    table = models.EntityStatus.__table__
+    stmt = insert(table).values(rows)
+    # only move status/location forward if the incoming event is not older than what we have
+    is_newer = (table.c.last_updated.is_(None)) | (stmt.excluded.last_updated >= table.c.last_updated)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.entity_id],
+        set_={
+            "current_status": case((is_newer, stmt.excluded.current_status), else_=table.c.current_status),
+            "current_location": case((is_newer, stmt.excluded.current_location), else_=table.c.current_location),
+            "last_updated": func.greatest(table.c.last_updated, stmt.excluded.last_updated),
+            "event_count": table.c.event_count + stmt.excluded.event_count,
+        },
+    )
+    await db.execute(stmt)
+
+
+_REBUILD_SQL = """
+WITH latest AS (
+    SELECT DISTINCT ON (entity_id) entity_id, event_type, location, timestamp
+    FROM events
+    {events_filter}
+    ORDER BY entity_id, timestamp DESC
+),
+counts AS (
+    SELECT entity_id, count(*) AS n
+    FROM events
+    {events_filter}
+    GROUP BY entity_id
+)
+INSERT INTO entity_status (entity_id, entity_type, current_status, current_location, last_updated, event_count)
+SELECT e.id, e.type, COALESCE(latest.event_type, :default_status), latest.location, latest.timestamp, COALESCE(counts.n, 0)
+FROM entities e
+LEFT JOIN latest ON latest.entity_id = e.id
+LEFT JOIN counts ON counts.entity_id = e.id
+{entities_filter}
+ON CONFLICT (entity_id) DO UPDATE SET
+    entity_type = excluded.entity_type,
+    current_status = excluded.current_status,
+    current_location = excluded.current_location,
+    last_updated = excluded.last_updated,
+    event_count = excluded.event_count
+"""
+
+
+async def refresh_entity_status(db: AsyncSession, entity_id: UUID) -> None:
+    """
+    Recompute the projection of one entity from its events (e.g. after an event was deleted).
+    """
+    sql = _REBUILD_SQL.format(
+        events_filter="WHERE entity_id = :entity_id",
+        entities_filter="WHERE e.id = :entity_id",
+    )
+    await db.execute(text(sql), {"entity_id": entity_id, "default_status": DEFAULT_STATUS})
+
+
+async def rebuild_entity_status(db: AsyncSession, entity_type: Optional[str] = None) -> int:
+    """
+    Recompute the whole projection from the events table. Returns the number of rows written.
+    """
+    params = {"default_status": DEFAULT_STATUS}
+    entities_filter = ""
+    if entity_type:
+        entities_filter = "WHERE e.type = :entity_type"
+        params["entity_type"] = entity_type
+    sql = _REBUILD_SQL.format(events_filter="", entities_filter=entities_filter)
+    result = await db.execute(text(sql), params)
+    logger.info(f"Rebuilt entity_status projection: {result.rowcount} rows")
+    return result.rowcount
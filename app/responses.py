@@ -0,0 +1,47 @@
+# app / responses
+
+from typing import Any, Optional, Type
+from uuid import UUID
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+# Listing endpoints select plain columns and return them through ORJSONResponse, instead of loading ORM
+# objects that FastAPI validates one by one against the response_model (from_attributes) and serializes
+# again. orjson encodes UUIDs and datetimes natively; with OPT_UTC_Z the output is the same JSON the
+# response models produce. The routes keep their response_model, for the OpenAPI schema.
+
+
+def _default(obj: Any) -> Any:
+    # asyncpg hands out its own UUID subclass, which orjson only encodes through this hook
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError
+
+
+def dumps(content: Any, option: int = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) -> bytes:
+    return orjson.dumps(content, default=_default, option=option)
+
+
+class ORJSONResponse(JSONResponse):
+    option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content, self.option)
+
+
+class ORJSONOffsetResponse(ORJSONResponse):
+    """UTC timestamps as "+00:00", like jsonable_encoder writes them (routes without a response_model)."""
+    option = orjson.OPT_NON_STR_KEYS
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200,
+                  response_class: Type[ORJSONResponse] = ORJSONResponse) -> ORJSONResponse:
+    """
+    Encode `content` as is. FastAPI drops the headers set on the injected `response` (e.g. X-Next-Cursor)
+    when a route returns its own Response, so they are carried over here.
+    """
+    out = response_class(content, status_code=status_code)
+    if response is not None:
+        out.headers.raw.extend(response.headers.raw)
+    return out
@@ -1,11 +1,17 @@
 # app/routes/entities.py
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from uuid import UUID
 from typing import List, Optional
 from app import models, schemas, db
+from app.cache import entity_cache
+from app.pagination import NEXT_CURSOR_RESPONSES
+from app.responses import json_response
+from app.search import containment
+from app.services import entities as entity_service
 
 logger = logging.getLogger("tracelet.entities")
 
@@ -13,92 +19,89 @@ router = APIRouter(tags=["Entities"])
 
 
 @router.post("/", response_model=schemas.EntityRead, status_code=201)
-def create_entity(entity: schemas.EntityCreate, db: Session = Depends(db.get_db)):
-    try:
-        # Normalize type to string (handle Enum or plain string)
-        type_value = entity.type.value.lower() if hasattr(entity.type, "value") else str(entity.type).lower()
-
-        # Defensive external_id handling: only use id if it's not None
-        external_id = (entity.external_id or (str(entity.id) if entity.id is not None else None) or "").strip()
-        if not external_id:
-            raise HTTPException(status_code=400, detail="external_id (or id) is required")
-
-        existing = db.query(models.Entity).filter(models.Entity.external_id == external_id).first()
-        if existing:
-            raise HTTPException(status_code=400, detail=f"Entity with external_id '{external_id}' already exists")
-
-        db_entity = models.Entity(type=type_value, external_id=external_id, extra_data=entity.extra_data or {})
-
-        # Use explicit commit instead of starting a new transaction with db.begin()
-        db.add(db_entity)
-        try:
-            db.commit()
-            db.refresh(db_entity)
-        except IntegrityError:
-            # rollback and convert to HTTP 400
-            try:
-                db.rollback()
-            except Exception:
-                logger.debug("rollback failed or not needed")
-            logger.exception("IntegrityError creating entity")
-            raise HTTPException(status_code=400, detail="Database integrity error when creating entity")
-        except Exception:
-            try:
-                db.rollback()
-            except Exception:
-                logger.debug("rollback failed or not needed")
-            logger.exception("Unhandled exception creating entity (commit/refresh)")
-            raise HTTPException(status_code=500, detail="Internal server error creating entity")
-
-        logger.info(f"Created entity {db_entity.id} ({external_id}) of type '{type_value}'")
-        return db_entity
-
-    except HTTPException:
-        # propagate expected HTTP errors
-        raise
-    except Exception:
-        # any other unexpected error
-        try:
-            db.rollback()
-        except Exception:
-            logger.debug("rollback failed or not needed")
-        logger.exception("Unhandled exception creating entity (outer)")
-        raise HTTPException(status_code=500, detail="Internal server error creating entity")
-
-
-@router.get("/", response_model=List[schemas.EntityRead])
-def list_entities(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
-                  q: Optional[str] = None, type: Optional[str] = None,
-                  db: Session = Depends(db.get_db)):
-    qset = db.query(models.Entity)
-
-    if type:
-        try:
-            type_enum = schemas.EntityType(type.lower())
-            qset = qset.filter(models.Entity.type == type_enum.value)
-        except ValueError:
-            raise HTTPException(status_code=400, detail=f"Invalid entity type '{type}'")
-
-    if q:
-        qset = qset.filter(
-            (models.Entity.external_id.ilike(f"%{q}%")) |
-            (models.Entity.type.ilike(f"%{q}%"))
-        )
-
-    return qset.order_by(models.Entity.created_at.desc()).offset(skip).limit(limit).all()
+async def create_entity(entity: schemas.EntityCreate, db: AsyncSession = Depends(db.get_async_db)):
+    return await entity_service.create_entity(db, entity)
+
+
+@router.get("/", response_model=List[schemas.EntityRead], responses=NEXT_CURSOR_RESPONSES)
+async def list_entities(response: Response, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
+                        q: Optional[str] = None, type: Optional[str] = None,
+                        cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+                        extra: Optional[str] = Query(None, description='JSON object extra_data must contain, '
+                                                                       'e.g. {"destination": "Berlin"}'),
+                        sender: Optional[str] = None, recipient: Optional[str] = None,
+                        destination: Optional[str] = None,
+                        db: AsyncSession = Depends(db.get_async_db)):
+    """
+    List entities, newest first. Pass the X-Next-Cursor response header back as `cursor` to
+    fetch the next page (the header is only sent when the page is full, the body stays a plain list);
+    `skip` is only applied when no cursor is given.
+    `sender`, `recipient` and `destination` are exact matches on those extra_data keys, combined with `extra`.
+    """
+    extra_data = containment(extra, "extra", sender=sender, recipient=recipient, destination=destination)
+    rows = await entity_service.list_entities(db, skip=skip, limit=limit, q=q, type=type, cursor=cursor,
+                                              extra_data=extra_data, response=response)
+    return json_response(rows, response)
+
+
+@router.get("/search", response_model=List[schemas.EntitySearchResult])
+async def search_entities(q: str = Query(..., min_length=1, description="Part of a tracking number, sender, recipient, destination or location"),
+                          type: Optional[str] = None, limit: int = Query(20, ge=1, le=100),
+                          db: AsyncSession = Depends(db.get_async_db)):
+    """
+    Ranked search over entities: exact tracking number first, then tracking numbers starting with `q`,
+    then the closest matches on tracking number, sender, recipient, destination and current location.
+    Every field is served by a pg_trgm index, so partial matches don't scan the table.
+    """
+    return await entity_service.search_entities(db, q, type=type, limit=limit)
 
 
 @router.get("/{entity_id}", response_model=schemas.EntityRead)
-def get_entity(entity_id: UUID, db: Session = Depends(db.get_db)):
-    entity = db.query(models.Entity).filter_by(id=entity_id).first()
+async def get_entity(entity_id: UUID, db: AsyncSession = Depends(db.get_async_db)):
+    entity = await db.get(models.Entity, entity_id)
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
     return entity
 
 
-@router.get("/external/{external_id}", response_model=schemas.EntityRead)
-def get_entity_by_external_id(external_id: str, db: Session = Depends(db.get_db)):
-    entity = db.query(models.Entity).filter_by(external_id=external_id).first()
+@router.patch("/{entity_id}", response_model=schemas.EntityRead)
+async def update_entity(entity_id: UUID, changes: schemas.EntityUpdate, db: AsyncSession = Depends(db.get_async_db)):
+    entity = await db.get(models.Entity, entity_id)
     if not entity:
-        raise HTTPException(status_code=404, detail=f"Entity with external_id '{external_id}' not found")
+        raise HTTPException(status_code=404, detail="Entity not found")
+
+    old_external_id = entity.external_id
+    fields = changes.model_dump(exclude_unset=True)
+    if fields.get("type") is not None:
+        entity.type = changes.type.value
+        # entity_status carries the type for status/stat queries, keep it in step
+        await db.execute(
+            update(models.EntityStatus)
+            .where(models.EntityStatus.entity_id == entity_id)
+            .values(entity_type=entity.type)
+        )
+    if fields.get("external_id"):
+        entity.external_id = changes.external_id.strip()
+    if "extra_data" in fields:
+        entity.extra_data = changes.extra_data or {}
+
+    try:
+        await db.commit()
+        await db.refresh(entity)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Entity with external_id '{changes.external_id}' already exists")
+    except Exception:
+        await db.rollback()
+        logger.exception("Unhandled exception updating entity")
+        raise HTTPException(status_code=500, detail="Internal server error updating entity")
+
+    entity_cache.invalidate(old_external_id)
+    entity_cache.invalidate(entity.external_id)
+    logger.info(f"Updated entity {entity.id} ({entity.external_id}): {', '.join(fields) or 'no changes'}")
     return entity
+
+
+@router.get("/external/{external_id}", response_model=schemas.EntityRead)
+async def get_entity_by_external_id(external_id: str, db: AsyncSession = Depends(db.get_async_db)):
+    return await entity_service.get_entity_by_external_id(db, external_id)
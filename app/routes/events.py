@@ -1,97 +1,373 @@
 # app/routes/events.py
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
+import asyncio
+import csv
+import io
+import json
+import logging
+import uuid
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Text, cast, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
-from typing import List, Optional
+from typing import Any, List, Optional
 from app import models, schemas, db
+from app.cache import cache_entity, entity_cache
+from app.feed import Subscription, event_feed
+from app.idempotency import event_key
+from app.models import utc_now
+from app.pagination import NEXT_CURSOR_RESPONSES, after_cursor, set_next_cursor
+from app.projections import refresh_entity_status
+from app.responses import dumps, json_response
+from app.search import containment
+from app.services import events as event_service
+from app.settings import settings
+
+logger = logging.getLogger("tracelet.events")
 
 router = APIRouter(tags=["Events"])
 
+MAX_BULK_EVENTS = 10000
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+EXPORT_BATCH_ROWS = 2000
+EXPORT_COLUMNS = ("id", "entity_id", "event_type", "location", "actor", "timestamp", "payload")
+
+
+async def read_bulk_items(request: Request) -> List[Any]:
+    """
+    Parse a bulk upload body: a JSON array (or {"events": [...]}) or NDJSON, one event per line.
+    Lines that are not valid JSON are kept as exceptions so they can be reported per item.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_CONTENT_TYPES:
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(e)
+    else:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if isinstance(data, dict):
+            data = data.get("events")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        items = data
+
+    if len(items) > MAX_BULK_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_EVENTS} events per request")
+    return items
+
 
 @router.post("/", response_model=schemas.EventRead, status_code=201)
-def create_event(event: schemas.EventCreate, db: Session = Depends(db.get_db)):
-    # ensure the referenced entity exists
-    entity = db.query(models.Entity).filter(models.Entity.id == event.entity_id).first()
-    if not entity:
-        raise HTTPException(status_code=404, detail="Entity not found")
-
-    # normalize event_type whether it's an Enum or a string
-    event_type_value = event.event_type.value if hasattr(event.event_type, "value") else str(event.event_type)
-
-    db_event = models.Event(
-        entity_id=event.entity_id,
-        event_type=event_type_value,
-        location=event.location,
-        actor=event.actor,
-        payload=event.payload
-    )
+async def create_event(event: schemas.EventCreate, response: Response,
+                       idempotency_key: Optional[str] = Header(None, max_length=200),
+                       db: AsyncSession = Depends(db.get_async_db)):
+    """
+    Record an event. Retries carrying the same Idempotency-Key header (or `idempotency_key` field), or
+    without one, the same scan (entity, type, location, actor, payload) within IDEMPOTENCY_WINDOW seconds
+    of the stored one, return the original event with an Idempotent-Replayed: true header instead of storing it again.
+    """
+    return await event_service.create_event(db, event, idempotency_key=idempotency_key, response=response)
 
-    # Use explicit commit/rollback instead of nested transactions
-    db.add(db_event)
-    try:
-        db.commit()
-        db.refresh(db_event)
-    except IntegrityError:
+
+@router.post("/bulk", response_model=schemas.EventBulkResponse)
+async def create_events_bulk(items: List[Any] = Depends(read_bulk_items),
+                             db: AsyncSession = Depends(db.get_async_db)):
+    """
+    Ingest many scans at once (JSON array or NDJSON with Content-Type: application/x-ndjson).
+
+    Each item is an EventCreate that references its entity by `entity_id` or `external_id`.
+    Entities are resolved with one query, valid events are written with a multi-row INSERT in a
+    single transaction, and the response reports the outcome of every item by its index.
+    Repeated scans (same `idempotency_key`, or same scan and payload within IDEMPOTENCY_WINDOW) are reported as
+    "duplicate" with the id of the event stored first.
+    """
+    results: List[Optional[schemas.EventBulkResult]] = [None] * len(items)
+    valid = []
+    for index, raw in enumerate(items):
+        if isinstance(raw, Exception):
+            results[index] = schemas.EventBulkResult(index=index, status="error", error=f"Invalid JSON: {raw}")
+            continue
         try:
-            db.rollback()
-        except Exception:
-            pass
-        raise HTTPException(status_code=400, detail="Database integrity error when creating event")
+            valid.append((index, schemas.EventBulkItem.model_validate(raw)))
+        except ValidationError as e:
+            err = e.errors()[0]
+            loc = ".".join(str(part) for part in err.get("loc", ()))
+            results[index] = schemas.EventBulkResult(index=index, status="error",
+                                                     error=f"{loc}: {err['msg']}" if loc else err["msg"])
+
+    # resolve every referenced entity: cached external_ids first, the rest in one set-based query
+    by_id, by_external_id = {}, {}
+    ids = {item.entity_id for _, item in valid if item.entity_id}
+    external_ids = set()
+    for _, item in valid:
+        if item.entity_id:
+            continue
+        cached = entity_cache.get(item.external_id)
+        if cached is not None:
+            by_id[cached.id] = cached.type
+            by_external_id[cached.external_id] = cached.id
+        else:
+            external_ids.add(item.external_id)
+    ids -= by_id.keys()
+    conditions = []
+    if ids:
+        conditions.append(models.Entity.id.in_(ids))
+    if external_ids:
+        conditions.append(models.Entity.external_id.in_(external_ids))
+    if conditions:
+        found = (await db.scalars(select(models.Entity).where(or_(*conditions)))).all()
+        for entity in found:
+            by_id[entity.id] = entity.type
+            by_external_id[entity.external_id] = entity.id
+            cache_entity(entity)
+
+    keyed = []
+    for index, item in valid:
+        entity_id = item.entity_id or by_external_id.get(item.external_id)
+        if entity_id not in by_id:
+            results[index] = schemas.EventBulkResult(index=index, status="error", entity_id=item.entity_id,
+                                                     error="Entity not found")
+            continue
+        now = utc_now()
+        key = event_key(entity_id, item.event_type.value, item.location, item.actor, item.payload,
+                        client_key=item.idempotency_key)
+        keyed.append((index, key, {
+            "id": uuid.uuid4(),
+            "entity_id": entity_id,
+            "event_type": item.event_type.value,
+            "location": item.location,
+            "actor": item.actor,
+            "payload": item.payload,
+            "timestamp": now,
+        }))
+
+    try:
+        stored = await event_service.store_events(db, [(key, row) for _, key, row in keyed], by_id)
     except Exception as e:
-        try:
-            db.rollback()
-        except Exception:
-            pass
-        raise HTTPException(status_code=500, detail=f"Error creating event: {str(e)}")
+        logger.exception("Bulk event insert failed")
+        raise HTTPException(status_code=500, detail=f"Error creating events: {str(e)}")
+    for (index, _, _), (status, event) in zip(keyed, stored):
+        results[index] = schemas.EventBulkResult(index=index, status=status, event_id=event["id"],
+                                                 entity_id=event["entity_id"])
+
+    created = sum(1 for status, _ in stored if status == "created")
+    duplicates = len(stored) - created
+    failed = len(items) - len(stored)
+    logger.info(f"Bulk ingested {created} events ({duplicates} duplicates, {failed} rejected)")
+    return {"created": created, "duplicates": duplicates, "failed": failed, "results": results}
+
+
+@router.get("/entity/{entity_id}", response_model=List[schemas.EventRead], responses=NEXT_CURSOR_RESPONSES)
+async def get_entity_events(entity_id: UUID, response: Response, skip: int = 0, limit: int = 100,
+                            cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+                            db: AsyncSession = Depends(db.get_async_db)):
+    """
+    An entity's history, oldest first. Follow the X-Next-Cursor response header with `cursor` for the
+    next page (only sent when the page is full).
+    """
+    rows = await event_service.list_entity_events(db, entity_id, skip=skip, limit=limit, cursor=cursor,
+                                                  response=response)
+    return json_response(rows, response)
+
+
+async def stream_export(stmt, fmt: str):
+    """
+    Yield an export chunk per fetched batch. Rows come off a server-side cursor as plain tuples
+    (payload already as JSON text), so memory stays flat regardless of how many rows match.
+    """
+    # own session: the stream outlives the request handler that created the response
+    async with db.AsyncSessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_ROWS))
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            async for rows in result.partitions():
+                for event_id, entity_id, event_type, location, actor, timestamp, payload in rows:
+                    writer.writerow((event_id, entity_id, event_type, location, actor,
+                                     timestamp.isoformat() if timestamp else None, payload))
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+            return
+
+        async for rows in result.partitions():
+            lines = []
+            for event_id, entity_id, event_type, location, actor, timestamp, payload in rows:
+                head = json.dumps({
+                    "id": str(event_id),
+                    "entity_id": str(entity_id),
+                    "event_type": event_type,
+                    "location": location,
+                    "actor": actor,
+                    "timestamp": timestamp.isoformat() if timestamp else None,
+                })
+                # splice the stored JSON text in as-is instead of parsing and re-encoding it
+                lines.append(f'{head[:-1]}, "payload": {payload or "null"}}}\n')
+            yield "".join(lines)
 
-    return db_event
 
+@router.get("/export")
+async def export_events(
+        format: str = Query("ndjson", enum=["ndjson", "csv"]),
+        entity_id: Optional[UUID] = None,
+        event_type: Optional[schemas.PackageStatus] = None,
+        location: Optional[str] = None,
+        payload: Optional[str] = Query(None, description="JSON object the payload must contain"),
+        since: Optional[datetime] = Query(None, description="Only events at or after this time"),
+        until: Optional[datetime] = Query(None, description="Only events before this time"),
+):
+    """
+    Stream the full (optionally filtered) event history as NDJSON or CSV, oldest first.
+    """
+    stmt = select(
+        models.Event.id, models.Event.entity_id, models.Event.event_type, models.Event.location,
+        models.Event.actor, models.Event.timestamp, cast(models.Event.payload, Text),
+    )
+    if entity_id:
+        stmt = stmt.where(models.Event.entity_id == entity_id)
+    if event_type:
+        stmt = stmt.where(models.Event.event_type == event_type.value)
+    if location:
+        stmt = stmt.where(models.Event.location.ilike(f"%{location}%"))
+    wanted = containment(payload, "payload")
+    if wanted:
+        stmt = stmt.where(models.Event.payload.contains(wanted))
+    if since:
+        stmt = stmt.where(models.Event.timestamp >= since)
+    if until:
+        stmt = stmt.where(models.Event.timestamp < until)
+    stmt = stmt.order_by(models.Event.timestamp, models.Event.id)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_export(stmt, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=events.{format}"},
+    )
 
-@router.get("/entity/{entity_id}", response_model=List[schemas.EventRead])
-def get_entity_events(entity_id: UUID, skip: int = 0, limit: int = 100, db: Session = Depends(db.get_db)):
-    entity = db.query(models.Entity).filter(models.Entity.id == entity_id).first()
-    if not entity:
-        raise HTTPException(status_code=404, detail="Entity not found")
 
-    events = db.query(models.Event).filter(models.Event.entity_id == entity_id) \
-        .order_by(models.Event.timestamp) \
-        .offset(skip).limit(limit).all()
-    return events
+async def stream_feed(subscription: Subscription):
+    """
+    Server-sent events of one feed subscription: an `event` message per new event (id = event id, data =
+    the event as JSON), everything already queued in one chunk, and a comment line when idle.
+    """
+    try:
+        yield ": subscribed\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.EVENT_FEED_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            events = [event]
+            while event is not None and not subscription.queue.empty():
+                event = subscription.queue.get_nowait()
+                events.append(event)
+            chunk = "".join(f"id: {ev['id']}\nevent: event\ndata: {dumps(ev).decode()}\n\n"
+                            for ev in events if ev is not None)
+            if events[-1] is None:
+                if subscription.dropped:
+                    chunk += 'event: dropped\ndata: {"reason": "client too slow, reconnect"}\n\n'
+                yield chunk
+                return
+            yield chunk
+    finally:
+        event_feed.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def stream_events(entity_id: Optional[UUID] = None,
+                        event_type: Optional[schemas.PackageStatus] = None,
+                        location: Optional[str] = None):
+    """
+    Live feed of events as they are committed (text/event-stream), instead of polling the listings.
+    Filter by `entity_id`, `event_type` and `location` (substring). Only events written through this
+    worker are seen. A client that falls EVENT_FEED_QUEUE_SIZE events behind gets a `dropped` message and
+    the stream ends; reconnect and fill the gap from GET /events with `since`.
+    """
+    subscription = event_feed.subscribe(entity_id=entity_id, event_type=event_type.value if event_type else None,
+                                        location=location)
+    return StreamingResponse(
+        stream_feed(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{event_id}", response_model=schemas.EventRead)
-def get_event(event_id: UUID, db: Session = Depends(db.get_db)):
-    event = db.query(models.Event).filter_by(id=event_id).first()
+async def get_event(event_id: UUID, db: AsyncSession = Depends(db.get_async_db)):
+    event = await db.scalar(select(models.Event).filter_by(id=event_id))
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
 
 
-@router.get("/", response_model=List[schemas.EventRead])
-def list_events(skip: int = 0, limit: int = 100,
-                event_type: Optional[schemas.PackageStatus] = None,
-                location: Optional[str] = None,
-                db: Session = Depends(db.get_db)):
-    qset = db.query(models.Event)
+@router.get("/", response_model=List[schemas.EventRead], responses=NEXT_CURSOR_RESPONSES)
+async def list_events(response: Response, skip: int = 0, limit: int = 100,
+                      event_type: Optional[schemas.PackageStatus] = None,
+                      location: Optional[str] = None,
+                      payload: Optional[str] = Query(None, description='JSON object the payload must contain, '
+                                                                       'e.g. {"note": "Package created"}'),
+                      since: Optional[datetime] = Query(None, description="Only events at or after this time"),
+                      until: Optional[datetime] = Query(None, description="Only events before this time"),
+                      cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+                      db: AsyncSession = Depends(db.get_async_db)):
+    """
+    List events, newest first. Follow the X-Next-Cursor response header with `cursor` for the next page
+    (only sent when the page is full).
+    Bounding the time range with `since`/`until` limits the scan to the matching monthly partitions.
+    """
+    qset = select(*event_service.EVENT_COLUMNS)
     if event_type:
-        qset = qset.filter(models.Event.event_type == event_type.value)
+        qset = qset.where(models.Event.event_type == event_type.value)
     if location:
-        qset = qset.filter(models.Event.location.ilike(f"%{location}%"))
-    return qset.order_by(models.Event.timestamp.desc()).offset(skip).limit(limit).all()
+        qset = qset.where(models.Event.location.ilike(f"%{location}%"))
+    wanted = containment(payload, "payload")
+    if wanted:
+        # jsonb containment, answered by the GIN index on payload
+        qset = qset.where(models.Event.payload.contains(wanted))
+    if since:
+        qset = qset.where(models.Event.timestamp >= since)
+    if until:
+        qset = qset.where(models.Event.timestamp < until)
+    if cursor:
+        qset = qset.where(after_cursor(cursor, models.Event.timestamp, models.Event.id))
+    elif skip:
+        qset = qset.offset(skip)
+    rows = (await db.execute(qset.order_by(models.Event.timestamp.desc(), models.Event.id.desc()).limit(limit))).all()
+    set_next_cursor(response, rows, limit, "timestamp")
+    return json_response([row._asdict() for row in rows], response)
 
 
 @router.delete("/{event_id}")
-def delete_event(event_id: UUID, db: Session = Depends(db.get_db)):
-    event = db.query(models.Event).filter_by(id=event_id).first()
+async def delete_event(event_id: UUID, db: AsyncSession = Depends(db.get_async_db)):
+    event = await db.scalar(select(models.Event).filter_by(id=event_id))
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     try:
-        db.delete(event)
-        db.commit()
+        await db.delete(event)
+        await db.flush()
+        await refresh_entity_status(db, event.entity_id)
+        await db.commit()
     except Exception as e:
         try:
-            db.rollback()
+            await db.rollback()
         except Exception:
             pass
         raise HTTPException(status_code=500, detail=f"Failed to delete event: {str(e)}")
@@ -1,89 +1,52 @@
 # app / routes / links.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from typing import List
 from app import models, schemas, db
+from app.services import links as link_service
 
 router = APIRouter(tags=["Links"])
 
-def would_create_cycle(db: Session, parent_id: UUID, child_id: UUID) -> bool:
-    """Check for cycle using BFS"""
-    if parent_id == child_id:
-        return True
-    visited, queue = set(), [child_id]
-    while queue:
-        current = queue.pop(0)
-        if current in visited:
-            continue
-        visited.add(current)
-        if current == parent_id:
-            return True
-        # use scalars() to get raw child_id values
-        children_links = db.query(models.EntityLink.child_id).filter(models.EntityLink.parent_id == current).scalars().all()
-        for child in children_links:
-            if child not in visited:
-                queue.append(child)
-    return False
-
+MAX_BULK_LINKS = 50000
 
 @router.post("/", response_model=schemas.EntityLinkRead, status_code=201)
-def create_link(link: schemas.EntityLinkCreate, db: Session = Depends(db.get_db)):
-    if link.parent_id == link.child_id:
-        raise HTTPException(status_code=400, detail="Cannot create self-referential link")
-    parent = db.query(models.Entity).filter(models.Entity.id == link.parent_id).first()
-    child = db.query(models.Entity).filter(models.Entity.id == link.child_id).first()
-    if not parent or not child:
-        raise HTTPException(status_code=404, detail="Parent or child entity not found")
-    if would_create_cycle(db, link.parent_id, link.child_id):
-        raise HTTPException(status_code=400, detail="Circular relationship detected")
-    existing_link = db.query(models.EntityLink)\
-        .filter(models.EntityLink.parent_id == link.parent_id, models.EntityLink.child_id == link.child_id).first()
-    if existing_link:
-        raise HTTPException(status_code=400, detail="Link already exists")
-    db_link = models.EntityLink(parent_id=link.parent_id, child_id=link.child_id, relation=link.relation)
-    try:
-        with db.begin():
-            db.add(db_link)
-        db.refresh(db_link)
-    except Exception as e:
-        try:
-            db.rollback()
-        except Exception:
-            pass
-        raise HTTPException(status_code=500, detail=f"Error creating link: {str(e)}")
-    return db_link
+async def create_link(link: schemas.EntityLinkCreate, db: AsyncSession = Depends(db.get_async_db)):
+    return await link_service.create_link(db, link)
+
+
+@router.post("/bulk", response_model=schemas.LinkBulkResponse)
+async def create_links_bulk(links: List[schemas.EntityLinkCreate], db: AsyncSession = Depends(db.get_async_db)):
+    """
+    Create many links in one request, e.g. a container manifest. Every entity is validated with one query,
+    the batch is checked for cycles as a whole (including cycles formed only by links of the batch), and the
+    links are inserted in one transaction. Links that already exist are reported as "exists".
+    """
+    if len(links) > MAX_BULK_LINKS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_LINKS} links per request")
+    return await link_service.create_links_bulk(db, links)
 
 
 @router.get("/{entity_id}/children", response_model=List[schemas.EntityLinkRead])
-def get_children(entity_id: UUID, db: Session = Depends(db.get_db)):
-    entity = db.query(models.Entity).filter(models.Entity.id == entity_id).first()
+async def get_children(entity_id: UUID, db: AsyncSession = Depends(db.get_async_db)):
+    entity = await db.get(models.Entity, entity_id)
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
-    return db.query(models.EntityLink).filter(models.EntityLink.parent_id == entity_id).all()
+    result = await db.scalars(select(models.EntityLink).where(models.EntityLink.parent_id == entity_id))
+    return result.all()
 
 
 @router.get("/{entity_id}/parents", response_model=List[schemas.EntityLinkRead])
-def get_parents(entity_id: UUID, db: Session = Depends(db.get_db)):
-    entity = db.query(models.Entity).filter(models.Entity.id == entity_id).first()
+async def get_parents(entity_id: UUID, db: AsyncSession = Depends(db.get_async_db)):
+    entity = await db.get(models.Entity, entity_id)
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
-    return db.query(models.EntityLink).filter(models.EntityLink.child_id == entity_id).all()
+    result = await db.scalars(select(models.EntityLink).where(models.EntityLink.child_id == entity_id))
+    return result.all()
 
 
 @router.delete("/")
-def delete_link(parent_id: UUID, child_id: UUID, db: Session = Depends(db.get_db)):
-    link = db.query(models.EntityLink).filter(models.EntityLink.parent_id == parent_id,
-                                              models.EntityLink.child_id == child_id).first()
-    if not link:
-        raise HTTPException(status_code=404, detail="Link not found")
-    try:
-        with db.begin():
-            db.delete(link)
-    except Exception as e:
-        try:
-            db.rollback()
-        except Exception:
-            pass
-        raise HTTPException(status_code=500, detail=f"Failed to delete link: {str(e)}")
-    return {"status": "deleted", "parent_id": str(parent_id), "child_id": str(child_id)}
\ No newline at end of file
+async def delete_link(parent_id: UUID, child_id: UUID, db: AsyncSession = Depends(db.get_async_db)):
+    await link_service.delete_link(db, parent_id, child_id)
+    return {"status": "deleted", "parent_id": str(parent_id), "child_id": str(child_id)}
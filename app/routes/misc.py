@@ -1,9 +1,13 @@
 # app / routes / misc
 
 from fastapi import APIRouter
-from fastapi.responses import JSONResponse
-from sqlalchemy import text
-from app.db import engine
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app import metrics
+from app.cache import cache_stats
+from app.event_buffer import event_buffer
+from app.feed import event_feed
+from app.graph import link_graph
+from app.services import misc as misc_service
 from app.utils import get_api_version
 
 router = APIRouter()
@@ -18,25 +22,8 @@ async def health_check():
     - api: Always "ok" if the API is responding
     - database: "ok" if database is reachable, "unreachable" otherwise
     """
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        db_status = "ok"
-    except Exception as e:
-        db_status = "unreachable"
-        return JSONResponse(
-            status_code=503,
-            content={
-                "api": "ok",
-                "database": db_status,
-                "error": str(e)
-            }
-        )
-
-    return JSONResponse({
-        "api": "ok",
-        "database": db_status
-    })
+    status = await misc_service.health()
+    return JSONResponse(status_code=200 if status["database"] == "ok" else 503, content=status)
 
 
 @router.get("/version", summary="Get API version")
@@ -44,4 +31,24 @@ async def version():
     """
     Returns the current API version from pyproject.toml.
     """
-    return {"version": get_api_version()}
\ No newline at end of file
+    return {"version": get_api_version()}
+
+
+@router.get("/cache/stats", summary="In-process cache statistics")
+async def get_cache_stats():
+    """
+    Size, hit/miss, eviction and expiry counters of this worker's in-process caches, and the size,
+    memory and freshness of its entity_links adjacency index, its live event feed subscribers
+    and its write-behind event buffer (batch sizes, flush latency).
+    """
+    return {**cache_stats(), link_graph.name: link_graph.stats(), event_feed.name: event_feed.stats(),
+            event_buffer.name: event_buffer.stats()}
+
+
+@router.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    This worker's metrics in the Prometheus text format: request latency histograms per route, requests
+    in flight, database statements per request, connection pool usage and checkout wait, cache hit rates.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
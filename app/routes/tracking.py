@@ -1,27 +1,20 @@
 # app / routes / tracking
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
-from uuid import UUID
-from app import db, models, schemas
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import db, models
+from app.cache import cache_entity, resolve_external_id
+from app.feed import event_feed, event_message
+from app.pagination import NEXT_CURSOR_RESPONSES
+from app.projections import apply_events, event_fields
+from app.responses import ORJSONOffsetResponse, json_response
+from app.services import tracking as tracking_service
 
 router = APIRouter(tags=["Tracking"])
 
-def serialize_event(ev: models.Event) -> Dict[str, Any]:
-    # Return timestamp as datetime (Pydantic will handle serialization)
-    return {
-        "id": str(ev.id),
-        "entity_id": str(ev.entity_id),
-        "status": ev.event_type,
-        "timestamp": getattr(ev, "timestamp", None),
-        "location": ev.location,
-        "actor": ev.actor,
-        "details": ev.payload or None,
-    }
-
 @router.post("/package", status_code=201)
-def create_package(payload: dict, db: Session = Depends(db.get_db)):
+async def create_package(payload: dict, db: AsyncSession = Depends(db.get_async_db)):
     """
     Create a package entity (type=package) and an initial 'created' event.
     Expects payload containing at least:
@@ -34,7 +27,7 @@ def create_package(payload: dict, db: Session = Depends(db.get_db)):
         raise HTTPException(status_code=400, detail="tracking_number is required")
 
     # check existing
-    existing = db.query(models.Entity).filter(models.Entity.external_id == tracking_number).first()
+    existing = await resolve_external_id(db, tracking_number)
     if existing:
         raise HTTPException(status_code=400, detail=f"Entity with tracking_number '{tracking_number}' already exists")
 
@@ -50,25 +43,32 @@ def create_package(payload: dict, db: Session = Depends(db.get_db)):
         },
     )
 
-    # Create entity and initial event in single transaction
+    # Create entity, initial event and status projection in a single transaction
     try:
-        with db.begin():
-            db.add(db_entity)
-            # flush so db_entity.id is available for event
-            db.flush()
-            db_event = models.Event(
-                entity_id=db_entity.id,
-                event_type="created",
-                location=None,
-                actor=payload.get("creator") or "system",
-                payload={"note": "Package created", "meta": payload}
-            )
-            db.add(db_event)
+        db.add(db_entity)
+        # flush so db_entity.id is available for event
+        await db.flush()
+        db_event = models.Event(
+            entity_id=db_entity.id,
+            event_type="created",
+            location=None,
+            actor=payload.get("creator") or "system",
+            payload={"note": "Package created", "meta": payload}
+        )
+        db.add(db_event)
+        await db.flush()
+        await apply_events(db, [event_fields(db_event)], {db_entity.id: db_entity.type})
+        await db.commit()
         # refresh instances after successful commit
-        db.refresh(db_entity)
-        db.refresh(db_event)
+        await db.refresh(db_entity)
+        await db.refresh(db_event)
+        cache_entity(db_entity)
+        event_feed.publish([event_message(db_event)])
     except Exception as e:
-        # db.begin() will rollback automatically on exception
+        try:
+            await db.rollback()
+        except Exception:
+            pass
         raise HTTPException(status_code=500, detail=f"Failed to create package and initial event: {str(e)}")
 
     # Build return structure similar to what the web UI expects
@@ -85,90 +85,35 @@ def create_package(payload: dict, db: Session = Depends(db.get_db)):
             },
             "created_at": getattr(db_entity, "created_at", None)
         },
-        "timeline": [serialize_event(db_event)]
+        "timeline": [tracking_service.serialize_event(db_event)]
     }
-    return package
+    return json_response(package, status_code=201, response_class=ORJSONOffsetResponse)
 
 @router.get("/track/{tracking_number}")
-def track_package(tracking_number: str, db: Session = Depends(db.get_db)):
+async def track_package(tracking_number: str, db: AsyncSession = Depends(db.get_async_db)):
     """
     Return package details + timeline for a given tracking_number (external_id).
     """
-    entity = db.query(models.Entity).filter_by(external_id=tracking_number).first()
-    if not entity:
-        raise HTTPException(status_code=404, detail="Package not found")
-
-    events = (
-        db.query(models.Event)
-        .filter(models.Event.entity_id == entity.id)
-        .order_by(models.Event.timestamp)
-        .all()
-    )
-
-    timeline = [serialize_event(e) for e in events]
-    latest = timeline[-1] if timeline else None
-    package = {
-        "tracking_number": tracking_number,
-        "status": latest["status"] if latest else "created",
-        "current_location": latest["location"] if latest else None,
-        "package": {
-            "details": {
-                "sender": entity.extra_data.get("sender") if entity.extra_data else None,
-                "recipient": entity.extra_data.get("recipient") if entity.extra_data else None,
-                "destination": entity.extra_data.get("destination") if entity.extra_data else None,
-                "weight_kg": entity.extra_data.get("weight_kg") if entity.extra_data else None,
-            },
-            "created_at": getattr(entity, "created_at", None)
-        },
-        "timeline": timeline
-    }
-    return package
+    return json_response(await tracking_service.track_package(db, tracking_number),
+                         response_class=ORJSONOffsetResponse)
 
-@router.get("/packages")
-def list_packages(status: Optional[str] = None, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), db: Session = Depends(db.get_db)):
+@router.get("/packages", responses=NEXT_CURSOR_RESPONSES)
+async def list_packages(response: Response, status: Optional[str] = None, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000),
+                        cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+                        db: AsyncSession = Depends(db.get_async_db)):
     """
-    Basic packages listing. If `status` provided, filter by the latest event.status for each package.
-    Note: this is a simple implementation; for large datasets you should move to optimized queries.
+    Packages listing with their current status, read from the entity_status projection.
+    If `status` provided, only packages whose latest event has that status are returned.
+    Newest first; follow the X-Next-Cursor response header with `cursor` for the next page (only sent
+    when the page is full).
     """
-    q = db.query(models.Entity).filter(models.Entity.type == "package").order_by(models.Entity.created_at.desc()).offset(skip).limit(limit)
-    entities = q.all()
-
-    out = []
-    for e in entities:
-        events = (
-            db.query(models.Event)
-            .filter(models.Event.entity_id == e.id)
-            .order_by(models.Event.timestamp)
-            .all()
-        )
-        latest = events[-1] if events else None
-        current_status = latest.event_type if latest else "created"
-        if status and status != current_status:
-            continue
-        out.append({
-            "tracking_number": e.external_id,
-            "details": {
-                "recipient": e.extra_data.get("recipient") if e.extra_data else None,
-                "sender": e.extra_data.get("sender") if e.extra_data else None,
-            },
-            "current_status": current_status,
-            "current_location": latest.location if latest else None,
-            "last_updated": getattr(latest, "timestamp", None)
-        })
-    return out
+    packages = await tracking_service.list_packages(db, status=status, skip=skip, limit=limit, cursor=cursor,
+                                                    response=response)
+    return json_response(packages, response, response_class=ORJSONOffsetResponse)
 
 @router.get("/stats")
-def tracking_stats(db: Session = Depends(db.get_db)):
+async def tracking_stats(db: AsyncSession = Depends(db.get_async_db)):
     """
     Simple stats for dashboard: total_packages and distribution by latest status.
     """
-    total = db.query(models.Entity).filter(models.Entity.type == "package").count()
-    # naive aggregation: fetch packages and compute status distribution
-    entities = db.query(models.Entity).filter(models.Entity.type == "package").all()
-    dist = {}
-    for e in entities:
-        latest_ev = db.query(models.Event).filter(models.Event.entity_id == e.id).order_by(models.Event.timestamp.desc()).first()
-        status = latest_ev.event_type if latest_ev else "created"
-        dist[status] = dist.get(status, 0) + 1
-
-    return {"total_packages": total, "status_distribution": dist}
+    return await tracking_service.tracking_stats(db)
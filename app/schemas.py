@@ -79,6 +79,11 @@ class EntityRead(EntityBase):
         from_attributes = True
 
 
+class EntitySearchResult(EntityRead):
+    current_location: Optional[str] = None
+    score: float
+
+
 # ----------------------
 # Event Schemas
 # ----------------------
@@ -91,6 +96,36 @@ class EventBase(BaseModel):
 
 class EventCreate(EventBase):
     entity_id: UUID
+    # retries with the same key return the first event instead of storing it again
+    idempotency_key: Optional[str] = Field(None, max_length=200)
+
+
+class EventBulkItem(EventBase):
+    """One scan in a bulk upload, addressed either by entity UUID or by external_id."""
+    entity_id: Optional[UUID] = None
+    external_id: Optional[str] = None
+    idempotency_key: Optional[str] = Field(None, max_length=200)
+
+    @root_validator(pre=True)
+    def require_entity_reference(cls, values):
+        if isinstance(values, dict) and not values.get("entity_id") and not values.get("external_id"):
+            raise ValueError("entity_id or external_id is required")
+        return values
+
+
+class EventBulkResult(BaseModel):
+    index: int
+    status: str  # "created", "duplicate" (event_id is the original) or "error"
+    event_id: Optional[UUID] = None
+    entity_id: Optional[UUID] = None
+    error: Optional[str] = None
+
+
+class EventBulkResponse(BaseModel):
+    created: int
+    duplicates: int = 0
+    failed: int
+    results: List[EventBulkResult]
 
 
 class EventUpdate(BaseModel):
@@ -127,6 +162,19 @@ class EntityLinkRead(EntityLinkBase):
         from_attributes = True
 
 
+class LinkBulkResult(BaseModel):
+    index: int
+    status: str  # "created", "exists" or "error"
+    error: Optional[str] = None
+
+
+class LinkBulkResponse(BaseModel):
+    created: int
+    existing: int
+    failed: int
+    results: List[LinkBulkResult]
+
+
 # ----------------------
 # Tracking Schemas
 # ----------------------
@@ -155,3 +203,13 @@ class TrackingResponse(BaseModel):
     current_location: Optional[str]
     timeline: List[TimelineEvent]
 
+
+class LabelCode(str, Enum):
+    QR = "qr"
+    CODE128 = "code128"
+    DATAMATRIX = "datamatrix"
+
+
+class LabelBatchRequest(BaseModel):
+    tracking_numbers: List[str]
+    code: LabelCode = LabelCode.QR
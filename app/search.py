@@ -0,0 +1,117 @@
+# app / search
+
+import json
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Substring search (ILIKE '%q%') can't use a B-tree index; pg_trgm GIN indexes serve it instead.
+# Expression indexes must match the queries below character for character.
+SEARCH_INDEXES = {
+    "idx_entities_external_id_trgm": "ON entities USING gin (external_id gin_trgm_ops)",
+    "idx_entities_sender_trgm": "ON entities USING gin ((extra_data ->> 'sender') gin_trgm_ops)",
+    "idx_entities_recipient_trgm": "ON entities USING gin ((extra_data ->> 'recipient') gin_trgm_ops)",
+    "idx_entities_destination_trgm": "ON entities USING gin ((extra_data ->> 'destination') gin_trgm_ops)",
+    "idx_entity_status_location_trgm": "ON entity_status USING gin (current_location gin_trgm_ops)",
+    # on the partitioned parent: every partition gets its own index, new ones included
+    "idx_events_location_trgm": "ON events USING gin (location gin_trgm_ops)",
+}
+
+# candidates taken from each indexed field before ranking, so broad queries stay bounded
+SEARCH_CANDIDATES = 500
+
+# Each field is searched on its own (one trigram bitmap scan each) and the candidates are unioned; an
+# exact external_id always makes it in through the unique index. Ranking: exact tracking number, then
+# prefix matches, then the best word similarity across fields (tracking number weighted highest).
+_SEARCH_SQL = """
+WITH candidates AS (
+    SELECT id FROM entities WHERE external_id = :q {type_filter}
+  UNION
+    SELECT id FROM (SELECT id FROM entities
+                    WHERE external_id ILIKE :pattern {type_filter} LIMIT :candidates) m
+  UNION
+    SELECT id FROM (SELECT id FROM entities
+                    WHERE (extra_data ->> 'sender') ILIKE :pattern {type_filter} LIMIT :candidates) m
+  UNION
+    SELECT id FROM (SELECT id FROM entities
+                    WHERE (extra_data ->> 'recipient') ILIKE :pattern {type_filter} LIMIT :candidates) m
+  UNION
+    SELECT id FROM (SELECT id FROM entities
+                    WHERE (extra_data ->> 'destination') ILIKE :pattern {type_filter} LIMIT :candidates) m
+  UNION
+    SELECT id FROM (SELECT entity_id AS id FROM entity_status
+                    WHERE current_location ILIKE :pattern {status_type_filter} LIMIT :candidates) m
+)
+SELECT e.id, e.type, e.external_id, e.extra_data, e.created_at, s.current_location,
+       CASE
+           WHEN e.external_id = :q THEN 3.0
+           WHEN e.external_id ILIKE :prefix THEN 2.0 + word_similarity(:q, e.external_id)
+           ELSE greatest(
+               word_similarity(:q, e.external_id),
+               0.8 * word_similarity(:q, coalesce(e.extra_data ->> 'sender', '')),
+               0.8 * word_similarity(:q, coalesce(e.extra_data ->> 'recipient', '')),
+               0.6 * word_similarity(:q, coalesce(e.extra_data ->> 'destination', '')),
+               0.6 * word_similarity(:q, coalesce(s.current_location, ''))
+           )
+       END AS score
+FROM candidates c
+JOIN entities e ON e.id = c.id
+LEFT JOIN entity_status s ON s.entity_id = e.id
+ORDER BY score DESC, e.created_at DESC, e.id DESC
+LIMIT :limit
+"""
+
+
+def ensure_search_indexes(conn: Connection) -> None:
+    """Create pg_trgm and the trigram indexes if missing (create_tables.py; the migration has its own copy)."""
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    for name, definition in SEARCH_INDEXES.items():
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} {definition}"))
+
+
+def like_pattern(q: str) -> str:
+    """Escape LIKE wildcards so user input only ever matches literally."""
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def containment(raw: Optional[str], param: str, **fields: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    The JSON object a jsonb column has to contain (`column @> object`, served by its jsonb_path_ops GIN
+    index), from a query parameter holding a JSON object plus shorthand top-level keys. None: no filter.
+    """
+    wanted: Dict[str, Any] = {}
+    if raw:
+        try:
+            wanted = json.loads(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"{param} must be a JSON object")
+        if not isinstance(wanted, dict):
+            raise HTTPException(status_code=400, detail=f"{param} must be a JSON object")
+    wanted.update({key: value for key, value in fields.items() if value is not None})
+    return wanted or None
+
+
+async def search_entities(db: AsyncSession, q: str, type: Optional[str] = None,
+                          limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Entities whose tracking number, sender, recipient, destination or current location contains `q`,
+    best matches first, each with its `score`.
+    """
+    params = {
+        "q": q,
+        "pattern": f"%{like_pattern(q)}%",
+        "prefix": f"{like_pattern(q)}%",
+        "candidates": SEARCH_CANDIDATES,
+        "limit": limit,
+    }
+    type_filter = status_type_filter = ""
+    if type:
+        type_filter = "AND type = :type"
+        status_type_filter = "AND entity_type = :type"
+        params["type"] = type
+    sql = _SEARCH_SQL.format(type_filter=type_filter, status_type_filter=status_type_filter)
+    rows = (await db.execute(text(sql).columns(extra_data=JSONB), params)).mappings().all()
+    return [dict(row) for row in rows]
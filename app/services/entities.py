@@ -0,0 +1,138 @@
+# app / services / entities
+
+import logging
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import cast, func, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from app import models, schemas
+from app.cache import CachedEntity, cache_entity, resolve_external_id
+from app.pagination import after_cursor, set_next_cursor
+from app.projections import init_entity_status
+from app.search import like_pattern, search_entities as search_index
+
+logger = logging.getLogger("tracelet.entities")
+
+# EntityRead's fields in its order: listings return these rows as they come (see app/responses.py)
+ENTITY_COLUMNS = (
+    models.Entity.type,
+    models.Entity.external_id,
+    func.coalesce(models.Entity.extra_data, cast({}, JSONB)).label("extra_data"),
+    models.Entity.id,
+    models.Entity.created_at,
+)
+
+
+async def create_entity(db: AsyncSession, entity: schemas.EntityCreate) -> models.Entity:
+    try:
+        # Normalize type to string (handle Enum or plain string)
+        type_value = entity.type.value.lower() if hasattr(entity.type, "value") else str(entity.type).lower()
+
+        # Defensive external_id handling: only use id if it's not None
+        external_id = (entity.external_id or (str(entity.id) if entity.id is not None else None) or "").strip()
+        if not external_id:
+            raise HTTPException(status_code=400, detail="external_id (or id) is required")
+
+        existing = await db.scalar(select(models.Entity).where(models.Entity.external_id == external_id))
+        if existing:
+            raise HTTPException(status_code=400, detail=f"Entity with external_id '{external_id}' already exists")
+
+        db_entity = models.Entity(type=type_value, external_id=external_id, extra_data=entity.extra_data or {})
+
+        # Use explicit commit instead of starting a new transaction with db.begin()
+        db.add(db_entity)
+        try:
+            # flush for the id, the status projection row is committed together with the entity
+            await db.flush()
+            init_entity_status(db, db_entity)
+            await db.commit()
+            await db.refresh(db_entity)
+        except IntegrityError:
+            # rollback and convert to HTTP 400
+            try:
+                await db.rollback()
+            except Exception:
+                logger.debug("rollback failed or not needed")
+            logger.exception("IntegrityError creating entity")
+            raise HTTPException(status_code=400, detail="Database integrity error when creating entity")
+        except Exception:
+            try:
+                await db.rollback()
+            except Exception:
+                logger.debug("rollback failed or not needed")
+            logger.exception("Unhandled exception creating entity (commit/refresh)")
+            raise HTTPException(status_code=500, detail="Internal server error creating entity")
+
+        # replaces anything cached under this external_id
+        cache_entity(db_entity)
+        logger.info(f"Created entity {db_entity.id} ({external_id}) of type '{type_value}'")
+        return db_entity
+
+    except HTTPException:
+        # propagate expected HTTP errors
+        raise
+    except Exception:
+        # any other unexpected error
+        try:
+            await db.rollback()
+        except Exception:
+            logger.debug("rollback failed or not needed")
+        logger.exception("Unhandled exception creating entity (outer)")
+        raise HTTPException(status_code=500, detail="Internal server error creating entity")
+
+
+async def list_entities(db: AsyncSession, skip: int = 0, limit: int = 100, q: Optional[str] = None,
+                        type: Optional[str] = None, cursor: Optional[str] = None,
+                        extra_data: Optional[Dict[str, Any]] = None,
+                        response: Optional[Response] = None) -> List[Dict[str, Any]]:
+    qset = select(*ENTITY_COLUMNS)
+
+    if type:
+        try:
+            type_enum = schemas.EntityType(type.lower())
+            qset = qset.where(models.Entity.type == type_enum.value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid entity type '{type}'")
+
+    if q:
+        # types are a fixed set: match them here so the query is a trigram index scan on external_id
+        # OR'ed with a type B-tree lookup, rather than a sequential scan for type ILIKE
+        types = [t.value for t in schemas.EntityType if q.lower() in t.value]
+        condition = models.Entity.external_id.ilike(f"%{like_pattern(q)}%")
+        if types:
+            condition = condition | models.Entity.type.in_(types)
+        qset = qset.where(condition)
+
+    if extra_data:
+        # jsonb containment, answered by the GIN index on extra_data
+        qset = qset.where(models.Entity.extra_data.contains(extra_data))
+
+    if cursor:
+        qset = qset.where(after_cursor(cursor, models.Entity.created_at, models.Entity.id))
+    elif skip:
+        qset = qset.offset(skip)
+
+    rows = (await db.execute(qset.order_by(models.Entity.created_at.desc(), models.Entity.id.desc()).limit(limit))).all()
+    set_next_cursor(response, rows, limit, "created_at")
+    return [row._asdict() for row in rows]
+
+
+async def search_entities(db: AsyncSession, q: str, type: Optional[str] = None, limit: int = 20) -> List[dict]:
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="q is required")
+    if type:
+        try:
+            type = schemas.EntityType(type.lower()).value
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid entity type '{type}'")
+    return await search_index(db, q, type=type, limit=limit)
+
+
+async def get_entity_by_external_id(db: AsyncSession, external_id: str) -> CachedEntity:
+    entity = await resolve_external_id(db, external_id)
+    if not entity:
+        raise HTTPException(status_code=404, detail=f"Entity with external_id '{external_id}' not found")
+    return entity
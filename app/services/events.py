@@ -0,0 +1,177 @@
+# app / services / events
+
+import uuid
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from uuid import UUID
+from fastapi import HTTPException, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from app import models, schemas
+from app.event_buffer import event_buffer
+from app.feed import FEED_FIELDS, event_feed, event_message
+from app.idempotency import claim_keys, event_key, recall, remember
+from app.models import utc_now
+from app.pagination import after_cursor, set_next_cursor
+from app.projections import apply_events, event_fields
+
+# EventRead's fields in its order: listings return these rows as they come (see app/responses.py)
+EVENT_COLUMNS = (
+    models.Event.event_type,
+    models.Event.location,
+    models.Event.actor,
+    models.Event.payload,
+    models.Event.id,
+    models.Event.entity_id,
+    models.Event.timestamp,
+)
+
+# set on responses that return an event stored by an earlier request with the same idempotency key
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+async def create_event(db: AsyncSession, event: schemas.EventCreate, idempotency_key: Optional[str] = None,
+                       response: Optional[Response] = None) -> Union[models.Event, Dict[str, Any]]:
+    """
+    Store one event, or return the original when it repeats an earlier one: same idempotency key (the
+    `idempotency_key` argument, else the event's own), or when none, the same scan (entity, type, location,
+    actor and payload) stored less than IDEMPOTENCY_WINDOW seconds ago.
+    """
+    # normalize event_type whether it's an Enum or a string
+    event_type_value = event.event_type.value if hasattr(event.event_type, "value") else str(event.event_type)
+
+    now = utc_now()
+    key = event_key(event.entity_id, event_type_value, event.location, event.actor, event.payload,
+                    client_key=idempotency_key or event.idempotency_key)
+    original = recall(key, now)
+    if original is not None:
+        return _replayed(original, response)
+
+    if event_buffer.running:
+        # write-behind: the flusher stores it with the other events of its group (and checks the entity)
+        row = {"id": uuid.uuid4(), "entity_id": event.entity_id, "event_type": event_type_value,
+               "location": event.location, "actor": event.actor, "payload": event.payload, "timestamp": now}
+        status, stored = await event_buffer.submit(key, row)
+        return _replayed(stored, response) if status == "duplicate" else stored
+
+    # ensure the referenced entity exists
+    entity = await db.get(models.Entity, event.entity_id)
+    if not entity:
+        raise HTTPException(status_code=404, detail="Entity not found")
+
+    db_event = models.Event(
+        id=uuid.uuid4(),
+        entity_id=event.entity_id,
+        event_type=event_type_value,
+        location=event.location,
+        actor=event.actor,
+        payload=event.payload,
+        timestamp=now,
+    )
+
+    # Use explicit commit/rollback instead of nested transactions
+    try:
+        # the key first: a concurrent retry waits here until this transaction is done
+        originals = await claim_keys(db, [(key, db_event.id, db_event.timestamp)])
+        if key in originals:
+            await db.rollback()
+            remember(key, originals[key])
+            return _replayed(originals[key], response)
+
+        db.add(db_event)
+        # flush first so the projection sees the final timestamp, then commit both together
+        await db.flush()
+        await apply_events(db, [event_fields(db_event)], {entity.id: entity.type})
+        await db.commit()
+        await db.refresh(db_event)
+        remember(key, event_message(db_event))
+        event_feed.publish([event_message(db_event)])
+    except IntegrityError:
+        try:
+            await db.rollback()
+        except Exception:
+            pass
+        raise HTTPException(status_code=400, detail="Database integrity error when creating event")
+    except Exception as e:
+        try:
+            await db.rollback()
+        except Exception:
+            pass
+        raise HTTPException(status_code=500, detail=f"Error creating event: {str(e)}")
+
+    return db_event
+
+
+async def store_events(db: AsyncSession, keyed_rows: Sequence[Tuple[str, Dict[str, Any]]],
+                       entity_types: Mapping[UUID, str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Write new events, given as (idempotency key, row with the EventRead fields), in one transaction. A row
+    whose key repeats an earlier row of the batch, an event this worker remembers or a stored one is left
+    out. Returns (status, event) per row, in order: ("created", row) or ("duplicate", original event).
+    `entity_types` maps every entity_id to its type, for the status projection.
+    """
+    originals: Dict[str, Dict[str, Any]] = {}
+    new_rows: Dict[str, Dict[str, Any]] = {}
+    for key, row in keyed_rows:
+        if key in new_rows or key in originals:
+            continue
+        original = recall(key)
+        if original is not None:
+            originals[key] = original
+        else:
+            new_rows[key] = row
+
+    if new_rows:
+        try:
+            # keys taken by earlier requests turn those rows into duplicates of the stored events
+            originals.update(await claim_keys(db, [(key, row["id"], row["timestamp"])
+                                                   for key, row in new_rows.items()]))
+            rows = [row for key, row in new_rows.items() if key not in originals]
+            if rows:
+                # executemany is batched into multi-row INSERT ... VALUES statements by SQLAlchemy
+                await db.execute(insert(models.Event), rows)
+                await apply_events(db, rows, entity_types)
+            await db.commit()
+        except Exception:
+            try:
+                await db.rollback()
+            except Exception:
+                pass
+            raise
+        for key, row in new_rows.items():
+            remember(key, originals.get(key) or {field: row[field] for field in FEED_FIELDS})
+        event_feed.publish(rows)
+
+    results = []
+    created = set()
+    for key, row in keyed_rows:
+        if key in originals:
+            results.append(("duplicate", originals[key]))
+        elif key in created:
+            results.append(("duplicate", new_rows[key]))
+        else:
+            created.add(key)
+            results.append(("created", new_rows[key]))
+    return results
+
+
+def _replayed(original: Dict[str, Any], response: Optional[Response]) -> Dict[str, Any]:
+    if response is not None:
+        response.headers[REPLAYED_HEADER] = "true"
+    return original
+
+
+async def list_entity_events(db: AsyncSession, entity_id: UUID, skip: int = 0, limit: int = 100,
+                             cursor: Optional[str] = None,
+                             response: Optional[Response] = None) -> List[Dict[str, Any]]:
+    if not await db.scalar(select(models.Entity.id).where(models.Entity.id == entity_id)):
+        raise HTTPException(status_code=404, detail="Entity not found")
+
+    qset = select(*EVENT_COLUMNS).where(models.Event.entity_id == entity_id)
+    if cursor:
+        qset = qset.where(after_cursor(cursor, models.Event.timestamp, models.Event.id, descending=False))
+    elif skip:
+        qset = qset.offset(skip)
+    rows = (await db.execute(qset.order_by(models.Event.timestamp, models.Event.id).limit(limit))).all()
+    set_next_cursor(response, rows, limit, "timestamp")
+    return [row._asdict() for row in rows]
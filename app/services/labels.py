@@ -0,0 +1,44 @@
+# app / services / labels
+
+from typing import List, Sequence
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.cache import resolve_external_id
+from app.labels import Label, batch_matrices, label_from_entity, render_label_pdf, render_labels
+
+
+async def package_label(db: AsyncSession, tracking_number: str) -> Label:
+    """Label data of one package, read from its entity (through the external_id cache)."""
+    entity = await resolve_external_id(db, tracking_number)
+    if not entity:
+        raise HTTPException(status_code=404, detail="Package not found")
+    return label_from_entity(entity.external_id, entity.extra_data)
+
+
+async def package_labels(db: AsyncSession, tracking_numbers: Sequence[str]) -> List[Label]:
+    """Label data of many packages in one query, in request order; 404 lists the unknown numbers."""
+    rows = (await db.execute(
+        select(models.Entity.external_id, models.Entity.extra_data)
+        .where(models.Entity.external_id.in_(tracking_numbers))
+    )).all()
+    extra_by_number = {external_id: extra_data for external_id, extra_data in rows}
+    missing = [n for n in tracking_numbers if n not in extra_by_number]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Packages not found: {', '.join(missing[:20])}"
+                                                    + (f" (+{len(missing) - 20} more)" if len(missing) > 20 else ""))
+    return [label_from_entity(n, extra_by_number[n]) for n in tracking_numbers]
+
+
+async def package_label_pdf(db: AsyncSession, tracking_number: str, symbology: str = "qr") -> bytes:
+    label = await package_label(db, tracking_number)
+    # rendering is CPU-bound: keep it off the event loop
+    return await run_in_threadpool(render_label_pdf, label, symbology)
+
+
+async def label_sheet_pdf(db: AsyncSession, tracking_numbers: Sequence[str], symbology: str = "qr") -> bytes:
+    labels = await package_labels(db, tracking_numbers)
+    matrices = await batch_matrices(symbology, [label.external_id for label in labels])
+    return await run_in_threadpool(render_labels, labels, symbology, matrices)
@@ -0,0 +1,206 @@
+# app / services / links
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from fastapi import HTTPException
+from sqlalchemy import String, any_, bindparam, literal, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from app import closure, models, schemas
+from app.graph import cyclic_links, link_graph
+from app.settings import settings
+
+logger = logging.getLogger("tracelet.links")
+
+_BULK_INSERT_SQL = """
+INSERT INTO entity_links (parent_id, child_id, relation)
+SELECT * FROM unnest(:parents, :children, :relations)
+ON CONFLICT (parent_id, child_id) DO NOTHING
+RETURNING parent_id, child_id
+"""
+
+# Transactions that add links take this lock first and hold it until they commit, so each one's cycle check
+# sees every link committed before it: two concurrent inserts can't close a cycle between them.
+_LOCK_LINKS_SQL = "SELECT pg_advisory_xact_lock(hashtext('entity_links'))"
+
+# Whether :target is reachable from :source over entity_links. UNION (not UNION ALL) visits every entity
+# once, so the walk ends even on links that already contain a cycle; EXISTS stops at the first match.
+_REACHES_SQL = """
+WITH RECURSIVE reachable(id) AS (
+    SELECT CAST(:source AS uuid)
+  UNION
+    SELECT l.child_id FROM reachable r JOIN entity_links l ON l.parent_id = r.id
+)
+SELECT EXISTS (SELECT 1 FROM reachable WHERE id = CAST(:target AS uuid))
+"""
+
+# Links leaving any entity reachable from :sources (the sources included), for cycle checks of a batch
+_REACHABLE_LINKS_SQL = """
+WITH RECURSIVE reachable(id) AS (
+    SELECT * FROM unnest(:sources)
+  UNION
+    SELECT l.child_id FROM reachable r JOIN entity_links l ON l.parent_id = r.id
+)
+SELECT l.parent_id, l.child_id FROM reachable r JOIN entity_links l ON l.parent_id = r.id
+"""
+
+
+async def lock_links(db: AsyncSession) -> None:
+    """Serialize link inserts until the end of the current transaction."""
+    await db.execute(text(_LOCK_LINKS_SQL))
+
+
+async def would_create_cycle(db: AsyncSession, parent_id: UUID, child_id: UUID) -> bool:
+    """
+    A parent -> child link closes a cycle when the parent is already reachable from the child. Checked in
+    the database (entity_closure with ENTITY_CLOSURE, else a walk of entity_links), after lock_links.
+    """
+    if settings.ENTITY_CLOSURE:
+        return await closure.reaches(db, child_id, parent_id)
+    return bool(await db.scalar(text(_REACHES_SQL), {"source": child_id, "target": parent_id}))
+
+
+async def find_cyclic_links(db: AsyncSession, links: Sequence[Tuple[UUID, UUID]]) -> Set[int]:
+    """
+    Positions of the (parent, child) links that would lie on a cycle if the whole batch were added, checked
+    against the database after lock_links. The existing part of such a cycle runs from a batch child to a
+    batch parent: with ENTITY_CLOSURE those paths come from entity_closure, else every link reachable from
+    the batch's children is read.
+    """
+    if not links:
+        return set()
+    children = list({child_id for _, child_id in links})
+    if settings.ENTITY_CLOSURE:
+        existing = await closure.paths_between(db, children, list({parent_id for parent_id, _ in links}))
+    else:
+        stmt = text(_REACHABLE_LINKS_SQL).bindparams(
+            bindparam("sources", children, type_=ARRAY(PG_UUID(as_uuid=True))),
+        )
+        existing = (await db.execute(stmt)).all()
+    return cyclic_links(existing, links)
+
+
+async def create_link(db: AsyncSession, link: schemas.EntityLinkCreate) -> models.EntityLink:
+    if link.parent_id == link.child_id:
+        raise HTTPException(status_code=400, detail="Cannot create self-referential link")
+    parent = await db.get(models.Entity, link.parent_id)
+    child = await db.get(models.Entity, link.child_id)
+    if not parent or not child:
+        raise HTTPException(status_code=404, detail="Parent or child entity not found")
+    # held until commit (or the rollback when the session closes on an error)
+    await lock_links(db)
+    if await would_create_cycle(db, link.parent_id, link.child_id):
+        raise HTTPException(status_code=400, detail="Circular relationship detected")
+    existing_link = await db.get(models.EntityLink, (link.parent_id, link.child_id))
+    if existing_link:
+        raise HTTPException(status_code=400, detail="Link already exists")
+    db_link = models.EntityLink(parent_id=link.parent_id, child_id=link.child_id, relation=link.relation)
+    try:
+        db.add(db_link)
+        if settings.ENTITY_CLOSURE:
+            await db.flush()
+            await closure.add_links(db, [(link.parent_id, link.child_id)])
+        await db.commit()
+        await db.refresh(db_link)
+    except Exception as e:
+        try:
+            await db.rollback()
+        except Exception:
+            pass
+        raise HTTPException(status_code=500, detail=f"Error creating link: {str(e)}")
+    link_graph.add_link(db_link.parent_id, db_link.child_id, db_link.relation)
+    return db_link
+
+
+async def delete_link(db: AsyncSession, parent_id: UUID, child_id: UUID) -> None:
+    link = await db.get(models.EntityLink, (parent_id, child_id))
+    if not link:
+        raise HTTPException(status_code=404, detail="Link not found")
+    try:
+        await db.delete(link)
+        if settings.ENTITY_CLOSURE:
+            await closure.remove_link(db, parent_id, child_id)
+        await db.commit()
+    except Exception as e:
+        try:
+            await db.rollback()
+        except Exception:
+            pass
+        raise HTTPException(status_code=500, detail=f"Failed to delete link: {str(e)}")
+    link_graph.remove_link(parent_id, child_id)
+
+
+async def create_links_bulk(db: AsyncSession, links: Sequence[schemas.EntityLinkCreate]) -> Dict[str, Any]:
+    """
+    Create many links at once: one query validates every entity, the whole batch is checked for cycles
+    together, and the valid links are written with a single INSERT ... SELECT FROM unnest(...) ON CONFLICT
+    DO NOTHING. Links that already exist are reported as "exists"; the outcome of every link is reported
+    by its index.
+    """
+    results: List[Optional[schemas.LinkBulkResult]] = [None] * len(links)
+
+    entity_ids = {link.parent_id for link in links} | {link.child_id for link in links}
+    found = set()
+    if entity_ids:
+        # one array parameter instead of an IN list, which would exceed the bind parameter limit
+        ids = literal(list(entity_ids), ARRAY(PG_UUID(as_uuid=True)))
+        found = set((await db.scalars(select(models.Entity.id).where(models.Entity.id == any_(ids)))).all())
+
+    candidates = []
+    seen = set()
+    for index, link in enumerate(links):
+        error = None
+        if link.parent_id == link.child_id:
+            error = "Cannot create self-referential link"
+        elif link.parent_id not in found or link.child_id not in found:
+            error = "Parent or child entity not found"
+        elif (link.parent_id, link.child_id) in seen:
+            error = "Duplicate link in batch"
+        if error:
+            results[index] = schemas.LinkBulkResult(index=index, status="error", error=error)
+            continue
+        seen.add((link.parent_id, link.child_id))
+        candidates.append((index, link))
+
+    # held until commit (or the rollback when the session closes on an error)
+    await lock_links(db)
+    cyclic = await find_cyclic_links(db, [(link.parent_id, link.child_id) for _, link in candidates])
+    rows = []
+    for position, (index, link) in enumerate(candidates):
+        if position in cyclic:
+            results[index] = schemas.LinkBulkResult(index=index, status="error", error="Circular relationship detected")
+        else:
+            rows.append((index, link))
+
+    created = set()
+    if rows:
+        try:
+            # the whole batch as three array parameters: one statement, compiled once, whatever the batch size
+            stmt = text(_BULK_INSERT_SQL).bindparams(
+                bindparam("parents", [link.parent_id for _, link in rows], type_=ARRAY(PG_UUID(as_uuid=True))),
+                bindparam("children", [link.child_id for _, link in rows], type_=ARRAY(PG_UUID(as_uuid=True))),
+                bindparam("relations", [link.relation for _, link in rows], type_=ARRAY(String)),
+            ).columns(parent_id=PG_UUID(as_uuid=True), child_id=PG_UUID(as_uuid=True))
+            created.update((await db.execute(stmt)).all())
+            if settings.ENTITY_CLOSURE:
+                await closure.add_links(db, list(created))
+            await db.commit()
+        except Exception as e:
+            try:
+                await db.rollback()
+            except Exception:
+                pass
+            logger.exception("Bulk link insert failed")
+            raise HTTPException(status_code=500, detail=f"Error creating links: {str(e)}")
+
+    for index, link in rows:
+        if (link.parent_id, link.child_id) in created:
+            link_graph.add_link(link.parent_id, link.child_id, link.relation)
+            results[index] = schemas.LinkBulkResult(index=index, status="created")
+        else:
+            results[index] = schemas.LinkBulkResult(index=index, status="exists")
+
+    existing = len(rows) - len(created)
+    failed = len(links) - len(rows)
+    logger.info(f"Bulk created {len(created)} links ({existing} already existed, {failed} rejected)")
+    return {"created": len(created), "existing": existing, "failed": failed, "results": results}
@@ -0,0 +1,15 @@
+# app / services / misc
+
+from typing import Any, Dict
+from sqlalchemy import text
+from app.db import async_engine
+
+
+async def health() -> Dict[str, Any]:
+    """API and database status; `database` is "unreachable" (with the error) when SELECT 1 fails."""
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"api": "ok", "database": "unreachable", "error": str(e)}
+    return {"api": "ok", "database": "ok"}
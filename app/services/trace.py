@@ -0,0 +1,126 @@
+# app / services / trace
+
+from typing import Any, Dict, Iterable, List, Optional
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import any_, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import closure, models
+from app.graph import link_graph
+from app.settings import settings
+
+# deepest trace walked link by link in the in-memory index; the closure lookup has no such limit
+MAX_WALK_DEPTH = 50
+
+
+async def entity_details(db: AsyncSession, entity_ids: Iterable[UUID]) -> Dict[UUID, models.Entity]:
+    """Entities by id in one query (ids without an entity are left out)."""
+    ids = list(set(entity_ids))
+    if not ids:
+        return {}
+    # one array parameter: a large trace would exceed the bind parameter limit as an IN list
+    rows = (await db.scalars(
+        select(models.Entity).where(models.Entity.id == any_(literal(ids, ARRAY(PG_UUID(as_uuid=True)))))
+    )).all()
+    return {e.id: e for e in rows}
+
+
+def _with_details(nodes: List[Dict[str, Any]], entities: Dict[UUID, models.Entity]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": node["id"],
+            "type": entities[node["id"]].type,
+            "external_id": entities[node["id"]].external_id,
+            "extra_data": entities[node["id"]].extra_data,
+            "depth": node["depth"],
+            "path": node["path"],
+            "relation": node["relation"],
+        }
+        for node in nodes if node["id"] in entities
+    ]
+
+
+async def trace_entity(db: AsyncSession, entity_id: UUID, direction: str = "both", max_depth: int = 10,
+                       relation: Optional[List[str]] = None) -> Dict[str, Any]:
+    entity = await db.get(models.Entity, entity_id)
+    if not entity:
+        raise HTTPException(status_code=404, detail="Entity not found")
+
+    ancestors = []
+    descendants = []
+
+    if settings.ENTITY_CLOSURE and not relation:
+        # one indexed closure lookup per direction, at any depth
+        if direction in ("up", "both"):
+            ancestors = await closure.walk(db, entity_id, "up", max_depth)
+        if direction in ("down", "both"):
+            descendants = await closure.walk(db, entity_id, "down", max_depth)
+    else:
+        if max_depth > MAX_WALK_DEPTH:
+            raise HTTPException(status_code=400, detail=f"max_depth above {MAX_WALK_DEPTH} needs ENTITY_CLOSURE "
+                                                        f"and no relation filter")
+        if direction in ("up", "both"):
+            ancestors = await link_graph.walk(db, entity_id, "up", max_depth, relation)
+
+        if direction in ("down", "both"):
+            descendants = await link_graph.walk(db, entity_id, "down", max_depth, relation)
+
+        # the index only knows ids: fetch every reached entity in one query
+        entities = await entity_details(db, [node["id"] for node in ancestors + descendants])
+        ancestors = _with_details(ancestors, entities)
+        descendants = _with_details(descendants, entities)
+
+    return {
+        "entity": {
+            "id": entity.id,
+            "type": entity.type,
+            "external_id": entity.external_id,
+            "extra_data": entity.extra_data,
+            "created_at": entity.created_at
+        },
+        "ancestors": ancestors,
+        "descendants": descendants,
+        "count": {
+            "ancestors": len(ancestors),
+            "descendants": len(descendants)
+        }
+    }
+
+
+async def entity_tree(db: AsyncSession, entity_id: UUID) -> Dict[str, Any]:
+    entity = await db.get(models.Entity, entity_id)
+    if not entity:
+        raise HTTPException(status_code=404, detail="Entity not found")
+
+    # Get all links where this entity is involved, then the linked entities in one query
+    parent_links = await link_graph.neighbours(db, entity_id, "up")
+    child_links = await link_graph.neighbours(db, entity_id, "down")
+    entities = await entity_details(db, [linked_id for linked_id, _ in parent_links + child_links])
+
+    return {
+        "entity": {
+            "id": entity.id,
+            "type": entity.type,
+            "external_id": entity.external_id,
+            "extra_data": entity.extra_data
+        },
+        "parents": [
+            {
+                "id": parent_id,
+                "type": entities[parent_id].type,
+                "external_id": entities[parent_id].external_id,
+                "relation": relation
+            }
+            for parent_id, relation in parent_links if parent_id in entities
+        ],
+        "children": [
+            {
+                "id": child_id,
+                "type": entities[child_id].type,
+                "external_id": entities[child_id].external_id,
+                "relation": relation
+            }
+            for child_id, relation in child_links if child_id in entities
+        ]
+    }
@@ -0,0 +1,119 @@
+# app / services / tracking
+
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.cache import resolve_external_id
+from app.pagination import after_cursor, set_next_cursor
+
+
+# timeline columns, read as rows rather than Event objects
+TIMELINE_COLUMNS = (
+    models.Event.id,
+    models.Event.entity_id,
+    models.Event.event_type,
+    models.Event.timestamp,
+    models.Event.location,
+    models.Event.actor,
+    models.Event.payload,
+)
+
+
+def serialize_event(ev) -> Dict[str, Any]:
+    """Timeline entry of an Event or a TIMELINE_COLUMNS row; ids and timestamps are left to the JSON encoder."""
+    return {
+        "id": ev.id,
+        "entity_id": ev.entity_id,
+        "status": ev.event_type,
+        "timestamp": getattr(ev, "timestamp", None),
+        "location": ev.location,
+        "actor": ev.actor,
+        "details": ev.payload or None,
+    }
+
+
+async def track_package(db: AsyncSession, tracking_number: str) -> Dict[str, Any]:
+    """
+    Package details + timeline for a given tracking_number (external_id).
+    """
+    entity = await resolve_external_id(db, tracking_number)
+    if not entity:
+        raise HTTPException(status_code=404, detail="Package not found")
+
+    events = (await db.execute(
+        select(*TIMELINE_COLUMNS)
+        .where(models.Event.entity_id == entity.id)
+        .order_by(models.Event.timestamp)
+    )).all()
+
+    timeline = [serialize_event(e) for e in events]
+    latest = timeline[-1] if timeline else None
+    package = {
+        "tracking_number": tracking_number,
+        "status": latest["status"] if latest else "created",
+        "current_location": latest["location"] if latest else None,
+        "package": {
+            "details": {
+                "sender": entity.extra_data.get("sender") if entity.extra_data else None,
+                "recipient": entity.extra_data.get("recipient") if entity.extra_data else None,
+                "destination": entity.extra_data.get("destination") if entity.extra_data else None,
+                "weight_kg": entity.extra_data.get("weight_kg") if entity.extra_data else None,
+            },
+            "created_at": getattr(entity, "created_at", None)
+        },
+        "timeline": timeline
+    }
+    return package
+
+
+async def list_packages(db: AsyncSession, status: Optional[str] = None, skip: int = 0, limit: int = 100,
+                        cursor: Optional[str] = None, response: Optional[Response] = None) -> List[Dict[str, Any]]:
+    # every entity has its entity_status row (written with the entity), so this is an inner join and a status
+    # filter is an idx_entity_status_type_status lookup; the type is on both sides so either index can lead
+    q = (
+        select(
+            models.Entity.external_id,
+            models.Entity.extra_data["recipient"].astext.label("recipient"),
+            models.Entity.extra_data["sender"].astext.label("sender"),
+            models.EntityStatus.current_status,
+            models.EntityStatus.current_location,
+            models.EntityStatus.last_updated,
+            models.Entity.created_at,
+            models.Entity.id,
+        )
+        .join(models.EntityStatus, models.EntityStatus.entity_id == models.Entity.id)
+        .where(models.Entity.type == "package", models.EntityStatus.entity_type == "package")
+    )
+    if status:
+        q = q.where(models.EntityStatus.current_status == status)
+    if cursor:
+        q = q.where(after_cursor(cursor, models.Entity.created_at, models.Entity.id))
+    elif skip:
+        q = q.offset(skip)
+    rows = (await db.execute(q.order_by(models.Entity.created_at.desc(), models.Entity.id.desc()).limit(limit))).all()
+    set_next_cursor(response, rows, limit, "created_at")
+
+    return [
+        {
+            "tracking_number": row.external_id,
+            "details": {"recipient": row.recipient, "sender": row.sender},
+            "current_status": row.current_status,
+            "current_location": row.current_location,
+            "last_updated": row.last_updated,
+        }
+        for row in rows
+    ]
+
+
+async def tracking_stats(db: AsyncSession) -> Dict[str, Any]:
+    # one entity_status row per package: the distribution adds up to the total
+    rows = (await db.execute(
+        select(models.EntityStatus.current_status, func.count())
+        .where(models.EntityStatus.entity_type == "package")
+        .group_by(models.EntityStatus.current_status)
+    )).all()
+    dist = {status: n for status, n in rows}
+
+    return {"total_packages": sum(dist.values()), "status_distribution": dist}
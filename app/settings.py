@@ -17,10 +17,64 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "tracelet_user"
     POSTGRES_PASSWORD: str = "password"
     POSTGRES_DB: str = "tracelet_db"
+    POSTGRES_HOST: str = "localhost"
     DATABASE_URL: str = "postgresql://tracelet_user:password@db:5432/tracelet_db"
     POSTGRES_PORT: int = 5432
     SQL_ECHO: bool = False
 
+    # Connection pool sizing (per process) of the async engine the API serves requests with; timeout and
+    # recycle apply to the sync engine too
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    # the sync (psycopg2) engine only serves scripts and startup tasks, so it keeps a small pool of its own
+    SYNC_DB_POOL_SIZE: int = 5
+    SYNC_DB_MAX_OVERFLOW: int = 10
+
+    # events partitioning: monthly partitions created this far ahead, and kept this long by event_partitions.py
+    EVENT_PARTITION_MONTHS_AHEAD: int = 3
+    EVENT_RETENTION_MONTHS: int = 24
+
+    # in-process external_id -> entity cache (per worker)
+    ENTITY_CACHE_SIZE: int = 50000
+    ENTITY_CACHE_TTL: float = 300.0
+
+    # PDF labels: memory for cached label PDFs and QR images (per worker), and processes generating
+    # QR codes for batch label sheets (0 = one per CPU)
+    LABEL_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    LABEL_WORKERS: int = 0
+
+    # in-process entity_links adjacency index (per worker): rebuilt from the database after this many
+    # seconds, which is how links changed by other workers become visible
+    GRAPH_INDEX_TTL: float = 60.0
+
+    # maintain the entity_closure table with every link change and answer /trace up/down queries from it;
+    # run `python rebuild_projections.py --closure` after turning it on
+    ENTITY_CLOSURE: bool = False
+
+    # live event feed (GET /events/stream): events buffered per subscriber before it's dropped as too slow,
+    # and seconds between keep-alive comments on an idle stream
+    EVENT_FEED_QUEUE_SIZE: int = 1000
+    EVENT_FEED_KEEPALIVE: float = 15.0
+
+    # scan deduplication: an event without a client Idempotency-Key repeats the same scan (and payload) stored
+    # less than this many seconds before; keys are kept this long (in the database and the per-worker cache of
+    # that many events)
+    IDEMPOTENCY_WINDOW: float = 60.0
+    IDEMPOTENCY_KEY_TTL: float = 24 * 60 * 60
+    IDEMPOTENCY_CACHE_SIZE: int = 50000
+
+    # write-behind ingestion (app/event_buffer.py): POST /events queues events and a background flusher writes
+    # them in one transaction every EVENT_FLUSH_INTERVAL_MS, or as soon as EVENT_FLUSH_MAX_EVENTS are waiting.
+    # At most EVENT_BUFFER_MAX_PENDING events wait at once; a post waits EVENT_BUFFER_WAIT seconds for room,
+    # then gets a 503. Off by default: each post then commits on its own.
+    EVENT_WRITE_BEHIND: bool = False
+    EVENT_FLUSH_INTERVAL_MS: float = 5.0
+    EVENT_FLUSH_MAX_EVENTS: int = 500
+    EVENT_BUFFER_MAX_PENDING: int = 10000
+    EVENT_BUFFER_WAIT: float = 1.0
+
     class Config:
         env_file = ".env"
 
@@ -38,4 +92,12 @@ def get_database_url() -> str:
         f"postgresql+psycopg2://{settings.POSTGRES_USER}:"
         f"{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_HOST}:"
         f"{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
-    )
\ No newline at end of file
+    )
+
+
+def get_async_database_url() -> str:
+    return (
+        f"postgresql+asyncpg://{settings.POSTGRES_USER}:"
+        f"{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_HOST}:"
+        f"{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
+    )
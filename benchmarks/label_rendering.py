@@ -0,0 +1,94 @@
+# benchmarks / label_rendering.py
+#
+# Per-label render time and PDF size for each label code, against the previous raster QR path
+# (qrcode -> PNG -> PIL -> drawInlineImage). Run from the repository root:
+#
+#   python -m benchmarks.label_rendering --labels 500
+
+import argparse
+import io
+import time
+import qrcode
+from PIL import Image
+from reportlab.lib.pagesizes import A5
+from reportlab.pdfgen import canvas
+from app.labels import Label, draw_label, draw_label_text, encode_matrices
+
+
+def raster_qr_encode(labels):
+    """The old rendering path, kept here as the baseline: one PNG per label..."""
+    pngs = []
+    for label in labels:
+        qr = qrcode.QRCode(box_size=6, border=2)
+        qr.add_data(label.external_id)
+        qr.make(fit=True)
+        img = qr.make_image(fill_color="black", back_color="white")
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        pngs.append(buffer.getvalue())
+    return pngs
+
+
+def raster_qr_draw(labels, pngs):
+    """...decoded again with PIL and embedded as an inline image."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A5)
+    width, _ = A5
+    for label, png in zip(labels, pngs):
+        draw_label_text(pdf, label)
+        pdf.drawInlineImage(Image.open(io.BytesIO(png)), width - 150, 30, 120, 120)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def vector_encode(symbology):
+    if symbology == "code128":
+        return lambda labels: [None] * len(labels)
+    return lambda labels: encode_matrices(symbology, [label.external_id for label in labels])
+
+
+def vector_draw(symbology):
+    def draw(labels, matrices):
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A5)
+        for label, matrix in zip(labels, matrices):
+            draw_label(pdf, label, symbology, matrix)
+        pdf.save()
+        return buffer.getvalue()
+    return draw
+
+
+def measure(name, encode, draw, labels):
+    single = draw(labels[:1], encode(labels[:1]))
+
+    start = time.perf_counter()
+    codes = encode(labels)
+    encoded = time.perf_counter()
+    sheet = draw(labels, codes)
+    drawn = time.perf_counter()
+
+    n = len(labels)
+    encode_ms = (encoded - start) / n * 1000
+    draw_ms = (drawn - encoded) / n * 1000
+    print(f"{name:<18} {encode_ms:>9.2f} {draw_ms:>9.2f} {encode_ms + draw_ms:>9.2f} "
+          f"{len(single):>12,} {len(sheet) / n:>12,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark label PDF rendering per code type.")
+    parser.add_argument("--labels", type=int, default=500, help="labels per sheet")
+    args = parser.parse_args()
+
+    labels = [Label(f"TRK{i:010d}", "Sender GmbH", "Jane Doe", "Berlin", "1.5") for i in range(args.labels)]
+
+    print(f"\n{args.labels} labels on one sheet, single thread (ms per label, PDF bytes)\n")
+    print(f"{'path':<18} {'encode':>9} {'draw':>9} {'total':>9} {'single PDF':>12} {'per page':>12}")
+    measure("raster qr (old)", raster_qr_encode, raster_qr_draw, labels)
+    for symbology in ("qr", "code128", "datamatrix"):
+        measure(f"vector {symbology}", vector_encode(symbology), vector_draw(symbology), labels)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks / list_serialization.py
+#
+# Rows/sec of the listing endpoints' response path on 1000-row pages: ORM objects validated against the
+# response_model (from_attributes) and dumped by Pydantic, as FastAPI does with a response_model, against
+# column rows encoded with orjson (app/responses.py). Needs a database with at least --rows entities and
+# events. Run from the repository root:
+#
+#   python -m benchmarks.list_serialization --rows 1000 --rounds 20
+
+import argparse
+import asyncio
+import time
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from app import models, schemas
+from app.db import AsyncSessionLocal, async_engine
+from app.responses import ORJSONResponse
+from app.services.entities import ENTITY_COLUMNS
+from app.services.events import EVENT_COLUMNS
+
+CASES = (
+    # name, ORM query, column query, response model
+    ("entities", lambda: select(models.Entity).order_by(models.Entity.created_at.desc(), models.Entity.id.desc()),
+     lambda: select(*ENTITY_COLUMNS).order_by(models.Entity.created_at.desc(), models.Entity.id.desc()),
+     schemas.EntityRead),
+    ("events", lambda: select(models.Event).order_by(models.Event.timestamp.desc(), models.Event.id.desc()),
+     lambda: select(*EVENT_COLUMNS).order_by(models.Event.timestamp.desc(), models.Event.id.desc()),
+     schemas.EventRead),
+)
+
+
+async def model_path(db, query, adapter, rows):
+    """Fetch ORM objects, validate and dump them through the response model."""
+    fetched = time.perf_counter()
+    objects = (await db.scalars(query.limit(rows))).all()
+    fetched = time.perf_counter() - fetched
+    start = time.perf_counter()
+    body = adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+    return fetched, time.perf_counter() - start, len(objects), len(body)
+
+
+async def row_path(db, query, rows):
+    """Fetch column rows and encode them with orjson."""
+    fetched = time.perf_counter()
+    result = (await db.execute(query.limit(rows))).all()
+    fetched = time.perf_counter() - fetched
+    start = time.perf_counter()
+    body = ORJSONResponse([row._asdict() for row in result]).body
+    return fetched, time.perf_counter() - start, len(result), len(body)
+
+
+def report(name, timings):
+    fetch = sum(t[0] for t in timings) / len(timings)
+    encode = sum(t[1] for t in timings) / len(timings)
+    rows = timings[0][2]
+    print(f"{name:<22} {fetch * 1000:>9.2f} {encode * 1000:>9.2f} {(fetch + encode) * 1000:>9.2f} "
+          f"{rows / (fetch + encode):>12,.0f} {rows / encode:>14,.0f} {timings[0][3]:>10,}")
+    return rows / (fetch + encode)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint serialization paths.")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per page")
+    parser.add_argument("--rounds", type=int, default=20, help="pages fetched per path")
+    args = parser.parse_args()
+
+    print(f"\n{args.rows}-row pages, mean of {args.rounds} rounds (ms per page)\n")
+    print(f"{'path':<22} {'fetch':>9} {'encode':>9} {'total':>9} {'rows/s':>12} {'rows/s encode':>14} "
+          f"{'bytes':>10}")
+    async with AsyncSessionLocal() as db:
+        for name, orm_query, column_query, model in CASES:
+            adapter = TypeAdapter(List[model])
+            # warm up both paths (statement cache, pydantic core)
+            await model_path(db, orm_query(), adapter, args.rows)
+            await row_path(db, column_query(), args.rows)
+
+            before = [await model_path(db, orm_query(), adapter, args.rows) for _ in range(args.rounds)]
+            after = [await row_path(db, column_query(), args.rows) for _ in range(args.rounds)]
+            if before[0][2] < args.rows:
+                print(f"({name}: only {before[0][2]} rows in the database)")
+            old = report(f"{name} orm + model", before)
+            new = report(f"{name} rows + orjson", after)
+            print(f"{'':<22} {new / old:.1f}x rows/s\n")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
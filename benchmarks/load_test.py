@@ -0,0 +1,334 @@
+# benchmarks / load_test.py
+#
+# Load test of the API hot paths against a running server. Seeds a synthetic dataset through the API
+# (shipment -> container -> package -> item link trees, packages with status progressions following
+# PackageStatus), so the projections, closure table and the workers' link indexes are maintained as in
+# production, then drives each endpoint with a fixed number of concurrent clients and reports throughput
+# and p50/p95/p99 latency. Results are written as JSON; pass an earlier file with --compare to see the
+# change per endpoint.
+#
+# The dataset is generated from --seed and named after the seed and the scale (--tag), so a rerun with the
+# same arguments finds it and only runs the load phase. Start the server first, e.g.
+#
+#   uvicorn app.main:app --port 8000 --workers 4
+#   python -m benchmarks.load_test --shipments 20 --requests 2000 --concurrency 32
+#   python -m benchmarks.load_test --compare benchmarks/results/load_test-20261017-093000.json
+#
+# The client runs in one process: at high concurrency check that it isn't the bottleneck (CPU of this
+# process), or run several with --only.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import httpx
+from app.schemas import PackageStatus
+
+API = "/api/v1"
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# how a package moves on after being created; each package stops at a random point of its path
+PATHS = (
+    ("picked_up", "in_transit", "sorting_center", "in_transit", "out_for_delivery", "delivered"),
+    ("picked_up", "in_transit", "customs", "sorting_center", "out_for_delivery", "failed_delivery", "returned"),
+    ("picked_up", "sorting_center", "exception"),
+)
+LOCATIONS = ("Berlin Hub", "Hamburg Port", "Munich Sorting", "Leipzig Air", "Cologne Depot", "Frankfurt Hub")
+
+SEED_CHUNK = 5000  # events / links per bulk request
+
+ENDPOINTS = ("tracking_track", "tracking_packages", "tracking_stats", "trace", "links_children", "events_post")
+
+
+# ----------------------
+# Dataset
+# ----------------------
+class Dataset:
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.shipments: List[str] = []
+        self.containers: List[str] = []
+        self.packages: List[str] = []
+        self.items: List[str] = []
+        self.tracking_numbers: List[str] = []
+
+    def counts(self) -> Dict[str, int]:
+        return {"shipments": len(self.shipments), "containers": len(self.containers),
+                "packages": len(self.packages), "items": len(self.items)}
+
+
+def external_id(tag: str, kind: str, n: int) -> str:
+    return f"{tag}-{kind}{n:06d}"
+
+
+async def gather_limited(concurrency: int, calls: List[Callable[[], Any]]) -> List[Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(call):
+        async with semaphore:
+            return await call()
+
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+async def check(response: httpx.Response, expected: Tuple[int, ...] = (200, 201)) -> Dict[str, Any]:
+    if response.status_code not in expected:
+        raise SystemExit(f"{response.request.method} {response.request.url.path} -> "
+                         f"{response.status_code}: {response.text[:300]}")
+    return response.json()
+
+
+async def load_dataset(client: httpx.AsyncClient, dataset: Dataset) -> None:
+    """Collect the ids of an existing dataset, page by page."""
+    kinds = {"shipment": dataset.shipments, "container": dataset.containers,
+             "package": dataset.packages, "item": dataset.items}
+    for entity_type, ids in kinds.items():
+        rows, cursor = [], None
+        while True:
+            params = {"q": f"{dataset.tag}-", "type": entity_type, "limit": 500}
+            if cursor:
+                params["cursor"] = cursor
+            response = await client.get(f"{API}/entities/", params=params)
+            rows.extend(await check(response, (200,)))
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                break
+        rows.sort(key=lambda row: row["external_id"])
+        ids.extend(row["id"] for row in rows)
+        if entity_type == "package":
+            dataset.tracking_numbers.extend(row["external_id"] for row in rows)
+
+
+async def seed(client: httpx.AsyncClient, args: argparse.Namespace) -> Dataset:
+    dataset = Dataset(args.tag)
+    rng = random.Random(args.seed)
+    n_containers = args.shipments * args.containers
+    n_packages = n_containers * args.packages
+    n_items = n_packages * args.items
+
+    last = external_id(args.tag, "P", n_packages - 1)
+    if (await client.get(f"{API}/tracking/track/{last}")).status_code == 200:
+        await load_dataset(client, dataset)
+        print(f"Using the existing dataset {args.tag}: {dataset.counts()}")
+        return dataset
+
+    print(f"Seeding {args.tag}: {args.shipments} shipments, {n_containers} containers, "
+          f"{n_packages} packages, {n_items} items")
+    start = time.perf_counter()
+
+    async def create_entity(entity_type, kind, n):
+        body = {"type": entity_type, "external_id": external_id(args.tag, kind, n)}
+        return (await check(await client.post(f"{API}/entities/", json=body)))["id"]
+
+    async def create_package(n):
+        body = {"tracking_number": external_id(args.tag, "P", n), "sender": f"Sender {rng.randrange(500)}",
+                "recipient": f"Recipient {rng.randrange(5000)}", "destination": rng.choice(LOCATIONS),
+                "weight_kg": round(rng.uniform(0.1, 30), 2), "creator": "load-test"}
+        return (await check(await client.post(f"{API}/tracking/package", json=body)))["timeline"][0]["entity_id"]
+
+    # packages after the other entities, so the probe above only finds datasets that got that far (a run
+    # interrupted while seeding links or events leaves an incomplete one: seed again with another --tag)
+    for ids, calls in (
+        (dataset.shipments, [lambda n=n: create_entity("shipment", "S", n) for n in range(args.shipments)]),
+        (dataset.containers, [lambda n=n: create_entity("container", "C", n) for n in range(n_containers)]),
+        (dataset.items, [lambda n=n: create_entity("item", "I", n) for n in range(n_items)]),
+        (dataset.packages, [lambda n=n: create_package(n) for n in range(n_packages)]),
+    ):
+        ids.extend(await gather_limited(args.concurrency, calls))
+    dataset.tracking_numbers = [external_id(args.tag, "P", n) for n in range(n_packages)]
+
+    links = []
+    for n, container in enumerate(dataset.containers):
+        links.append({"parent_id": dataset.shipments[n // args.containers], "child_id": container,
+                      "relation": "contains"})
+    for n, package in enumerate(dataset.packages):
+        links.append({"parent_id": dataset.containers[n // args.packages], "child_id": package,
+                      "relation": "contains"})
+    for n, item in enumerate(dataset.items):
+        links.append({"parent_id": dataset.packages[n // args.items], "child_id": item, "relation": "contains"})
+    for i in range(0, len(links), SEED_CHUNK):
+        result = await check(await client.post(f"{API}/links/bulk", json=links[i:i + SEED_CHUNK]))
+        if result["failed"]:
+            raise SystemExit(f"{result['failed']} links failed: {result['results'][:3]}")
+
+    events = []
+    for package in dataset.packages:
+        path = rng.choice(PATHS)
+        for n, status in enumerate(path[:rng.randint(0, len(path))]):
+            events.append({"entity_id": package, "event_type": status, "location": rng.choice(LOCATIONS),
+                           "actor": f"scanner-{rng.randrange(100)}", "idempotency_key": f"{package}:{n}"})
+    for i in range(0, len(events), SEED_CHUNK):
+        result = await check(await client.post(f"{API}/events/bulk", json=events[i:i + SEED_CHUNK]))
+        if result["failed"]:
+            raise SystemExit(f"{result['failed']} events failed: {result['results'][:3]}")
+
+    print(f"Seeded {sum(dataset.counts().values())} entities, {len(links)} links and {len(events)} events "
+          f"in {time.perf_counter() - start:.1f} s")
+    return dataset
+
+
+# ----------------------
+# Load
+# ----------------------
+def scenarios(dataset: Dataset, run_id: str) -> Dict[str, Callable[[random.Random, int], Tuple[str, str, Any]]]:
+    """Endpoint name -> request factory (rng, request number) -> (method, path, json body)."""
+    statuses = [None] + [status.value for status in PackageStatus]
+    trace_roots = dataset.containers or dataset.packages
+
+    def packages(rng, n):
+        status = rng.choice(statuses)
+        return "GET", f"{API}/tracking/packages?limit=100" + (f"&status={status}" if status else ""), None
+
+    def post_event(rng, n):
+        body = {"entity_id": rng.choice(dataset.packages), "event_type": "in_transit",
+                "location": rng.choice(LOCATIONS), "actor": "load-test", "idempotency_key": f"{run_id}:{n}"}
+        return "POST", f"{API}/events/", body
+
+    return {
+        "tracking_track": lambda rng, n: ("GET", f"{API}/tracking/track/{rng.choice(dataset.tracking_numbers)}", None),
+        "tracking_packages": packages,
+        "tracking_stats": lambda rng, n: ("GET", f"{API}/tracking/stats", None),
+        "trace": lambda rng, n: ("GET", f"{API}/trace/{rng.choice(trace_roots)}?direction=both", None),
+        "links_children": lambda rng, n: ("GET", f"{API}/links/{rng.choice(trace_roots)}/children", None),
+        "events_post": post_event,
+    }
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+async def drive(client: httpx.AsyncClient, make_request, requests: int, concurrency: int,
+                seed: int) -> Dict[str, Any]:
+    """Send `requests` requests from `concurrency` clients, each sending its next one as soon as it's answered."""
+    rng = random.Random(seed)
+    plan = [make_request(rng, n) for n in range(requests)]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_request = iter(plan)
+
+    async def worker():
+        for method, path, body in next_request:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                await response.aread()
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status_codes": statuses,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+# ----------------------
+# Report
+# ----------------------
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    print(f"\n{'endpoint':<20} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+    for name, r in results.items():
+        print(f"{name:<20} {r['throughput_rps']:>9,.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['max_ms']:>9.2f} {r['errors']:>7}")
+        old = (baseline or {}).get(name)
+        if old:
+            def change(key):
+                return f"{(r[key] / old[key] - 1) * 100:+.0f}%" if old[key] else "n/a"
+            print(f"{'  vs baseline':<20} {change('throughput_rps'):>9} {change('p50_ms'):>9} "
+                  f"{change('p95_ms'):>9} {change('p99_ms'):>9} {change('max_ms'):>9}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the API hot paths against a running server.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server base URL")
+    parser.add_argument("--seed", type=int, default=42, help="random seed of the dataset and the requests")
+    parser.add_argument("--shipments", type=int, default=10, help="shipments in the dataset")
+    parser.add_argument("--containers", type=int, default=5, help="containers per shipment")
+    parser.add_argument("--packages", type=int, default=20, help="packages per container")
+    parser.add_argument("--items", type=int, default=2, help="items per package")
+    parser.add_argument("--tag", help="external_id prefix of the dataset (default: from seed and scale)")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per endpoint first")
+    parser.add_argument("--only", nargs="+", metavar="ENDPOINT", help=f"endpoints to run: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--output", help=f"results file (default: {os.path.relpath(RESULTS_DIR)}/load_test-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+    args.tag = args.tag or f"LT{args.seed}-{args.shipments}x{args.containers}x{args.packages}x{args.items}"
+
+    names = args.only or list(ENDPOINTS)
+    unknown = set(names) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints {sorted(unknown)}, choose from {list(ENDPOINTS)}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    now = datetime.now(timezone.utc)
+    run_id = f"{args.tag}:{now:%Y%m%d%H%M%S%f}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        dataset = await seed(client, args)
+        all_scenarios = scenarios(dataset, run_id)
+
+        print(f"\n{args.requests} requests per endpoint, {args.concurrency} concurrent clients")
+        results = {}
+        for i, name in enumerate(names):
+            # the warm-up draws its own requests (and idempotency keys), then the measured run is reproducible
+            await drive(client, lambda rng, n: all_scenarios[name](rng, -1 - n), args.warmup, args.concurrency,
+                        args.seed + 1000 + i)
+            results[name] = await drive(client, all_scenarios[name], args.requests, args.concurrency, args.seed + i)
+
+    print_results(results, baseline)
+    report = {
+        "started_at": now.isoformat(),
+        "git_commit": git_commit(),
+        "url": args.url,
+        "settings": {key: getattr(args, key) for key in ("seed", "tag", "requests", "concurrency", "warmup")},
+        "dataset": dataset.counts(),
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"load_test-{now:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
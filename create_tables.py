@@ -3,12 +3,19 @@
 import sys
 from sqlalchemy.exc import SQLAlchemyError
 from app.db import Base, engine
+from app.partitions import ensure_event_partitions
+from app.search import ensure_search_indexes
 import app.models  # make sure all your models are imported so they register with Base
 
 def main():
     try:
         print("\nCreating tables...\n")
         Base.metadata.create_all(bind=engine)
+        # events is partitioned, create_all only creates the parent table
+        with engine.begin() as conn:
+            ensure_event_partitions(conn)
+            # trigram indexes for substring search (needs the pg_trgm extension)
+            ensure_search_indexes(conn)
         print("\n✅ Tables created successfully!\n")
     except SQLAlchemyError as e:
         print("\n❌ Failed to create tables!\n")
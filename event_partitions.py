@@ -0,0 +1,108 @@
+# event_partitions.py
+
+import argparse
+import gzip
+import os
+import sys
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from app.db import engine
+from app.partitions import detach_partition, detached_older_than, ensure_event_partitions, partitions_older_than
+from app.settings import settings
+
+
+def archive_path(name: str, archive_dir: str) -> str:
+    return os.path.join(archive_dir, f"{name}.csv.gz")
+
+
+def archive_table(conn, name: str, archive_dir: str) -> str:
+    """
+    Dump a (detached) partition to <archive_dir>/<name>.csv.gz with COPY. The dump is written next to it
+    and renamed when complete, so an existing archive file is always a whole one.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = archive_path(name, archive_dir)
+    partial = path + ".part"
+    try:
+        with gzip.open(partial, "wb") as fh:
+            cursor = conn.connection.cursor()
+            try:
+                cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", fh)
+            finally:
+                cursor.close()
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return path
+
+
+def ensure(args):
+    with engine.begin() as conn:
+        created = ensure_event_partitions(conn, months_ahead=args.months_ahead)
+    print(f"\n✅ Partitions ready ({len(created)} created: {', '.join(created) or '-'})\n")
+
+
+def retain(args):
+    with engine.connect() as conn:
+        attached = partitions_older_than(conn, args.keep_months)
+        # detached by an earlier run that failed before archiving/dropping them (or ran with --no-drop)
+        detached = detached_older_than(conn, args.keep_months)
+    old = sorted(attached + detached)
+    if not old:
+        print(f"\nNothing to do: no partitions older than {args.keep_months} months.\n")
+        return
+
+    print(f"\nPartitions outside the {args.keep_months}-month retention window: {', '.join(old)}\n")
+    if args.dry_run:
+        return
+
+    # every step can be rerun: a partition that stays detached is picked up again by the next run
+    for name in old:
+        if name in attached:
+            # detach first (own transaction), so live queries stop seeing the partition right away
+            with engine.begin() as conn:
+                detach_partition(conn, name)
+        with engine.begin() as conn:
+            if args.archive_dir and os.path.exists(archive_path(name, args.archive_dir)):
+                print(f"  {name}: already archived")
+            elif args.archive_dir:
+                path = archive_table(conn, name, args.archive_dir)
+                print(f"  {name}: archived to {path}")
+            if args.drop:
+                conn.execute(text(f"DROP TABLE {name}"))
+                print(f"  {name}: dropped")
+            else:
+                print(f"  {name}: detached (kept as standalone table)")
+    print("\n✅ Retention complete\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the monthly partitions of the events table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ensure = sub.add_parser("ensure", help="create upcoming monthly partitions")
+    p_ensure.add_argument("--months-ahead", type=int, default=settings.EVENT_PARTITION_MONTHS_AHEAD)
+    p_ensure.set_defaults(func=ensure)
+
+    p_retain = sub.add_parser("retain", help="detach, archive and drop partitions past the retention window")
+    p_retain.add_argument("--keep-months", type=int, default=settings.EVENT_RETENTION_MONTHS)
+    p_retain.add_argument("--archive-dir", default="archive",
+                          help="directory for <partition>.csv.gz dumps ('' to skip archiving)")
+    p_retain.add_argument("--no-drop", dest="drop", action="store_false",
+                          help="keep detached partitions as standalone tables")
+    p_retain.add_argument("--dry-run", action="store_true", help="only list the partitions that would be removed")
+    p_retain.set_defaults(func=retain)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except SQLAlchemyError as e:
+        print("\n❌ Partition maintenance failed!\n")
+        print("Error:", e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
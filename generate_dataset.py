@@ -0,0 +1,274 @@
+# generate_dataset.py
+
+import argparse
+import csv
+import io
+import json
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+import psycopg2
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from app.db import engine
+from app.partitions import ensure_event_partitions
+from app.projections import DEFAULT_STATUS
+from app.schemas import PackageStatus as S
+from app.settings import settings
+
+# Synthetic production-scale data, loaded with COPY: shipment -> container -> package -> item trees (a few
+# packages are also transferred into a second container of their shipment, so the links form a DAG, not
+# just trees), packages moving through PackageStatus, and the entity_status projection (and entity_closure
+# with --closure) that the API would have written. The data is cut into chunks of whole shipments; every
+# chunk is generated from its own seed and loaded in one transaction, so chunks can load in parallel and
+# a rerun with the same arguments skips the chunks that are already in.
+
+# next status of a package -> weight; delivered and returned are final
+TRANSITIONS = {
+    S.CREATED: {S.PICKED_UP: 97, S.EXCEPTION: 3},
+    S.PICKED_UP: {S.IN_TRANSIT: 90, S.SORTING_CENTER: 10},
+    S.IN_TRANSIT: {S.SORTING_CENTER: 60, S.CUSTOMS: 10, S.OUT_FOR_DELIVERY: 30},
+    S.SORTING_CENTER: {S.IN_TRANSIT: 50, S.OUT_FOR_DELIVERY: 45, S.EXCEPTION: 5},
+    S.CUSTOMS: {S.SORTING_CENTER: 90, S.EXCEPTION: 10},
+    S.OUT_FOR_DELIVERY: {S.DELIVERED: 90, S.FAILED_DELIVERY: 10},
+    S.FAILED_DELIVERY: {S.OUT_FOR_DELIVERY: 60, S.RETURNED: 40},
+    S.EXCEPTION: {S.IN_TRANSIT: 70, S.RETURNED: 30},
+}
+CITIES = ("Berlin", "Hamburg", "Munich", "Cologne", "Frankfurt", "Stuttgart", "Leipzig", "Dresden", "Hannover",
+          "Nuremberg", "Bremen", "Rotterdam", "Antwerp", "Vienna", "Zurich", "Prague", "Warsaw", "Copenhagen")
+SITES = {S.PICKED_UP: "Depot", S.IN_TRANSIT: "Hub", S.SORTING_CENTER: "Sorting Center", S.CUSTOMS: "Customs",
+         S.EXCEPTION: "Hub"}
+
+TABLES = {
+    # table -> columns, in the order the rows are generated
+    "entities": ("id", "type", "external_id", "extra_data", "created_at"),
+    "entity_links": ("parent_id", "child_id", "relation"),
+    "events": ("id", "entity_id", "event_type", "location", "actor", "payload", "timestamp"),
+    "entity_status": ("entity_id", "entity_type", "current_status", "current_location", "last_updated",
+                      "event_count"),
+    "entity_closure": ("ancestor_id", "descendant_id", "depth", "paths"),
+}
+
+
+def external_id(tag: str, kind: str, n: int) -> str:
+    return f"{tag}-{kind}{n:09d}"
+
+
+def chunk_range(args, chunk: int) -> range:
+    return range(chunk * args.chunk_size, min((chunk + 1) * args.chunk_size, args.shipments))
+
+
+class Chunk:
+    """The rows of one chunk of shipments, per table."""
+
+    def __init__(self, args, chunk: int, now: datetime):
+        self.args = args
+        # the tag too: datasets with the same seed and another tag get their own ids
+        self.rng = random.Random(f"{args.tag}:{args.seed}:{chunk}")
+        self.now = now
+        self.rows: Dict[str, List[Tuple[Any, ...]]] = {table: [] for table in TABLES}
+        self.parents: Dict[uuid.UUID, List[uuid.UUID]] = {}
+        for shipment in chunk_range(args, chunk):
+            self.add_shipment(shipment)
+
+    def new_id(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def add_entity(self, entity_type: str, kind: str, n: int, created_at: datetime,
+                   extra_data: Dict[str, Any] = None) -> uuid.UUID:
+        entity_id = self.new_id()
+        self.rows["entities"].append((entity_id, entity_type, external_id(self.args.tag, kind, n),
+                                      json.dumps(extra_data or {}), created_at))
+        return entity_id
+
+    def add_link(self, parent_id: uuid.UUID, child_id: uuid.UUID, relation: str) -> None:
+        self.rows["entity_links"].append((parent_id, child_id, relation))
+        self.parents.setdefault(child_id, []).append(parent_id)
+
+    def add_shipment(self, n: int) -> None:
+        args, rng = self.args, self.rng
+        created_at = self.now - timedelta(days=args.days * rng.random())
+        shipment = self.add_entity("shipment", "S", n, created_at, {"carrier": f"Carrier {rng.randrange(40)}"})
+        self.add_status(shipment, "shipment")
+        containers = []
+        for c in range(n * args.containers, (n + 1) * args.containers):
+            container = self.add_entity("container", "C", c, created_at + timedelta(minutes=rng.randrange(60)))
+            self.add_link(shipment, container, "contains")
+            self.add_status(container, "container")
+            containers.append(container)
+        for i, container in enumerate(containers):
+            first = (n * args.containers + i) * args.packages
+            for p in range(first, first + args.packages):
+                package = self.add_package(p, created_at + timedelta(minutes=rng.randrange(60, 240)))
+                self.add_link(container, package, "contains")
+                others = [other for other in containers if other != container]
+                if others and rng.random() < args.transfer_ratio:
+                    self.add_link(rng.choice(others), package, "transferred")
+                for item in range(p * args.items, (p + 1) * args.items):
+                    item_id = self.add_entity("item", "I", item, created_at, {"sku": f"SKU-{rng.randrange(10000):05d}"})
+                    self.add_link(package, item_id, "contains")
+                    self.add_status(item_id, "item")
+
+    def add_package(self, n: int, created_at: datetime) -> uuid.UUID:
+        rng = self.rng
+        destination = rng.choice(CITIES)
+        details = {"sender": f"Sender {rng.randrange(5000)}", "recipient": f"Recipient {rng.randrange(500000)}",
+                   "destination": destination, "weight_kg": round(rng.uniform(0.1, 30), 2)}
+        package = self.add_entity("package", "P", n, created_at, details)
+
+        # the "created" event POST /tracking/package writes, then scans until a final status, the event
+        # limit or the present
+        events = [(S.CREATED.value, None, "system", {"note": "Package created", "meta": details}, created_at)]
+        status, timestamp = S.CREATED, created_at
+        while status in TRANSITIONS and len(events) < self.args.max_events:
+            choices = TRANSITIONS[status]
+            status = rng.choices(list(choices), weights=list(choices.values()))[0]
+            timestamp += timedelta(minutes=rng.randrange(10, 24 * 60))
+            if timestamp >= self.now:
+                break
+            if status in SITES:
+                location, actor = f"{rng.choice(CITIES)} {SITES[status]}", f"scanner-{rng.randrange(1000)}"
+            else:
+                location, actor = destination, f"courier-{rng.randrange(5000)}"
+            events.append((status.value, location, actor, None, timestamp))
+        for event_type, location, actor, payload, ts in events:
+            self.rows["events"].append((self.new_id(), package, event_type, location, actor,
+                                        json.dumps(payload) if payload is not None else None, ts))
+        last = events[-1]
+        self.rows["entity_status"].append((package, "package", last[0], last[1], last[4], len(events)))
+        return package
+
+    def add_status(self, entity_id: uuid.UUID, entity_type: str) -> None:
+        # entities without events, as init_entity_status() leaves them
+        self.rows["entity_status"].append((entity_id, entity_type, DEFAULT_STATUS, None, None, 0))
+
+    def add_closure(self) -> None:
+        """entity_closure rows of the chunk's links: (ancestor, descendant, depth) -> number of paths."""
+        paths: Dict[uuid.UUID, Counter] = {}
+
+        def ancestors(node: uuid.UUID) -> Counter:
+            if node not in paths:
+                counter = Counter()
+                for parent in self.parents.get(node, ()):
+                    counter[(parent, 1)] += 1
+                    for (ancestor, depth), n in ancestors(parent).items():
+                        counter[(ancestor, depth + 1)] += n
+                paths[node] = counter
+            return paths[node]
+
+        for child in self.parents:
+            for (ancestor, depth), n in ancestors(child).items():
+                self.rows["entity_closure"].append((ancestor, child, depth, n))
+
+
+def copy_rows(cursor, table: str, rows: List[Tuple[Any, ...]]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # empty unquoted fields are NULL in COPY's csv format
+        writer.writerow(["" if value is None else value for value in row])
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(TABLES[table])}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def load_chunk(args, chunk: int, now: datetime) -> Dict[str, Any]:
+    """Generate and COPY one chunk in one transaction, unless it's loaded already."""
+    first = external_id(args.tag, "S", chunk_range(args, chunk)[0])
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM entities WHERE external_id = :id"), {"id": first}).first():
+            return {"chunk": chunk, "skipped": True}
+        data = Chunk(args, chunk, now)
+        if args.closure:
+            data.add_closure()
+        generated = time.perf_counter()
+        cursor = conn.connection.cursor()
+        try:
+            for table, rows in data.rows.items():
+                if rows:
+                    copy_rows(cursor, table, rows)
+        finally:
+            cursor.close()
+    return {"chunk": chunk, "skipped": False, "rows": {table: len(rows) for table, rows in data.rows.items()},
+            "generate_seconds": generated - start, "seconds": time.perf_counter() - start}
+
+
+def init_worker():
+    # connections of the parent process must not be shared with the workers
+    engine.dispose(close=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Tracelet dataset and load it with COPY.")
+    parser.add_argument("--shipments", type=int, default=1000, help="shipments to generate")
+    parser.add_argument("--containers", type=int, default=10, help="containers per shipment")
+    parser.add_argument("--packages", type=int, default=50, help="packages per container")
+    parser.add_argument("--items", type=int, default=2, help="items per package")
+    parser.add_argument("--max-events", type=int, default=12, help="events per package at most")
+    parser.add_argument("--transfer-ratio", type=float, default=0.02,
+                        help="share of packages also linked to a second container of their shipment")
+    parser.add_argument("--days", type=float, default=90, help="spread the shipments over this many past days")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--tag", help="external_id prefix (default: GEN<seed>)")
+    parser.add_argument("--chunk-size", type=int, default=20, help="shipments per chunk (one transaction)")
+    parser.add_argument("--workers", type=int, default=4, help="chunks loaded in parallel")
+    parser.add_argument("--closure", action=argparse.BooleanOptionalAction, default=settings.ENTITY_CLOSURE,
+                        help="also write entity_closure rows (default: ENTITY_CLOSURE)")
+    args = parser.parse_args()
+    args.tag = args.tag or f"GEN{args.seed}"
+
+    chunks = (args.shipments + args.chunk_size - 1) // args.chunk_size
+    packages = args.shipments * args.containers * args.packages
+    print(f"\nGenerating {args.tag}: {args.shipments} shipments, {args.shipments * args.containers} containers, "
+          f"{packages} packages, {packages * args.items} items in {chunks} chunks, {args.workers} workers\n")
+
+    # every event falls within the last --days days: the monthly partitions must cover that window
+    now = datetime.now(timezone.utc)
+    try:
+        with engine.begin() as conn:
+            ensure_event_partitions(conn, start=(now - timedelta(days=args.days)).date())
+
+        totals = Counter()
+        loaded = skipped = 0
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as pool:
+            futures = [pool.submit(load_chunk, args, chunk, now) for chunk in range(chunks)]
+            for future in as_completed(futures):
+                result = future.result()
+                if result["skipped"]:
+                    skipped += 1
+                    continue
+                loaded += 1
+                totals.update(result["rows"])
+                rows = sum(result["rows"].values())
+                elapsed = time.perf_counter() - start
+                print(f"  chunk {result['chunk'] + 1}/{chunks}: {rows:,} rows in {result['seconds']:.1f} s "
+                      f"(generate {result['generate_seconds']:.1f} s) | total {sum(totals.values()):,} rows, "
+                      f"{sum(totals.values()) / elapsed:,.0f} rows/s")
+        elapsed = time.perf_counter() - start
+
+        if totals:
+            # fresh planner statistics for the grown tables
+            with engine.begin() as conn:
+                conn.execute(text(f"ANALYZE {', '.join(table for table in TABLES if totals[table])}"))
+    except (SQLAlchemyError, psycopg2.Error) as e:
+        print("\n❌ Failed to load the dataset!\n")
+        print("Error:", e)
+        sys.exit(1)
+
+    total = sum(totals.values())
+    print(f"\n✅ Loaded {loaded} chunks ({skipped} already loaded) in {elapsed:.1f} s: {total:,} rows, "
+          f"{total / elapsed:,.0f} rows/s")
+    for table in TABLES:
+        if totals[table]:
+            print(f"   {table:<15} {totals[table]:>14,} rows  {totals[table] / elapsed:>12,.0f} rows/s")
+    print()
+
+
+if __name__ == "__main__":
+    main()
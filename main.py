@@ -1,3 +1,4 @@
+import os
 import sys
 import multiprocessing
 import uvicorn
@@ -23,12 +24,30 @@ def check_db():
         sys.exit(1)
 
 
+# open /events/stream connections never finish on their own: stop waiting for them after this many
+# seconds on shutdown
+GRACEFUL_SHUTDOWN_TIMEOUT = 5
+
+
 def start_tracelet():
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
         reload=False,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
+
+
+def start_combined():
+    # one process: websql serves the UI and mounts the API, calling it in-process
+    os.environ["TRACELET_WEBSQL_MODE"] = "local"
+    uvicorn.run(
+        "websql.main:app",
+        host="0.0.0.0",
+        port=8076,
+        reload=False,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
     )
 
 
@@ -44,6 +63,11 @@ def start_websql():
 if __name__ == "__main__":
     check_db()
 
+    if "--combined" in sys.argv:
+        print("Database OK. Starting Tracelet + WebSQL in one process...\n")
+        start_combined()
+        sys.exit(0)
+
     print("Database OK. Starting Tracelet + WebSQL...\n")
 
     p1 = multiprocessing.Process(target=start_tracelet)
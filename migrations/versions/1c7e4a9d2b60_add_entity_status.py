@@ -0,0 +1,69 @@
+"""add entity_status
+
+Revision ID: 1c7e4a9d2b60
+Revises:
+Create Date: 2026-10-17 08:37:26.415390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c7e4a9d2b60'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# a row for every existing entity (listings inner join it), from its latest event; entities without
+# events get the status a new entity starts with ('created')
+BACKFILL_SQL = """
+WITH latest AS (
+    SELECT DISTINCT ON (entity_id) entity_id, event_type, location, timestamp
+    FROM events
+    ORDER BY entity_id, timestamp DESC
+),
+counts AS (
+    SELECT entity_id, count(*) AS n
+    FROM events
+    GROUP BY entity_id
+)
+INSERT INTO entity_status (entity_id, entity_type, current_status, current_location, last_updated, event_count)
+SELECT e.id, e.type, COALESCE(latest.event_type, 'created'), latest.location, latest.timestamp, COALESCE(counts.n, 0)
+FROM entities e
+LEFT JOIN latest ON latest.entity_id = e.id
+LEFT JOIN counts ON counts.entity_id = e.id
+ON CONFLICT (entity_id) DO UPDATE SET
+    entity_type = excluded.entity_type,
+    current_status = excluded.current_status,
+    current_location = excluded.current_location,
+    last_updated = excluded.last_updated,
+    event_count = excluded.event_count
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'entity_status',
+        sa.Column('entity_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('entities.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('entity_type', sa.String(), nullable=False),
+        sa.Column('current_status', sa.String(), nullable=False),
+        sa.Column('current_location', sa.String(), nullable=True),
+        sa.Column('last_updated', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('event_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('entity_id'),
+        if_not_exists=True,
+    )
+    op.create_index('idx_entity_status_type_status', 'entity_status', ['entity_type', 'current_status'],
+                    if_not_exists=True)
+    op.execute(BACKFILL_SQL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_entity_status_type_status', table_name='entity_status')
+    op.drop_table('entity_status')
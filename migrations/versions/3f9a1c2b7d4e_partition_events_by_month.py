@@ -0,0 +1,127 @@
+"""partition events by month
+
+Revision ID: 3f9a1c2b7d4e
+Revises: 1c7e4a9d2b60
+Create Date: 2026-10-17 09:12:44.118023
+
+"""
+from datetime import date, datetime, timezone
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c2b7d4e'
+down_revision: Union[str, Sequence[str], None] = '1c7e4a9d2b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+OLD_INDEXES = (
+    'ix_events_entity_id',
+    'ix_events_event_type',
+    'ix_events_timestamp',
+    'idx_events_timestamp_id',
+    'idx_events_entity_timestamp_id',
+)
+
+
+# monthly partitions are created up to this many months past the current one (the API keeps adding more)
+MONTHS_AHEAD = 3
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partitions(start: Optional[date] = None) -> None:
+    """events_YYYY_MM for every month from `start` (default: this month) to MONTHS_AHEAD, and events_default."""
+    today = datetime.now(timezone.utc).date()
+    current = date((start or today).year, (start or today).month, 1)
+    last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+    while current <= last:
+        upper = _add_months(current, 1)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS events_{current:%Y_%m} PARTITION OF events "
+            f"FOR VALUES FROM ('{current.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        current = upper
+    op.execute('CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT')
+
+
+def _create_events_table(*constraints, **kw) -> None:
+    op.create_table(
+        'events',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('entity_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('entities.id', name='events_entity_id_fkey'), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('location', sa.String(), nullable=True),
+        sa.Column('actor', sa.String(), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(timezone=True), nullable=False),
+        *constraints,
+        **kw,
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # a database made by create_tables.py already has the partitioned table, it only needs the partitions
+    relkind = bind.execute(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass('events')")).scalar()
+    if relkind == 'p':
+        _create_partitions()
+        return
+
+    # move the existing table out of the way (its pkey index name is global, rename it too)
+    op.rename_table('events', 'events_legacy')
+    op.execute('ALTER INDEX events_pkey RENAME TO events_legacy_pkey')
+    op.drop_constraint('events_entity_id_fkey', 'events_legacy', type_='foreignkey')
+    for name in OLD_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    _create_events_table(
+        sa.PrimaryKeyConstraint('id', 'timestamp', name='events_pkey'),
+        postgresql_partition_by='RANGE (timestamp)',
+    )
+    op.create_index('idx_events_timestamp_id', 'events', ['timestamp', 'id'])
+    op.create_index('idx_events_entity_timestamp_id', 'events', ['entity_id', 'timestamp', 'id'])
+    op.create_index('idx_events_type_timestamp', 'events', ['event_type', 'timestamp'])
+
+    # partitions from the oldest existing event up to the configured months ahead
+    oldest = bind.execute(sa.text('SELECT min(timestamp) FROM events_legacy')).scalar()
+    _create_partitions(oldest.date() if oldest else None)
+
+    op.execute(
+        'INSERT INTO events (id, entity_id, event_type, location, actor, payload, timestamp) '
+        'SELECT id, entity_id, event_type, location, actor, payload, COALESCE(timestamp, now()) '
+        'FROM events_legacy'
+    )
+    op.drop_table('events_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('events', 'events_partitioned')
+    op.execute('ALTER INDEX events_pkey RENAME TO events_partitioned_pkey')
+    op.drop_constraint('events_entity_id_fkey', 'events_partitioned', type_='foreignkey')
+    for name in ('idx_events_timestamp_id', 'idx_events_entity_timestamp_id', 'idx_events_type_timestamp'):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    _create_events_table(sa.PrimaryKeyConstraint('id', name='events_pkey'))
+    op.create_index('ix_events_entity_id', 'events', ['entity_id'])
+    op.create_index('ix_events_event_type', 'events', ['event_type'])
+    op.create_index('ix_events_timestamp', 'events', ['timestamp'])
+    op.create_index('idx_events_timestamp_id', 'events', ['timestamp', 'id'])
+    op.create_index('idx_events_entity_timestamp_id', 'events', ['entity_id', 'timestamp', 'id'])
+
+    op.execute(
+        'INSERT INTO events (id, entity_id, event_type, location, actor, payload, timestamp) '
+        'SELECT id, entity_id, event_type, location, actor, payload, timestamp FROM events_partitioned'
+    )
+    # dropping the parent drops every partition with it
+    op.drop_table('events_partitioned')
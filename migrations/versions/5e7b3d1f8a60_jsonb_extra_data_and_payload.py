@@ -0,0 +1,49 @@
+"""jsonb extra_data and payload
+
+Revision ID: 5e7b3d1f8a60
+Revises: c41d7e2a9f05
+Create Date: 2026-10-17 14:22:09.804412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7b3d1f8a60'
+down_revision: Union[str, Sequence[str], None] = 'c41d7e2a9f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = (
+    # table, column, GIN index
+    ('entities', 'extra_data', 'idx_entities_extra_data'),
+    # altering the partitioned parent converts every partition
+    ('events', 'payload', 'idx_events_payload'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # rewrites both tables (and rebuilds the trigram expression indexes on extra_data); columns created by
+    # create_tables.py are jsonb already
+    inspector = sa.inspect(op.get_bind())
+    for table, column, index in COLUMNS:
+        current = next(c['type'] for c in inspector.get_columns(table) if c['name'] == column)
+        if not isinstance(current, postgresql.JSONB):
+            op.alter_column(table, column, type_=postgresql.JSONB(), existing_type=sa.JSON(),
+                            existing_nullable=True, postgresql_using=f'{column}::jsonb')
+        op.create_index(index, table, [column], postgresql_using='gin', postgresql_ops={column: 'jsonb_path_ops'},
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column, index in COLUMNS:
+        op.drop_index(index, table_name=table)
+        op.alter_column(table, column, type_=sa.JSON(), existing_type=postgresql.JSONB(),
+                        existing_nullable=True, postgresql_using=f'{column}::json')
@@ -0,0 +1,52 @@
+"""entity keyset indexes and non-null created_at
+
+Revision ID: 6a1d9e3c7b42
+Revises: 9d4f6a2c1e83
+Create Date: 2026-10-17 16:54:08.271346
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a1d9e3c7b42'
+down_revision: Union[str, Sequence[str], None] = '9d4f6a2c1e83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# name, table, columns: the (created_at, id) / (timestamp, id) keys listings page through
+ENTITY_INDEXES = (
+    ('idx_entities_created_id', 'entities', ['created_at', 'id']),
+    ('idx_entities_type_created_id', 'entities', ['type', 'created_at', 'id']),
+)
+# the partitioning revision creates (and drops) these with the events table, here they're only checked
+EVENT_INDEXES = (
+    ('idx_events_timestamp_id', 'events', ['timestamp', 'id']),
+    ('idx_events_entity_timestamp_id', 'events', ['entity_id', 'timestamp', 'id']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # entities created before created_at was always set: their first event, else the time of the upgrade
+    op.execute(
+        'UPDATE entities e SET created_at = COALESCE('
+        '(SELECT min(ev.timestamp) FROM events ev WHERE ev.entity_id = e.id), now()) '
+        'WHERE created_at IS NULL'
+    )
+    op.alter_column('entities', 'created_at', existing_type=sa.DateTime(timezone=True),
+                    nullable=False, server_default=sa.func.now())
+    for name, table, columns in ENTITY_INDEXES + EVENT_INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in ENTITY_INDEXES:
+        op.drop_index(name, table_name=table)
+    op.alter_column('entities', 'created_at', existing_type=sa.DateTime(timezone=True),
+                    nullable=True, server_default=None)
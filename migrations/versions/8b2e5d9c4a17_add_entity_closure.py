@@ -0,0 +1,58 @@
+"""add entity_closure
+
+Revision ID: 8b2e5d9c4a17
+Revises: 3f9a1c2b7d4e
+Create Date: 2026-10-17 11:40:12.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e5d9c4a17'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c2b7d4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# every path of entity_links, counted per (ancestor, descendant, length); `path` only guards against
+# looping forever should the links contain a cycle
+BACKFILL_SQL = """
+WITH RECURSIVE walk(ancestor_id, descendant_id, depth, path) AS (
+    SELECT parent_id, child_id, 1, ARRAY[parent_id, child_id] FROM entity_links
+  UNION ALL
+    SELECT w.ancestor_id, l.child_id, w.depth + 1, w.path || l.child_id
+    FROM walk w
+    JOIN entity_links l ON l.parent_id = w.descendant_id
+    WHERE NOT l.child_id = ANY(w.path)
+)
+INSERT INTO entity_closure (ancestor_id, descendant_id, depth, paths)
+SELECT ancestor_id, descendant_id, depth, count(*) FROM walk GROUP BY 1, 2, 3
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'entity_closure',
+        sa.Column('ancestor_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('entities.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('descendant_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('entities.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.Column('paths', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id', 'depth'),
+        if_not_exists=True,
+    )
+    op.create_index('idx_entity_closure_descendant', 'entity_closure', ['descendant_id', 'depth'],
+                    if_not_exists=True)
+    # filled from the existing links, so ENTITY_CLOSURE can be switched on right after upgrading
+    op.execute('DELETE FROM entity_closure')
+    op.execute(BACKFILL_SQL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_entity_closure_descendant', table_name='entity_closure')
+    op.drop_table('entity_closure')
@@ -0,0 +1,40 @@
+"""add event idempotency keys
+
+Revision ID: 9d4f6a2c1e83
+Revises: 5e7b3d1f8a60
+Create Date: 2026-10-17 15:48:31.602915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f6a2c1e83'
+down_revision: Union[str, Sequence[str], None] = '5e7b3d1f8a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'event_idempotency_keys',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('event_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('event_timestamp', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+        if_not_exists=True,
+    )
+    op.create_index('idx_event_idempotency_keys_created', 'event_idempotency_keys', ['created_at'],
+                    if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_event_idempotency_keys_created', table_name='event_idempotency_keys')
+    op.drop_table('event_idempotency_keys')
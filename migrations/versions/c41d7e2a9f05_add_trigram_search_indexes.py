@@ -0,0 +1,52 @@
+"""add trigram search indexes
+
+Revision ID: c41d7e2a9f05
+Revises: 8b2e5d9c4a17
+Create Date: 2026-10-17 13:05:51.271690
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e2a9f05'
+down_revision: Union[str, Sequence[str], None] = '8b2e5d9c4a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    'idx_entities_external_id_trgm':
+        'CREATE INDEX IF NOT EXISTS idx_entities_external_id_trgm ON entities '
+        'USING gin (external_id gin_trgm_ops)',
+    'idx_entities_sender_trgm':
+        'CREATE INDEX IF NOT EXISTS idx_entities_sender_trgm ON entities '
+        "USING gin ((extra_data ->> 'sender') gin_trgm_ops)",
+    'idx_entities_recipient_trgm':
+        'CREATE INDEX IF NOT EXISTS idx_entities_recipient_trgm ON entities '
+        "USING gin ((extra_data ->> 'recipient') gin_trgm_ops)",
+    'idx_entities_destination_trgm':
+        'CREATE INDEX IF NOT EXISTS idx_entities_destination_trgm ON entities '
+        "USING gin ((extra_data ->> 'destination') gin_trgm_ops)",
+    'idx_entity_status_location_trgm':
+        'CREATE INDEX IF NOT EXISTS idx_entity_status_location_trgm ON entity_status '
+        'USING gin (current_location gin_trgm_ops)',
+    'idx_events_location_trgm':
+        'CREATE INDEX IF NOT EXISTS idx_events_location_trgm ON events '
+        'USING gin (location gin_trgm_ops)',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm is a contrib extension: creating it needs a role allowed to (superuser or database owner)
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for statement in INDEXES.values():
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
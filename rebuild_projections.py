@@ -0,0 +1,45 @@
+# rebuild_projections.py
+
+import argparse
+import asyncio
+import sys
+from sqlalchemy.exc import SQLAlchemyError
+from app.closure import rebuild_closure
+from app.db import AsyncSessionLocal, async_engine
+from app.projections import rebuild_entity_status
+
+
+async def rebuild(entity_type=None, closure=False):
+    try:
+        # an uncommitted session is rolled back when it closes
+        async with AsyncSessionLocal() as db:
+            rows = await rebuild_entity_status(db, entity_type=entity_type)
+            closure_rows = await rebuild_closure(db) if closure else None
+            await db.commit()
+            return rows, closure_rows
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild Tracelet read projections from the events table.")
+    parser.add_argument("--type", dest="entity_type", default=None,
+                        help="only rebuild entities of this type (e.g. package)")
+    parser.add_argument("--closure", action="store_true",
+                        help="also rebuild the entity_closure table from entity_links (see ENTITY_CLOSURE)")
+    args = parser.parse_args()
+
+    try:
+        print("\nRebuilding entity_status projection...\n")
+        rows, closure_rows = asyncio.run(rebuild(args.entity_type, args.closure))
+        print(f"\n✅ entity_status rebuilt ({rows} rows)\n")
+        if closure_rows is not None:
+            print(f"✅ entity_closure rebuilt ({closure_rows} rows)\n")
+    except SQLAlchemyError as e:
+        print("\n❌ Failed to rebuild projections!\n")
+        print("Error:", e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# tests / event_buffer
+
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.event_buffer import EventBuffer
+
+
+def _buffer(**kw):
+    """An EventBuffer whose flushes are recorded instead of written: every event comes back "created"."""
+    options = {"max_events": 3, "interval_ms": 20, "max_pending": 100, "wait": 0.05, **kw}
+    buffer = EventBuffer("test_buffer", **options)
+    buffer.flushed = []
+    buffer.gate = None
+
+    async def flush(batch):
+        if buffer.gate is not None:
+            await buffer.gate.wait()
+        buffer.flushed.append([key for key, _, _ in batch])
+        for key, row, future in batch:
+            future.set_result(("created", row))
+
+    buffer._flush = flush
+    return buffer
+
+
+def _row(i):
+    return {"id": i}
+
+
+def test_groups_up_to_max_events():
+    async def scenario():
+        buffer = _buffer()
+        buffer.start()
+        results = await asyncio.gather(*(buffer.submit(f"k{i}", _row(i)) for i in range(7)))
+        await buffer.stop()
+        return buffer, results
+
+    buffer, results = asyncio.run(scenario())
+    assert results == [("created", _row(i)) for i in range(7)]
+    assert [len(batch) for batch in buffer.flushed] == [3, 3, 1]
+    assert [key for batch in buffer.flushed for key in batch] == [f"k{i}" for i in range(7)]
+
+
+def test_waits_for_the_interval_to_fill_a_group():
+    async def scenario():
+        buffer = _buffer(max_events=100, interval_ms=200)
+        buffer.start()
+        first = asyncio.create_task(buffer.submit("a", _row(1)))
+        await asyncio.sleep(0.02)
+        second = asyncio.create_task(buffer.submit("b", _row(2)))
+        await asyncio.gather(first, second)
+        await buffer.stop()
+        return buffer
+
+    assert asyncio.run(scenario()).flushed == [["a", "b"]]
+
+
+def test_stop_flushes_everything_queued():
+    async def scenario():
+        buffer = _buffer(interval_ms=1000)
+        buffer.start()
+        posts = [asyncio.create_task(buffer.submit(f"k{i}", _row(i))) for i in range(5)]
+        await asyncio.sleep(0)
+        await buffer.stop()
+        return buffer, posts
+
+    buffer, posts = asyncio.run(scenario())
+    assert all(post.done() and post.result()[0] == "created" for post in posts)
+    assert sorted(key for batch in buffer.flushed for key in batch) == [f"k{i}" for i in range(5)]
+    assert not buffer.running
+
+
+def test_stop_takes_posts_still_waiting_for_room():
+    async def scenario():
+        buffer = _buffer(max_events=1, max_pending=1, wait=1.0)
+        buffer.gate = asyncio.Event()
+        buffer.start()
+        posts = [asyncio.create_task(buffer.submit(f"k{i}", _row(i))) for i in range(3)]
+        await asyncio.sleep(0.01)
+        stopping = asyncio.create_task(buffer.stop())
+        await asyncio.sleep(0.01)
+        buffer.gate.set()
+        await stopping
+        return buffer, posts
+
+    buffer, posts = asyncio.run(scenario())
+    assert all(post.done() and post.result()[0] == "created" for post in posts)
+    assert sorted(key for batch in buffer.flushed for key in batch) == ["k0", "k1", "k2"]
+
+
+def test_posts_after_stop_are_turned_away():
+    async def scenario():
+        buffer = _buffer()
+        buffer.start()
+        await buffer.stop()
+        with pytest.raises(HTTPException) as e:
+            await buffer.submit("late", _row(0))
+        return e.value
+
+    assert asyncio.run(scenario()).status_code == 503
+
+
+def test_full_buffer_rejects_after_waiting():
+    async def scenario():
+        buffer = _buffer(max_events=1, max_pending=1, wait=0.02)
+        buffer.gate = asyncio.Event()
+        buffer.start()
+        # the flusher holds the first event (blocked on the gate), the second fills the queue
+        first = asyncio.create_task(buffer.submit("k0", _row(0)))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(buffer.submit("k1", _row(1)))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as e:
+            await buffer.submit("k2", _row(2))
+        buffer.gate.set()
+        await asyncio.gather(first, second)
+        await buffer.stop()
+        return buffer, e.value
+
+    buffer, error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert buffer.rejected == 1
+    assert buffer.flushed == [["k0"], ["k1"]]
@@ -0,0 +1,76 @@
+# tests / feed
+
+from datetime import datetime, timezone
+from uuid import uuid4
+from app.feed import FEED_FIELDS, EventFeed
+
+
+def _event(entity_id=None, event_type="in_transit", location="Berlin Hub"):
+    return {"event_type": event_type, "location": location, "actor": None, "payload": None, "id": uuid4(),
+            "entity_id": entity_id or uuid4(), "timestamp": datetime.now(timezone.utc), "extra": "not published"}
+
+
+def _drain(subscription):
+    out = []
+    while not subscription.queue.empty():
+        out.append(subscription.queue.get_nowait())
+    return out
+
+
+def test_publish_without_subscribers():
+    feed = EventFeed("test_feed", 2)
+    feed.publish([_event()])
+    assert feed.stats()["delivered"] == 0
+
+
+def test_subscribers_get_the_feed_fields():
+    feed = EventFeed("test_feed", 10)
+    subscription = feed.subscribe()
+    event = _event()
+    feed.publish([event])
+    assert _drain(subscription) == [{field: event[field] for field in FEED_FIELDS}]
+
+
+def test_filters():
+    feed = EventFeed("test_feed", 10)
+    entity_id = uuid4()
+    by_entity = feed.subscribe(entity_id=entity_id)
+    by_type = feed.subscribe(event_type="delivered")
+    by_location = feed.subscribe(location="berlin")
+    events = [_event(entity_id), _event(event_type="delivered", location=None), _event(location="Hamburg")]
+    feed.publish(events)
+    assert [m["id"] for m in _drain(by_entity)] == [events[0]["id"]]
+    assert [m["id"] for m in _drain(by_type)] == [events[1]["id"]]
+    assert [m["id"] for m in _drain(by_location)] == [events[0]["id"]]
+
+
+def test_slow_subscriber_is_dropped_not_buffered():
+    feed = EventFeed("test_feed", 2)
+    slow = feed.subscribe()
+    fast = feed.subscribe()
+    events = [_event() for _ in range(3)]
+    feed.publish(events[:2])
+    _drain(fast)
+    feed.publish(events[2:])
+
+    # the full queue keeps what it had and ends with the end marker
+    assert [m["id"] if m else None for m in _drain(slow)] == [events[0]["id"], events[1]["id"], None]
+    assert slow.dropped
+    assert [m["id"] for m in _drain(fast)] == [events[2]["id"]]
+    assert feed.stats() == {"subscribers": 1, "queue_size": 2, "delivered": 5, "dropped_subscribers": 1}
+
+    # a dropped subscriber gets nothing more
+    feed.publish([_event()])
+    assert _drain(slow) == []
+
+
+def test_unsubscribe_and_close():
+    feed = EventFeed("test_feed", 2)
+    gone = feed.subscribe()
+    open_ = feed.subscribe()
+    feed.unsubscribe(gone)
+    feed.publish([_event()])
+    assert _drain(gone) == []
+    feed.close()
+    assert _drain(open_)[-1] is None
+    assert feed.stats()["subscribers"] == 0
@@ -0,0 +1,170 @@
+# tests / graph
+
+import asyncio
+from uuid import UUID
+import pytest
+from app.graph import LinkGraph, cyclic_links
+
+
+def _ids(n):
+    # ordered like the index orders siblings (by the id's integer)
+    return [UUID(int=i + 1) for i in range(n)]
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def partitions(self, size):
+        for start in range(0, len(self.rows), size):
+            yield self.rows[start:start + size]
+
+
+class _Session:
+    """Stands in for the AsyncSession the index is loaded with: streams (parent, child, relation) rows."""
+
+    def __init__(self, links):
+        self.links = links
+
+    async def stream(self, stmt):
+        return _Result(self.links)
+
+
+def _walk(graph, links, root, direction, **kw):
+    nodes = asyncio.run(graph.walk(_Session(links), root, direction, **kw))
+    return [(node["id"], node["depth"], node["path"], node["relation"]) for node in nodes]
+
+
+# ---------- cyclic_links ----------
+def test_no_cycle():
+    a, b, c, d = _ids(4)
+    assert cyclic_links([(a, b), (b, c)], [(c, d), (a, d)]) == set()
+
+
+def test_new_link_closing_an_existing_path():
+    a, b, c = _ids(3)
+    assert cyclic_links([(a, b), (b, c)], [(c, a)]) == {0}
+
+
+def test_cycle_made_only_of_new_links():
+    a, b, c, d = _ids(4)
+    assert cyclic_links([], [(a, b), (c, d), (b, c), (d, a)]) == {0, 1, 2, 3}
+
+
+def test_only_links_inside_the_cycle_are_reported():
+    a, b, c, d, e = _ids(5)
+    links = [(a, b), (b, a), (b, c), (d, e)]
+    assert cyclic_links([], links) == {0, 1}
+
+
+def test_self_link():
+    a, b = _ids(2)
+    assert cyclic_links([(a, b)], [(a, a)]) == {0}
+
+
+def test_existing_pairs_stand_for_paths():
+    # (ancestor, descendant) pairs, as the closure table returns them
+    a, b, c = _ids(3)
+    assert cyclic_links([(a, c)], [(c, a), (a, b)]) == {0}
+
+
+def test_long_chain_doesnt_recurse():
+    ids = _ids(5000)
+    existing = list(zip(ids, ids[1:]))
+    assert cyclic_links(existing, [(ids[-1], ids[0])]) == {0}
+
+
+# ---------- LinkGraph ----------
+@pytest.fixture
+def tree():
+    root, box1, box2, item1, item2, item3 = _ids(6)
+    links = [
+        (root, box1, "contains"),
+        (root, box2, "contains"),
+        (box1, item1, "contains"),
+        (box2, item2, "contains"),
+        (box2, item1, "repack"),
+        (item2, item3, "part"),
+    ]
+    return (root, box1, box2, item1, item2, item3), links
+
+
+def test_walk_down_reports_each_node_once_at_its_shallowest_depth(tree):
+    (root, box1, box2, item1, item2, item3), links = tree
+    assert _walk(LinkGraph(ttl=60), links, root, "down") == [
+        (box1, 1, [root, box1], "contains"),
+        (box2, 1, [root, box2], "contains"),
+        (item1, 2, [root, box1, item1], "contains"),
+        (item2, 2, [root, box2, item2], "contains"),
+        (item3, 3, [root, box2, item2, item3], "part"),
+    ]
+
+
+def test_walk_up_max_depth_and_relations(tree):
+    (root, box1, box2, item1, item2, item3), links = tree
+    graph = LinkGraph(ttl=60)
+    assert _walk(graph, links, item3, "up", max_depth=2) == [
+        (item2, 1, [item3, item2], "part"),
+        (box2, 2, [item3, item2, box2], "contains"),
+    ]
+    assert _walk(graph, links, item1, "up", relations=["repack"]) == [(box2, 1, [item1, box2], "repack")]
+    assert _walk(graph, links, item1, "up", relations=["unknown"]) == []
+
+
+def test_unknown_entity(tree):
+    _, links = tree
+    assert _walk(LinkGraph(ttl=60), links, UUID(int=999), "down") == []
+
+
+def test_overlay_add_and_remove(tree):
+    (root, box1, box2, item1, item2, item3), links = tree
+    graph = LinkGraph(ttl=60)
+    _walk(graph, links, root, "down")
+
+    graph.remove_link(box2, item2)
+    graph.add_link(box1, item3, "contains")
+    assert _walk(graph, links, root, "down") == [
+        (box1, 1, [root, box1], "contains"),
+        (box2, 1, [root, box2], "contains"),
+        (item1, 2, [root, box1, item1], "contains"),
+        (item3, 2, [root, box1, item3], "contains"),
+    ]
+    assert graph.stats()["links"] == len(links)
+    assert graph.stats()["overlay_removed"] == 1
+
+
+def test_overlay_readding_a_removed_link_restores_it(tree):
+    (root, box1, box2, item1, item2, item3), links = tree
+    graph = LinkGraph(ttl=60)
+    before = _walk(graph, links, root, "down")
+    graph.remove_link(box2, item2)
+    graph.add_link(box2, item2, "contains")
+    assert _walk(graph, links, root, "down") == before
+    assert graph.stats()["overlay_added"] == 0
+    assert graph.stats()["overlay_removed"] == 0
+
+
+def test_overlay_changing_a_relation(tree):
+    (root, box1, box2, item1, item2, item3), links = tree
+    graph = LinkGraph(ttl=60)
+    _walk(graph, links, root, "down")
+    graph.add_link(box1, item1, "repack")
+    assert asyncio.run(graph.neighbours(_Session(links), item1, "up")) == [(box2, "repack"), (box1, "repack")]
+    assert graph.stats()["links"] == len(links)
+
+
+def test_overlay_new_entities(tree):
+    (root, *_), links = tree
+    graph = LinkGraph(ttl=60)
+    _walk(graph, links, root, "down")
+    pallet = UUID(int=100)
+    graph.add_link(pallet, root, "holds")
+    assert _walk(graph, links, root, "up") == [(pallet, 1, [root, pallet], "holds")]
+
+
+def test_changes_before_the_first_load_are_not_kept(tree):
+    (root, box1, *_), links = tree
+    graph = LinkGraph(ttl=60)
+    # nothing loaded yet: the load reads them from the database anyway
+    graph.remove_link(root, box1)
+    assert _walk(graph, links, root, "down", max_depth=1)[0][0] == box1
@@ -0,0 +1,75 @@
+# tests / idempotency
+
+from datetime import timedelta
+from uuid import uuid4
+import pytest
+from app.idempotency import SCAN_PREFIX, event_key, recall, remember
+from app.models import utc_now
+from app.settings import settings
+
+
+@pytest.fixture
+def window(monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WINDOW", 60.0)
+    return timedelta(seconds=60)
+
+
+def test_client_key_wins():
+    entity_id = uuid4()
+    key = event_key(entity_id, "in_transit", "Hub", "scanner-1", {"a": 1}, client_key="abc")
+    assert key == "client:abc"
+    assert key == event_key(uuid4(), "delivered", None, None, None, client_key="abc")
+
+
+def test_fingerprint_is_stable_and_ignores_payload_key_order():
+    entity_id = uuid4()
+    first = event_key(entity_id, "in_transit", "Hub", "scanner-1", {"a": 1, "b": {"c": 2, "d": 3}})
+    second = event_key(entity_id, "in_transit", "Hub", "scanner-1", {"b": {"d": 3, "c": 2}, "a": 1})
+    assert first == second
+    assert first.startswith(SCAN_PREFIX)
+
+
+@pytest.mark.parametrize("change", [
+    {"entity_id": uuid4()},
+    {"event_type": "delivered"},
+    {"location": "Depot"},
+    {"actor": "scanner-2"},
+    {"payload": {"a": 2}},
+    {"payload": None},
+])
+def test_fingerprint_covers_every_field(change):
+    scan = {"entity_id": uuid4(), "event_type": "in_transit", "location": "Hub", "actor": "scanner-1",
+            "payload": {"a": 1}}
+    assert event_key(**scan) != event_key(**{**scan, **change})
+
+
+def test_fingerprint_fields_dont_run_together():
+    entity_id = uuid4()
+    assert event_key(entity_id, "in_transit", "a|b", None, None) != event_key(entity_id, "in_transit", "a", "b", None)
+
+
+def test_recall_scan_within_window(window):
+    key = event_key(uuid4(), "in_transit", "Hub", None, None)
+    now = utc_now()
+    event = {"id": uuid4(), "timestamp": now - window + timedelta(seconds=1)}
+    remember(key, event)
+    assert recall(key, now) is event
+
+
+def test_recall_scan_outside_window(window):
+    key = event_key(uuid4(), "in_transit", "Hub", None, None)
+    now = utc_now()
+    remember(key, {"id": uuid4(), "timestamp": now - window - timedelta(seconds=1)})
+    assert recall(key, now) is None
+
+
+def test_recall_client_key_ignores_window(window):
+    key = event_key(uuid4(), "in_transit", "Hub", None, None, client_key=str(uuid4()))
+    now = utc_now()
+    event = {"id": uuid4(), "timestamp": now - 10 * window}
+    remember(key, event)
+    assert recall(key, now) is event
+
+
+def test_recall_unknown_key():
+    assert recall(event_key(uuid4(), "in_transit", None, None, None)) is None
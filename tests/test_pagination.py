@@ -0,0 +1,56 @@
+# tests / pagination
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy.dialects import postgresql
+from app import models
+from app.pagination import NEXT_CURSOR_HEADER, after_cursor, decode_cursor, encode_cursor, set_next_cursor
+
+
+def _row(timestamp=None):
+    return SimpleNamespace(id=uuid4(), created_at=timestamp or datetime.now(timezone.utc))
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    row_id = uuid4()
+    cursor = encode_cursor(timestamp, row_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, row_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "MQ", "WyJ4IiwgInkiXQ"])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor)
+    assert e.value.status_code == 400
+
+
+def test_after_cursor_direction():
+    cursor = encode_cursor(datetime.now(timezone.utc), uuid4())
+    newest_first = after_cursor(cursor, models.Entity.created_at, models.Entity.id)
+    oldest_first = after_cursor(cursor, models.Entity.created_at, models.Entity.id, descending=False)
+    assert "<" in str(newest_first.compile(dialect=postgresql.dialect()))
+    assert ">" in str(oldest_first.compile(dialect=postgresql.dialect()))
+
+
+def test_next_cursor_only_for_a_full_page():
+    response = Response()
+    assert set_next_cursor(response, [_row(), _row()], 3, "created_at") is None
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_next_cursor_points_after_the_last_row():
+    response = Response()
+    page = [_row(), _row(), _row()]
+    cursor = set_next_cursor(response, page, 3, "created_at")
+    assert response.headers[NEXT_CURSOR_HEADER] == cursor
+    assert decode_cursor(cursor) == (page[-1].created_at, page[-1].id)
+
+
+def test_next_cursor_without_a_response():
+    page = [_row()]
+    assert decode_cursor(set_next_cursor(None, page, 1, "created_at")) == (page[0].created_at, page[0].id)
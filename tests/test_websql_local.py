@@ -0,0 +1,50 @@
+# tests / websql local backend
+
+from datetime import datetime, timezone
+from uuid import uuid4
+from app import models, schemas
+from websql.local import _dump
+
+CREATED_AT = datetime(2026, 5, 4, 3, 2, 1, tzinfo=timezone.utc)
+
+
+def _entity():
+    return models.Entity(id=uuid4(), type="package", external_id="PKG-1", extra_data={"sender": "ACME"},
+                         created_at=CREATED_AT)
+
+
+def test_orm_object_like_the_response_model():
+    entity = _entity()
+    assert _dump(entity, schemas.EntityRead) == {
+        "id": str(entity.id),
+        "type": "package",
+        "external_id": "PKG-1",
+        "extra_data": {"sender": "ACME"},
+        "created_at": "2026-05-04T03:02:01Z",
+    }
+
+
+def test_list_of_rows():
+    # listings hand back plain dicts of the response model's fields
+    rows = [{"event_type": "in_transit", "location": "Hub", "actor": None, "payload": {"n": 1}, "id": uuid4(),
+             "entity_id": uuid4(), "timestamp": CREATED_AT}]
+    dumped = _dump(rows, schemas.EventRead)
+    assert isinstance(dumped, list) and len(dumped) == 1
+    assert dumped[0]["id"] == str(rows[0]["id"])
+    assert dumped[0]["entity_id"] == str(rows[0]["entity_id"])
+    assert dumped[0]["timestamp"] == "2026-05-04T03:02:01Z"
+    assert dumped[0]["payload"] == {"n": 1}
+
+
+def test_empty_list():
+    assert _dump([], schemas.EntityRead) == []
+
+
+def test_without_a_schema_only_json_types():
+    entity_id = uuid4()
+    result = {"entity": {"id": entity_id, "created_at": CREATED_AT}, "ancestors": [], "count": {"ancestors": 0}}
+    assert _dump(result) == {
+        "entity": {"id": str(entity_id), "created_at": CREATED_AT.isoformat()},
+        "ancestors": [],
+        "count": {"ancestors": 0},
+    }
@@ -1,49 +1,81 @@
 # websql / api
-import requests
+from typing import AsyncIterator, Optional
 from urllib.parse import urljoin
+import httpx
 from websql.settings import settings
 
 # Ensure base API ends with /api/v1 (no trailing slash)
 BASE_API = "/api/v1"
 base = settings.tracelet_api.rstrip("/")  # e.g. http://127.0.0.1:8000
 
+# One pooled keep-alive client per process, created on first use and closed on shutdown.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(settings.api_timeout, connect=settings.api_connect_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.api_max_connections,
+                max_keepalive_connections=settings.api_max_keepalive,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 def _build_url(path: str) -> str:
     # Accept both "/entities" or "entities"
     if not path.startswith("/"):
         path = "/" + path
     return urljoin(f"{base}{BASE_API}/", path.lstrip("/"))
 
-def api_get(path: str):
-    url = _build_url(path)
-    r = requests.get(url)
+async def api_get(path: str):
+    r = await get_client().get(_build_url(path))
     r.raise_for_status()
     return r.json()
 
-def api_post(path: str, payload: dict):
-    url = _build_url(path)
-    r = requests.post(url, json=payload)
+async def api_post(path: str, payload: dict):
+    r = await get_client().post(_build_url(path), json=payload)
     r.raise_for_status()
     return r.json()
 
-def api_patch(path: str, payload: dict):
-    url = _build_url(path)
-    r = requests.patch(url, json=payload)
+async def api_patch(path: str, payload: dict):
+    r = await get_client().patch(_build_url(path), json=payload)
     r.raise_for_status()
     return r.json()
 
-def api_delete(path: str):
-    url = _build_url(path)
-    r = requests.delete(url)
+async def api_delete(path: str):
+    r = await get_client().delete(_build_url(path))
     r.raise_for_status()
     return r.json()
 
-def api_stream(path: str):
+async def api_stream(path: str) -> AsyncIterator[bytes]:
     """
     Stream binary content (like PDFs) from the backend API.
-    Returns a file-like object suitable for StreamingResponse.
+    Returns an async iterator of chunks suitable for StreamingResponse.
     """
-    url = _build_url(path)
-    r = requests.get(url, stream=True)
-    r.raise_for_status()
-    return r.raw  # file-like object
+    client = get_client()
+    r = await client.send(client.build_request("GET", _build_url(path)), stream=True)
+    if r.is_error:
+        await r.aread()
+        await r.aclose()
+        r.raise_for_status()
+
+    async def chunks():
+        try:
+            async for chunk in r.aiter_bytes():
+                yield chunk
+        finally:
+            await r.aclose()
 
+    return chunks()
@@ -0,0 +1,68 @@
+# websql / backends
+
+from typing import Any, AsyncIterator, Dict, List, Optional
+from websql.api import api_get, api_post, api_stream
+from websql.settings import settings
+
+# How the UI reaches Tracelet (TRACELET_WEBSQL_MODE):
+#   http  - HttpBackend calls a (remote) API over HTTP through the pooled client in websql.api
+#   local - websql and the API share one ASGI app; websql.local.LocalBackend calls the service layer
+#           directly, without loopback HTTP or a JSON encode/decode round trip
+# Both return the same JSON-shaped dicts, so routes and templates don't care which one is active.
+
+
+class HttpBackend:
+    async def health(self) -> Dict[str, Any]:
+        return await api_get("/health")
+
+    async def version(self) -> Dict[str, Any]:
+        return await api_get("/version")
+
+    async def list_entities(self, type: Optional[str] = None) -> List[Dict[str, Any]]:
+        params = f"?type={type}" if type else ""
+        return await api_get(f"/entities{params}")
+
+    async def create_entity(self, payload: dict) -> Dict[str, Any]:
+        return await api_post("/entities", payload)
+
+    async def entity_by_external_id(self, external_id: str) -> Dict[str, Any]:
+        return await api_get(f"/entities/external/{external_id}")
+
+    async def entity_events(self, entity_id: str) -> List[Dict[str, Any]]:
+        return await api_get(f"/events/entity/{entity_id}")
+
+    async def create_event(self, payload: dict) -> Dict[str, Any]:
+        return await api_post("/events", payload)
+
+    async def trace(self, entity_id: str) -> Dict[str, Any]:
+        return await api_get(f"/trace/{entity_id}")
+
+    async def tree(self, entity_id: str) -> Dict[str, Any]:
+        return await api_get(f"/trace/{entity_id}/tree")
+
+    async def create_link(self, payload: dict) -> Dict[str, Any]:
+        return await api_post("/links", payload)
+
+    async def track_package(self, tracking_number: str) -> Dict[str, Any]:
+        return await api_get(f"/tracking/track/{tracking_number}")
+
+    async def list_packages(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        params = f"?status={status}" if status else ""
+        return await api_get(f"/tracking/packages{params}")
+
+    async def tracking_stats(self) -> Dict[str, Any]:
+        return await api_get("/tracking/stats")
+
+    async def package_pdf(self, tracking_number: str) -> AsyncIterator[bytes]:
+        return await api_stream(f"/tracking_pdf/download-pdf/{tracking_number}")
+
+
+def get_backend():
+    if settings.mode == "local":
+        # imported lazily so an HTTP-only websql never loads the API, its models or its DB engine
+        from websql.local import LocalBackend
+        return LocalBackend()
+    return HttpBackend()
+
+
+backend = get_backend()
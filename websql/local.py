@@ -0,0 +1,77 @@
+# websql / local
+
+from typing import Any, AsyncIterator, Dict, List, Optional
+from uuid import UUID
+from fastapi.encoders import jsonable_encoder
+from app import schemas
+from app.db import AsyncSessionLocal
+from app.labels import iter_pdf_chunks
+from app.services import entities, events, labels, links, misc, trace, tracking
+from app.utils import get_api_version
+
+
+def _dump(result, schema=None):
+    """Shape a service result exactly like the API's JSON response (response_model, then JSON types)."""
+    if schema is None:
+        return jsonable_encoder(result)
+    if isinstance(result, list):
+        return [_dump(item, schema) for item in result]
+    return schema.model_validate(result, from_attributes=True).model_dump(mode="json")
+
+
+class LocalBackend:
+    """
+    Backend for websql running in the API process: calls the service layer directly, one DB session
+    per call so independent calls can still be gathered concurrently.
+    """
+
+    async def _call(self, func, *args, schema=None, **kwargs):
+        async with AsyncSessionLocal() as session:
+            return _dump(await func(session, *args, **kwargs), schema)
+
+    async def health(self) -> Dict[str, Any]:
+        return await misc.health()
+
+    async def version(self) -> Dict[str, Any]:
+        return {"version": get_api_version()}
+
+    async def list_entities(self, type: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self._call(entities.list_entities, type=type, schema=schemas.EntityRead)
+
+    async def create_entity(self, payload: dict) -> Dict[str, Any]:
+        entity = schemas.EntityCreate.model_validate(payload)
+        return await self._call(entities.create_entity, entity, schema=schemas.EntityRead)
+
+    async def entity_by_external_id(self, external_id: str) -> Dict[str, Any]:
+        return await self._call(entities.get_entity_by_external_id, external_id, schema=schemas.EntityRead)
+
+    async def entity_events(self, entity_id: str) -> List[Dict[str, Any]]:
+        return await self._call(events.list_entity_events, UUID(entity_id), schema=schemas.EventRead)
+
+    async def create_event(self, payload: dict) -> Dict[str, Any]:
+        event = schemas.EventCreate.model_validate(payload)
+        return await self._call(events.create_event, event, schema=schemas.EventRead)
+
+    async def trace(self, entity_id: str) -> Dict[str, Any]:
+        return await self._call(trace.trace_entity, UUID(entity_id))
+
+    async def tree(self, entity_id: str) -> Dict[str, Any]:
+        return await self._call(trace.entity_tree, UUID(entity_id))
+
+    async def create_link(self, payload: dict) -> Dict[str, Any]:
+        link = schemas.EntityLinkCreate.model_validate(payload)
+        return await self._call(links.create_link, link, schema=schemas.EntityLinkRead)
+
+    async def track_package(self, tracking_number: str) -> Dict[str, Any]:
+        return await self._call(tracking.track_package, tracking_number)
+
+    async def list_packages(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self._call(tracking.list_packages, status=status)
+
+    async def tracking_stats(self) -> Dict[str, Any]:
+        return await self._call(tracking.tracking_stats)
+
+    async def package_pdf(self, tracking_number: str) -> AsyncIterator[bytes]:
+        async with AsyncSessionLocal() as session:
+            pdf_bytes = await labels.package_label_pdf(session, tracking_number)
+        return iter_pdf_chunks(pdf_bytes)
@@ -2,6 +2,8 @@
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
+from websql.api import close_client
+from websql.settings import settings
 from websql.templating import templates
 from websql.routes import dashboard, entities, trace, health, tracking
 
@@ -12,4 +14,24 @@ app.include_router(dashboard.router)
 app.include_router(tracking.router)
 app.include_router(entities.router)
 app.include_router(trace.router)
-app.include_router(health.router)
\ No newline at end of file
+app.include_router(health.router)
+
+if settings.mode == "local":
+    # co-located deployment: the API is served from this app (/api/v1, /docs, ...) and the UI talks
+    # to its service layer in-process. Mounted last so the UI routes win on overlapping paths like "/".
+    from app.main import app as api_app
+    app.mount("/", api_app)
+
+
+@app.on_event("startup")
+async def startup_event():
+    if settings.mode == "local":
+        # mounted apps don't get lifespan events, run the API's startup/shutdown from here
+        await api_app.router.startup()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_client()
+    if settings.mode == "local":
+        await api_app.router.shutdown()
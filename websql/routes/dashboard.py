@@ -1,17 +1,17 @@
 #websql / routes / dashboard
 
+import asyncio
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
-from websql.api import api_get
+from websql.backends import backend
 
 router = APIRouter()
 
 @router.get("/", response_class=HTMLResponse)
-def dashboard(request: Request):
+async def dashboard(request: Request):
     from websql.main import templates
 
-    health = api_get("/health")
-    version = api_get("/version")
+    health, version = await asyncio.gather(backend.health(), backend.version())
 
     return templates.TemplateResponse(
         "dashboard.html",
@@ -1,21 +1,22 @@
 #websql / routes / trace
+import asyncio
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from websql.api import api_get, api_post
+from websql.backends import backend
 from websql.main import templates
 
 router = APIRouter(prefix="/trace", tags=["Trace UI"])
 
 
 @router.get("/{entity_id}", response_class=HTMLResponse)
-def trace_view(entity_id: str, request: Request):
+async def trace_view(entity_id: str, request: Request):
     # entity_id is external_id in the UI — backend trace endpoints expect UUID
     try:
-        entity = api_get(f"/entities/external/{entity_id}")
+        entity = await backend.entity_by_external_id(entity_id)
     except Exception as e:
         return templates.TemplateResponse("trace.html", {"request": request, "entity_id": entity_id, "trace": None, "error": str(e)})
     entity_uuid = entity.get("id")
-    trace = api_get(f"/trace/{entity_uuid}") if entity_uuid else None
+    trace = await backend.trace(entity_uuid) if entity_uuid else None
 
     return templates.TemplateResponse(
         "trace.html",
@@ -29,7 +30,7 @@ def trace_view(entity_id: str, request: Request):
 
 
 @router.get("/{entity_id}/link", response_class=HTMLResponse)
-def link_entity_form(entity_id: str, request: Request):
+async def link_entity_form(entity_id: str, request: Request):
     return templates.TemplateResponse(
         "trace_link.html",
         {
@@ -41,7 +42,7 @@ def link_entity_form(entity_id: str, request: Request):
 
 
 @router.post("/{entity_id}/link", response_class=HTMLResponse)
-def link_entity(
+async def link_entity(
     entity_id: str,
     request: Request,
     target_id: str = Form(...),
@@ -52,8 +53,10 @@ def link_entity(
     then POST to /links with parent_id and child_id.
     """
     try:
-        parent = api_get(f"/entities/external/{entity_id}")
-        child = api_get(f"/entities/external/{target_id}")
+        parent, child = await asyncio.gather(
+            backend.entity_by_external_id(entity_id),
+            backend.entity_by_external_id(target_id),
+        )
     except Exception as e:
         return templates.TemplateResponse(
             "trace_link.html",
@@ -73,7 +76,7 @@ def link_entity(
     }
 
     try:
-        api_post("/links", payload)
+        await backend.create_link(payload)
         return RedirectResponse(
             url=f"/trace/{entity_id}",
             status_code=303,
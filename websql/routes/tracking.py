@@ -1,19 +1,18 @@
 # websql / routes / tracking
 
+import asyncio
 from fastapi import APIRouter, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
-from websql.api import api_get, api_post, api_stream
+from websql.backends import backend
 from websql.main import templates
 
 router = APIRouter(prefix="/tracking", tags=["Tracking UI"])
 
 
 @router.get("", response_class=HTMLResponse)
-def tracking_home(request: Request, status: str = None):
+async def tracking_home(request: Request, status: str = None):
     try:
-        params = f"?status={status}" if status else ""
-        packages = api_get(f"/tracking/packages{params}")
-        stats = api_get("/tracking/stats")
+        packages, stats = await asyncio.gather(backend.list_packages(status), backend.tracking_stats())
 
         return templates.TemplateResponse(
             "tracking.html",
@@ -24,14 +23,14 @@ def tracking_home(request: Request, status: str = None):
 
 
 @router.get("/search", response_class=HTMLResponse)
-def search_package(request: Request, q: str = ""):
+async def search_package(request: Request, q: str = ""):
     if not q:
         return templates.TemplateResponse(
             "tracking_search.html",
             {"request": request, "query": q, "package": None, "error": None},
         )
     try:
-        package = api_get(f"/tracking/track/{q}")
+        package = await backend.track_package(q)
         return templates.TemplateResponse(
             "tracking_search.html",
             {"request": request, "query": q, "package": package, "error": None},
@@ -44,12 +43,12 @@ def search_package(request: Request, q: str = ""):
 
 
 @router.get("/create", response_class=HTMLResponse)
-def create_package_form(request: Request):
+async def create_package_form(request: Request):
     return templates.TemplateResponse("tracking_create.html", {"request": request, "error": None})
 
 
 @router.post("/create", response_class=HTMLResponse)
-def create_package(
+async def create_package(
     request: Request,
     tracking_number: str = Form(...),
     sender: str = Form(...),
@@ -68,14 +67,14 @@ def create_package(
                 "weight_kg": weight_kg
             }
         }
-        entity = api_post("/entities", entity_payload)
+        entity = await backend.create_entity(entity_payload)
 
         event_payload = {
             "entity_id": entity["id"],
             "event_type": "created",
             "payload": {"creator": "web-ui"}
         }
-        api_post("/events", event_payload)
+        await backend.create_event(event_payload)
 
         return RedirectResponse(url=f"/tracking/{tracking_number}", status_code=303)
 
@@ -84,16 +83,16 @@ def create_package(
 
 
 @router.get("/{tracking_number}", response_class=HTMLResponse)
-def track_package(tracking_number: str, request: Request):
+async def track_package(tracking_number: str, request: Request):
     try:
-        package = api_get(f"/tracking/track/{tracking_number}")
+        package = await backend.track_package(tracking_number)
         return templates.TemplateResponse("tracking_detail.html", {"request": request, "package": package})
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
 @router.get("/{tracking_number}/add-event", response_class=HTMLResponse)
-def add_event_form(tracking_number: str, request: Request):
+async def add_event_form(tracking_number: str, request: Request):
     return templates.TemplateResponse(
         "tracking_add_event.html",
         {"request": request, "tracking_number": tracking_number, "error": None}
@@ -101,7 +100,7 @@ def add_event_form(tracking_number: str, request: Request):
 
 
 @router.post("/{tracking_number}/add-event", response_class=HTMLResponse)
-def add_event(
+async def add_event(
     tracking_number: str,
     request: Request,
     status: str = Form(...),
@@ -110,7 +109,7 @@ def add_event(
     notes: str = Form(None)
 ):
     try:
-        entity = api_get(f"/entities/external/{tracking_number}")
+        entity = await backend.entity_by_external_id(tracking_number)
     except Exception as e:
         return templates.TemplateResponse(
             "tracking_add_event.html",
@@ -132,7 +131,7 @@ def add_event(
     }
 
     try:
-        api_post("/events", payload)
+        await backend.create_event(payload)
         return RedirectResponse(url=f"/tracking/{tracking_number}", status_code=303)
     except Exception as e:
         return templates.TemplateResponse(
@@ -143,13 +142,13 @@ def add_event(
 
 # ---------------- PDF Download ----------------
 @router.get("/{tracking_number}/download-pdf")
-def download_package_pdf(tracking_number: str):
+async def download_package_pdf(tracking_number: str):
     """
     Calls the dedicated backend PDF endpoint in tracking_pdf router.
     """
     try:
-        # This hits the backend endpoint: /tracking_pdf/download-pdf/{tracking_number}
-        pdf_response = api_stream(f"/tracking_pdf/download-pdf/{tracking_number}")
+        # Over HTTP this hits the backend endpoint: /tracking_pdf/download-pdf/{tracking_number}
+        pdf_response = await backend.package_pdf(tracking_number)
 
         return StreamingResponse(
             pdf_response,
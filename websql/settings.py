@@ -4,7 +4,14 @@ from pydantic import BaseModel
 import os
 
 class WebSQLSettings(BaseModel):
+    # "http": call the API at tracelet_api; "local": serve the API from this app and call it in-process
+    mode: str = os.getenv("TRACELET_WEBSQL_MODE", "http")
     tracelet_api: str = os.getenv("TRACELET_API", "http://127.0.0.1:8000")
+    # backend HTTP client: seconds per request / to connect, pool size and idle keep-alive connections
+    api_timeout: float = float(os.getenv("TRACELET_API_TIMEOUT", "10"))
+    api_connect_timeout: float = float(os.getenv("TRACELET_API_CONNECT_TIMEOUT", "3"))
+    api_max_connections: int = int(os.getenv("TRACELET_API_MAX_CONNECTIONS", "100"))
+    api_max_keepalive: int = int(os.getenv("TRACELET_API_MAX_KEEPALIVE", "20"))
     host: str = "127.0.0.1"
     port: int = 8076
     debug: bool = True